@@ -1,25 +1,37 @@
+import sys
+
+# 启动耗时分析：须在其他导入之前安装导入计时
+STARTUP_PROFILE = None
+if "--profile-startup" in sys.argv:
+    from util.startup_profile import StartupProfile
+    STARTUP_PROFILE = StartupProfile().start()
+
 import threading
 import time
 import tkinter as tk
 from tkinter import ttk
-from typing import Any
+import collections
+import queue
 import webbrowser
 from util.config_store import (
     load_user_data, load_app_config, update_user_data,
-    load_settings, parse_selector_config
+    load_settings
 )
-from util.paths import IMG_DIR
+from util.login_engine import LOG_LEVELS, LoginEngine, LoginInputs, mode_name
+from util.paths import ROOT_DIR
 
 
 class App:
+    LOG_BATCH = 500  # 每个刷新周期最多取出的日志条数
+    LOG_TICK_MIN_MS = 10  # 日志刷新间隔下限，避免配置为 0 时 Tk 主循环空转
+
     def __init__(self, root: tk.Tk):
         self.root = root
         self.root.title("公务员网站自动登录助手")
 
         # 分别加载用户数据和配置
         self.user_data = load_user_data()
-        self.app_config = load_app_config()
-        self.settings = {**self.user_data, **self.app_config}  # 合并供兼容使用
+        app_config = load_app_config()
         
         # 窗口置顶（从配置读取）
         topmost = self.user_data.get("topmost", True)
@@ -36,9 +48,17 @@ class App:
         y = (screen_height - window_height) // 2
         self.root.geometry(f"{window_width}x{window_height}+{x}+{y}")
         
-        self.driver = None
-        self.current_browser = None  # 记录当前使用的浏览器类型
-        self.ocr = None
+        # 日志：各线程只写队列，Tk 主循环按固定间隔批量显示
+        log_cfg = app_config.get("log", {})
+        self._log_queue = queue.SimpleQueue()
+        self.log_history = collections.deque(maxlen=int(log_cfg.get("history", 2000)))  # 全部级别
+        self._apply_log_config(log_cfg)
+        self._log_file = self._open_log_file(log_cfg.get("file", ""))
+
+        # 登录流程引擎（浏览器、OCR、登录配置与登录尝试），界面只负责输入与显示
+        self.engine = LoginEngine(app_config, LoginInputs.from_user_data(self.user_data),
+                                  log=self.log, on_ready=self.set_ready_state,
+                                  on_reload=self._on_config_reloaded)
         self.looping = False
         self.loop_stop = threading.Event()
         self.current_mode = self.user_data.get("mode", "bm")  # bm | kw
@@ -77,14 +97,14 @@ class App:
         
         # 报名URL
         ttk.Label(url_frame, text="国考报名登陆页（bm）:").grid(row=0, column=0, sticky="w", padx=4)
-        bm_url = self.app_config.get("login", {}).get("bm", {}).get("url", "")
+        bm_url = app_config.get("login", {}).get("bm", {}).get("url", "")
         self.var_bm_url = tk.StringVar(value=bm_url)
         ent_bm_url = ttk.Entry(url_frame, textvariable=self.var_bm_url, width=50)
         ent_bm_url.grid(row=0, column=1, sticky="we", padx=4, pady=2)
         
         # 考务URL
         ttk.Label(url_frame, text="公务员报名确认及准考证打印系统（kw）:").grid(row=1, column=0, sticky="w", padx=4)
-        kw_url = self.app_config.get("login", {}).get("kw", {}).get("url", "")
+        kw_url = app_config.get("login", {}).get("kw", {}).get("url", "")
         self.var_kw_url = tk.StringVar(value=kw_url)
         ent_kw_url = ttk.Entry(url_frame, textvariable=self.var_kw_url, width=50)
         ent_kw_url.grid(row=1, column=1, sticky="we", padx=4, pady=2)
@@ -97,17 +117,25 @@ class App:
         self.var_auto_ocr = tk.BooleanVar(value=self.user_data.get("auto_ocr", True))
         self.var_headless = tk.BooleanVar(value=self.user_data.get("headless", False))
         self.var_topmost = tk.BooleanVar(value=self.user_data.get("topmost", True))
+        self.var_warmup = tk.BooleanVar(value=self.user_data.get("warmup", False))
         self.var_mode = tk.StringVar(value=self.current_mode)
         chk_ocr = ttk.Checkbutton(checkbox_frame, text="自动识别验证码", variable=self.var_auto_ocr)
         chk_headless = ttk.Checkbutton(checkbox_frame, text="后台登录(无头)", variable=self.var_headless)
         chk_topmost = ttk.Checkbutton(checkbox_frame, text="窗口置顶", variable=self.var_topmost, command=self.toggle_topmost)
+        chk_warmup = ttk.Checkbutton(checkbox_frame, text="启动预热", variable=self.var_warmup)
         chk_ocr.grid(row=0, column=0, sticky="w", padx=(0, 15))
         chk_headless.grid(row=0, column=1, sticky="w", padx=(0, 15))
-        chk_topmost.grid(row=0, column=2, sticky="w")
+        chk_topmost.grid(row=0, column=2, sticky="w", padx=(0, 15))
+        chk_warmup.grid(row=0, column=3, sticky="w", padx=(0, 15))
+
+        # 预热状态（OCR / 浏览器是否已就绪）
+        self._ready_state = {"OCR": "未加载", "浏览器": "未启动"}
+        self.var_ready = tk.StringVar(value=self._format_ready())
+        ttk.Label(checkbox_frame, textvariable=self.var_ready, foreground="gray").grid(row=0, column=4, sticky="w")
 
         # 循环次数输入
         ttk.Label(frm, text="循环次数").grid(row=6, column=0, sticky="w")
-        self.var_loop_attempts = tk.StringVar(value=str(self.user_data.get("loop_attemptsGUI", self.app_config.get("loop_attempts", 100))))
+        self.var_loop_attempts = tk.StringVar(value=str(self.user_data.get("loop_attemptsGUI", app_config.get("loop_attempts", 100))))
         ent_loop_attempts = ttk.Entry(frm, textvariable=self.var_loop_attempts, width=32)
         ent_loop_attempts.grid(row=6, column=1, sticky="w", padx=6, pady=4)
 
@@ -142,6 +170,7 @@ class App:
         # 日志区域
         self.txt = tk.Text(frm, height=12, wrap=tk.WORD)
         self.txt.grid(row=8, column=0, columnspan=2, sticky="nsew")
+        self.root.after(self._log_tick_ms, self._drain_log)
 
         frm.columnconfigure(1, weight=1)
         frm.rowconfigure(8, weight=1)
@@ -150,6 +179,72 @@ class App:
 
         self.log("准备就绪。请在配置文件中设置登录URL与选择器。")
 
+        reload_cfg = app_config.get("hot_reload", {})
+        if self.engine.hot_reload:
+            self._reload_ms = max(100, int(reload_cfg.get("interval_ms", 1000)))
+            self.root.after(self._reload_ms, self._poll_config)
+
+        # 窗口显示后再开始后台预热，不拖慢界面出现
+        if self.var_warmup.get():
+            self.root.after(200, self.start_warmup)
+
+    def _format_ready(self) -> str:
+        return " | ".join(f"{k}: {v}" for k, v in self._ready_state.items())
+
+    def _call_in_ui(self, func):
+        """线程安全地更新界面：与日志共用队列，由 Tk 主循环执行 func()"""
+        self._log_queue.put((None, func))
+
+    def set_ready_state(self, name: str, state: str):
+        """更新预热状态显示（线程安全）"""
+        def update():
+            self._ready_state[name] = state
+            self.var_ready.set(self._format_ready())
+        self._call_in_ui(update)
+
+    def start_warmup(self):
+        """
+        后台预热：加载OCR模型并执行一次空推理，同时启动浏览器并打开当前模式的登录页
+        两项各自在后台线程执行，首次点击按钮时即可直接使用
+        """
+        self._sync_inputs()
+        engine = self.engine
+
+        def warm_ocr():
+            try:
+                self.set_ready_state("OCR", "加载中")
+                ocr = engine.ensure_ocr()
+                if ocr is None or not ocr.ready:
+                    self.set_ready_state("OCR", "失败")
+                    return
+                profile = engine.profiles.get(self.current_mode)
+                cost = ocr.warmup(char_ranges=profile.char_ranges if profile else None)
+                self.set_ready_state("OCR", "就绪")
+                self.log(f"[预热] OCR模型已就绪，耗时 {cost:.2f}s")
+            except Exception as e:
+                self.set_ready_state("OCR", "失败")
+                self.log(f"[预热] OCR预热失败: {e}")
+
+        def warm_browser():
+            try:
+                self.set_ready_state("浏览器", "启动中")
+                start = time.perf_counter()
+                opened = engine.warm_page(self.current_mode)
+                if opened is None:
+                    # 用户已开始登录，浏览器由登录流程负责启动
+                    self.set_ready_state("浏览器", "跳过")
+                    self.log("[预热] 登录进行中，跳过浏览器预热")
+                    return
+                self.set_ready_state("浏览器", "就绪")
+                self.log(f"[预热] 浏览器已就绪{'并打开登录页' if opened else ''}，耗时 {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                self.set_ready_state("浏览器", "失败")
+                self.log(f"[预热] 浏览器预热失败: {e}")
+
+        self.log("[预热] 开始后台预热OCR与浏览器...")
+        threading.Thread(target=warm_ocr, daemon=True).start()
+        threading.Thread(target=warm_browser, daemon=True).start()
+
     def toggle_topmost(self):
         """切换窗口置顶状态"""
         topmost = self.var_topmost.get()
@@ -160,7 +255,19 @@ class App:
         }
         update_user_data(to_save)
     
+    def _sync_inputs(self):
+        """将界面输入同步给登录引擎（在主线程中调用，后台线程不读取 Tk 变量）"""
+        inputs = self.engine.inputs
+        inputs.account = self.var_account.get()
+        inputs.password = self.var_password.get()
+        inputs.serial = self.var_serial.get()
+        inputs.browser = self.var_browser.get()
+        inputs.headless = bool(self.var_headless.get())
+        inputs.auto_ocr = bool(self.var_auto_ocr.get())
+        inputs.urls = {"bm": self.var_bm_url.get().strip(), "kw": self.var_kw_url.get().strip()}
+
     def save_current_settings(self):
+        self._sync_inputs()
         try:
             loop_attempts_value = int(self.var_loop_attempts.get())
         except ValueError:
@@ -175,6 +282,7 @@ class App:
             "kw_serial": self.var_serial.get().strip(),
             "browser": self.var_browser.get(),
             "loop_attemptsGUI": loop_attempts_value,
+            "warmup": bool(self.var_warmup.get()),
         }
         self.user_data = update_user_data(to_save)
         
@@ -188,48 +296,98 @@ class App:
                 "kw": {"url": kw_url}
             }
         }
-        update_app_config(url_config)
-        
-        # 重新加载配置以更新settings
-        from util.config_store import load_app_config
-        self.app_config = load_app_config()
-        # 更新合并的settings
-        self.settings = {**self.user_data, **self.app_config}
-        
-    def ensure_driver(self):
-        browser = self.var_browser.get()
-        # 如果driver不存在，或者浏览器类型改变了，需要重新创建driver
-        if self.driver is None or self.current_browser != browser:
-            # 关闭旧的driver
-            if self.driver is not None:
+        # 内存中立即生效，写盘在后台防抖进行，不阻塞界面
+        self.engine.set_app_config(update_app_config(url_config))
+
+    def _on_config_reloaded(self, changed):
+        """配置热加载后更新界面相关的设置（可能在工作线程中回调，转到主线程执行）"""
+        app_config = self.engine.app_config
+        if "login" in changed:
+            # GUI 中的 URL 优先于配置文件；紧接着的登录尝试就会使用，需立即同步
+            bm_url = app_config["login"].get("bm", {}).get("url", "")
+            kw_url = app_config["login"].get("kw", {}).get("url", "")
+            self.engine.inputs.urls = {"bm": bm_url, "kw": kw_url}
+        self._call_in_ui(lambda: self._apply_reloaded_config(app_config, changed))
+
+    def _apply_reloaded_config(self, app_config, changed):
+        if "log" in changed:
+            self._apply_log_config(app_config.get("log", {}))
+        if "login" in changed:
+            # 同步更新 URL 输入框
+            self.var_bm_url.set(app_config["login"].get("bm", {}).get("url", ""))
+            self.var_kw_url.set(app_config["login"].get("kw", {}).get("url", ""))
+
+    def _poll_config(self):
+        """定时检查配置文件（有登录尝试进行中时由引擎跳过）"""
+        self.engine.poll_reload()
+        self.root.after(self._reload_ms, self._poll_config)
+
+    def log(self, msg: str, level: str = "info"):
+        """线程安全的日志输出：只放入队列，由 Tk 主循环批量显示"""
+        timestamp = time.strftime('%H:%M:%S')
+        self._log_queue.put((LOG_LEVELS.get(level, LOG_LEVELS["info"]), f"{timestamp} - {msg}\n"))
+
+    def _open_log_file(self, path: str):
+        """打开日志文件（相对路径基于项目根目录），未配置返回 None"""
+        if not path:
+            return None
+        import os
+        path = os.path.join(ROOT_DIR, path)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            return open(path, 'a', encoding='utf-8')
+        except OSError as e:
+            print(f"[日志] 无法打开日志文件 {path}: {e}")
+            return None
+
+    def _apply_log_config(self, log_cfg: dict):
+        """应用 log 配置中可随时生效的项（界面级别、行数上限、刷新间隔）"""
+        self._log_level = LOG_LEVELS.get(log_cfg.get("level", "info"), LOG_LEVELS["info"])
+        self._log_max_lines = int(log_cfg.get("max_lines", 1000))
+        self._log_tick_ms = max(self.LOG_TICK_MIN_MS, int(log_cfg.get("tick_ms", 100)))
+
+    def _drain_log(self):
+        """定时批量取出日志（在主线程中执行），无论本轮是否出错都安排下一轮"""
+        try:
+            self._drain_log_batch()
+        finally:
+            self.root.after(self._log_tick_ms, self._drain_log)
+
+    def _drain_log_batch(self):
+        """
+        全部级别写入内存历史与日志文件，达到界面级别的合并为一次插入，超出行数上限时删除最旧的行；
+        级别为 None 的条目是需要在主线程执行的界面更新（无参函数），出错时记录日志后继续
+        """
+        lines, shown = [], []
+        for _ in range(self.LOG_BATCH):
+            try:
+                level, line = self._log_queue.get_nowait()
+            except queue.Empty:
+                break
+            if level is None:
+                try:
+                    line()
+                except Exception as e:
+                    self.log(f"界面更新失败: {e}", level="error")
+                continue
+            lines.append(line)
+            if level >= self._log_level:
+                shown.append(line)
+        if lines:
+            self.log_history.extend(lines)
+            if self._log_file is not None:
                 try:
-                    self.driver.close()
-                except Exception:
+                    self._log_file.write("".join(lines))
+                    self._log_file.flush()
+                except OSError:
                     pass
-            # 懶加載，減少GUI啟動時間
-            from util.drission_helper import DrissionDriver
-            self.driver = DrissionDriver(headless=bool(self.var_headless.get()), browser=browser)
-            self.current_browser = browser
-        return self.driver
-
-    def ensure_ocr(self):
-        if self.ocr is None:
-            # 懶加載OCR，避免導入大模型拖慢啟動
-            from util.ocr_helper import CaptchaOcr
-            self.ocr = CaptchaOcr()
-        return self.ocr
-
-    def log(self, msg: str):
-        """线程安全的日志输出"""
-        timestamp = time.strftime('%H:%M:%S')
-        log_msg = f"{timestamp} - {msg}\n"
-        # 使用 after 确保在主线程中更新 GUI
-        self.root.after(0, lambda: self._log_impl(log_msg))
-    
-    def _log_impl(self, log_msg: str):
-        """实际的日志输出实现（在主线程中执行）"""
-        self.txt.insert('end', log_msg)
-        self.txt.see('end')
+        if shown:
+            self.txt.insert('end', "".join(shown))
+            # 每行以换行结尾，end-1c 所在行号 = 行数 + 1
+            total = int(self.txt.index('end-1c').split('.')[0]) - 1
+            if total > self._log_max_lines:
+                self.txt.delete('1.0', f"{total - self._log_max_lines + 1}.0")
+            self.txt.see('end')
 
     def open_page(self, mode: str):
         """打开页面（后台线程执行）"""
@@ -238,27 +396,17 @@ class App:
         self.var_mode.set(mode)
         self.save_current_settings()
         
-        # 优先使用GUI中的URL
-        if mode == "bm":
-            url = self.var_bm_url.get().strip()
-        else:
-            url = self.var_kw_url.get().strip()
-        
-        # 如果GUI中没有URL，则从配置文件读取
-        if not url:
-            login_cfg = self.settings.get("login", {}).get(mode, {})
-            url = login_cfg.get("url", "")
-        
+        url = self.engine.resolve_url(mode)
         if not url:
-            self.log(f"请填写{ '报名' if mode=='bm' else '考务' }登录URL")
+            self.log(f"请填写{mode_name(mode)}登录URL")
             return
         
         def worker():
             try:
-                self.log(f"正在打开{ '报名' if mode=='bm' else '考务' }登录页...")
-                drv = self.ensure_driver()
-                drv.goto(url)
-                self.log(f"已打开{ '报名' if mode=='bm' else '考务' }登录页: {url}")
+                self.log(f"正在打开{mode_name(mode)}登录页...")
+                drv = self.engine.ensure_driver()
+                self.engine.goto(drv, mode, url)
+                self.log(f"已打开{mode_name(mode)}登录页: {url}")
             except Exception as e:
                 self.log(f"打开页面失败: {e}")
         
@@ -266,247 +414,20 @@ class App:
 
     def refresh_page(self):
         """刷新页面（后台线程执行）"""
-        if not self.driver:
+        if not self.engine.driver:
             self.log("浏览器未启动。")
             return
         
         def worker():
             try:
                 self.log("正在刷新页面...")
-                self.driver.page.refresh()
+                self.engine.driver.page.refresh()
                 self.log("页面已刷新。")
             except Exception as e:
                 self.log(f"刷新失败: {e}")
         
         threading.Thread(target=worker, daemon=True).start()
 
-    def _fill_login_form(self, mode: str) -> bool:
-        s = self.settings
-        login_all = s.get("login", {})
-        login = login_all.get(mode, {})
-        default_selector_type = login.get("selector_type", "xpath")
-
-        # 等待页面加载完成
-        import time
-        time.sleep(1)
-
-        # 输入账号 - 使用灵活的选择器配置
-        username_config = login.get("username", "")
-        account_value = self.var_account.get().strip()
-        if username_config:
-            username_sel, username_type = parse_selector_config(username_config, default_selector_type)
-            if username_sel:
-                ok_u = self.driver.input(username_sel, account_value, username_type)
-                if not ok_u:
-                    self.log(f"账号输入框定位失败。选择器: {username_sel} ({username_type})")
-                    return False
-                self.log(f"已输入账号: {account_value}")
-            else:
-                self.log("账号选择器未配置")
-                return False
-        else:
-            self.log("账号选择器未配置")
-            return False
-
-        # 输入密码 - 使用灵活的选择器配置
-        ok_p = True
-        password_config = login.get("password", "")
-        if password_config:
-            password_sel, password_type = parse_selector_config(password_config, default_selector_type)
-            if password_sel:
-                ok_p = self.driver.input(password_sel, self.var_password.get(), password_type)
-                if not ok_p:
-                    self.log(f"密码输入框定位失败。选择器: {password_sel} ({password_type})")
-                    return False
-                self.log("已输入密码")
-
-        # 输入序列号（考务模式）- 当开启自动识别验证码时才输入
-        ok_sn = True
-        if mode == 'kw' and self.var_auto_ocr.get():
-            serial_config = login.get("serial", "")
-            if serial_config:
-                serial_sel, serial_type = parse_selector_config(serial_config, default_selector_type)
-                if serial_sel:
-                    ok_sn = self.driver.input(serial_sel, self.var_serial.get().strip(), serial_type)
-                    if not ok_sn:
-                        self.log(f"序列号输入框定位失败。选择器: {serial_sel} ({serial_type})")
-                        return False
-                    self.log("已输入序列号")
-
-        # 处理验证码 - 使用灵活的选择器配置
-        if self.var_auto_ocr.get():
-            captcha_img_config = login.get("captcha_image", "")
-            captcha_input_config = login.get("captcha_input", "")
-            if captcha_img_config and captcha_input_config:
-                code = self._get_captcha_code(captcha_img_config, default_selector_type)
-                if code:
-                    captcha_input_sel, captcha_input_type = parse_selector_config(captcha_input_config, default_selector_type)
-                    if captcha_input_sel:
-                        if self.driver.input(captcha_input_sel, code, captcha_input_type):
-                            self.log(f"验证码识别并输入: {code}")
-                        else:
-                            self.log(f"验证码输入框定位失败: {captcha_input_sel} ({captcha_input_type})")
-                else:
-                    self.log("验证码识别失败。")
-        
-        return True
-
-    def _get_captcha_code(self, img_config: Any, default_selector_type: str) -> str | None:
-        """
-        获取验证码识别结果
-        使用 ddddocr，限制字符范围为数字+字母组合（char_ranges=0）
-        优先使用src()方法获取图片资源（更清晰），base64可直接转为bytes
-        """
-        import os
-        
-        ocr = self.ensure_ocr()
-        if not ocr:
-            return None
-        
-        # 解析选择器配置
-        img_selector, selector_type = parse_selector_config(img_config, default_selector_type)
-        if not img_selector:
-            return None
-        
-        # 优先使用src()方法获取图片资源（base64可直接转为bytes，更清晰）
-        img_data = None
-        img_src = self.driver.get_src(img_selector, selector_type, base64_to_bytes=True)
-        
-        if img_src:
-            if isinstance(img_src, bytes):
-                # base64数据已转换为bytes
-                img_data = img_src
-                self.log("通过src()方法获取到base64图片数据")
-            elif isinstance(img_src, str):
-                # 如果是URL字符串
-                self.log(f"通过src()方法获取到图片URL: {img_src[:50]}...")
-                # 先尝试OCR识别URL（OCR helper会处理URL下载）
-                try:
-                    code = ocr.recognize(img_src, char_ranges=0)
-                    if code:
-                        # 尝试下载并保存图片
-                        try:
-                            import requests
-                            headers = {
-                                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                            }
-                            resp = requests.get(img_src, headers=headers, timeout=10)
-                            if resp.status_code == 200:
-                                img_path = os.path.join(IMG_DIR, "captcha.png")
-                                with open(img_path, 'wb') as f:
-                                    f.write(resp.content)
-                                self.log(f"验证码图片已保存: {img_path}")
-                        except Exception:
-                            pass
-                        return code
-                except Exception:
-                    pass
-        
-        # 如果src()方法获取到bytes数据，使用该数据进行识别
-        if img_data:
-            # 保存图片到img目录
-            img_path = os.path.join(IMG_DIR, "captcha.png")
-            try:
-                with open(img_path, 'wb') as f:
-                    f.write(img_data)
-                self.log(f"验证码图片已保存: {img_path}")
-            except Exception as e:
-                self.log(f"保存验证码图片失败: {e}")
-            
-            # 使用图片数据进行识别
-            code = ocr.recognize(img_data, char_ranges=0)
-            if code:
-                return code
-        
-        # 如果src()方法失败，退而使用截图方式（清晰度较低）
-        self.log("src()方法未获取到数据，使用截图方式作为备选...")
-        screenshot_data = self.driver.capture_element_png(img_selector, selector_type)
-        if screenshot_data:
-            # 保存截图到img目录（覆盖保存）
-            img_path = os.path.join(IMG_DIR, "captcha.png")
-            try:
-                with open(img_path, 'wb') as f:
-                    f.write(screenshot_data)
-                self.log(f"验证码截图已保存: {img_path}")
-            except Exception as e:
-                self.log(f"保存验证码截图失败: {e}")
-            
-            # char_ranges=0 表示：纯数字 0-9
-            code = ocr.recognize(screenshot_data, char_ranges=0)
-            if code:
-                return code
-        
-        return None
-
-    def _close_dialog(self, mode: str):
-        """
-        关闭弹窗
-        点击登录后，使用配置的关闭弹窗选择器，timeout=4去抓取该元素
-        元素一出现就可以找到，没有的时候也可以懒加载
-        """
-        try:
-            login_all = self.settings.get("login", {})
-            login = login_all.get(mode, {})
-            default_selector_type = login.get("selector_type", "xpath")
-            close_dialog_config = login.get("close_dialog", "")
-            
-            if not close_dialog_config:
-                # 如果没有配置关闭弹窗选择器，直接返回
-                return
-            
-            # 解析选择器配置
-            close_sel, close_type = parse_selector_config(close_dialog_config, default_selector_type)
-            if not close_sel:
-                return
-            
-            # 使用timeout=4去抓取该元素，元素一出现就可以找到
-            self.log("等待并查找关闭弹窗按钮...")
-            if self.driver.click(close_sel, close_type, timeout=4):
-                self.log("已点击关闭弹窗按钮")
-            else:
-                self.log("未找到关闭弹窗按钮（可能弹窗未出现）")
-        except Exception as e:
-            # 静默处理错误，不影响主流程
-            pass
-
-    def _submit(self, mode: str) -> bool:
-        login_all = self.settings.get("login", {})
-        login = login_all.get(mode, {})
-        default_selector_type = login.get("selector_type", "xpath")
-        
-        # 使用灵活的选择器配置
-        submit_config = login.get("submit", "")
-        if submit_config:
-            submit_sel, submit_type = parse_selector_config(submit_config, default_selector_type)
-            if submit_sel:
-                ok = self.driver.click(submit_sel, submit_type)
-                if not ok:
-                    self.log(f"提交按钮定位失败。选择器: {submit_sel} ({submit_type})")
-                return ok
-        self.log("提交按钮选择器未配置")
-        return False
-
-    def _single_login_attempt(self, mode: str):
-        try:
-            if not self.driver:
-                self.open_page(mode)
-            if not self.driver:
-                return
-            if not self._fill_login_form(mode):
-                return
-            # 当未开启自动识别验证码时，仅输入账号密码（和可选序列号）但不提交
-            if not self.var_auto_ocr.get():
-                self.log("未开启自动识别验证码：已输入账号/密码（不提交登录）。")
-                return
-            if not self._submit(mode):
-                return
-            self.log("已尝试提交登录。")
-            
-            # 点击登录后，尝试关闭弹窗
-            self._close_dialog(mode)
-        except Exception as e:
-            self.log(f"登录流程失败: {e}")
-
     def login_once(self):
         """单次登录（后台线程执行）"""
         self.save_current_settings()
@@ -514,7 +435,7 @@ class App:
         
         def worker():
             try:
-                self._single_login_attempt(mode)
+                self.engine.single_attempt(mode)
             except Exception as e:
                 self.log(f"登录过程出错: {e}")
         
@@ -533,7 +454,8 @@ class App:
         try:
             attempts = int(self.var_loop_attempts.get())
         except ValueError:
-            attempts = int(self.settings.get("loop_attempts", 100))
+            attempts = int(self.engine.app_config.get("loop_attempts", 100))
+        interval = float(self.engine.app_config.get("loop_interval", 1))
 
         def worker():
             try:
@@ -542,15 +464,14 @@ class App:
                         self.log("收到停止指令，终止循环。")
                         break
                     self.log(f"开始第 {i+1}/{attempts} 次登录尝试")
-                    self._single_login_attempt(self.current_mode)
-                    # 可中斷的睡眠
-                    for _ in range(20):
-                        if self.loop_stop.is_set():
-                            break
-                        time.sleep(0.1)
+                    self.engine.single_attempt(self.current_mode)
+                    # 可中断的间隔（提交后已等待页面响应，这里只是额外的节流）
+                    if interval > 0:
+                        self.loop_stop.wait(interval)
             finally:
                 self.looping = False
                 self.log("循环完成。")
+                self.engine.log_ocr_stats()
 
         threading.Thread(target=worker, daemon=True).start()
 
@@ -563,97 +484,60 @@ class App:
     
     def test_captcha(self):
         """测试验证码识别功能（后台线程执行）"""
+        self._sync_inputs()
         mode = self.current_mode
-        login_all = self.settings.get("login", {})
-        login = login_all.get(mode, {})
-        default_selector_type = login.get("selector_type", "xpath")
-        captcha_img_config = login.get("captcha_image", "")
-        
-        if not captcha_img_config:
+        engine = self.engine
+        profile = engine.get_profile(mode)
+        if profile is None:
+            return
+        if profile.captcha_image is None:
             self.log(f"[测试验证码] 当前模式({mode})未配置验证码图片选择器")
             return
+        captcha_img = profile.captcha_image
         
         def worker():
             try:
-                # 解析选择器配置
-                captcha_img_sel, selector_type = parse_selector_config(captcha_img_config, default_selector_type)
-                if not captcha_img_sel:
-                    self.log(f"[测试验证码] 验证码图片选择器配置无效")
-                    return
-                
-                # 如果浏览器未启动，先启动
-                if not self.driver:
+                # 如果浏览器未启动，先启动并打开页面
+                if not engine.driver:
                     self.log("[测试验证码] 浏览器未启动，正在打开页面...")
-                    # 在主线程中打开页面（这会启动浏览器）
-                    self.root.after(0, lambda: self.open_page(mode))
-                    time.sleep(3)  # 等待页面加载
+                    if not engine.open_page_sync(mode):
+                        return
                 
-                if not self.driver:
+                if not engine.driver:
                     self.log("[测试验证码] 浏览器启动失败")
                     return
+
+                # 等待页面与验证码图片就绪
+                if not engine.wait_page_ready(profile):
+                    return
+                if not engine.driver.wait_image_loaded(captcha_img.locator, timeout=5):
+                    self.log("[测试验证码] 验证码图片在 5s 内未加载完成，继续尝试获取")
                 
-                self.log(f"[测试验证码] 开始测试验证码识别...")
-                self.log(f"[测试验证码] 模式: {mode} ({'报名' if mode=='bm' else '考务'})")
-                self.log(f"[测试验证码] 选择器: {captcha_img_sel}")
-                self.log(f"[测试验证码] 选择器类型: {selector_type}")
+                self.log("[测试验证码] 开始测试验证码识别...")
+                self.log(f"[测试验证码] 模式: {mode} ({mode_name(mode)})")
+                self.log(f"[测试验证码] 选择器: {captcha_img.selector}")
+                self.log(f"[测试验证码] 选择器类型: {captcha_img.selector_type}")
                 
-                # 优先使用src()方法获取图片资源（更清晰）
-                import os
+                # 优先使用网络监听到的原始图片字节，其次 src()，最后截图
                 img_url = None
                 img_data = None
-                
                 try:
-                    # 使用src()方法获取图片资源（base64可直接转为bytes）
-                    img_src = self.driver.get_src(captcha_img_sel, selector_type, base64_to_bytes=True)
-                    if img_src:
-                        if isinstance(img_src, bytes):
-                            # base64数据已转换为bytes
-                            img_data = img_src
-                            self.log(f"[测试验证码] 通过src()方法获取到base64图片数据，大小: {len(img_data)} 字节")
-                            # 保存图片
-                            img_path = os.path.join(IMG_DIR, "captcha_test.png")
-                            try:
-                                with open(img_path, 'wb') as f:
-                                    f.write(img_data)
-                                self.log(f"[测试验证码] 图片已保存: {img_path}")
-                            except Exception as e:
-                                self.log(f"[测试验证码] 保存图片失败: {e}")
-                        elif isinstance(img_src, str):
-                            # URL字符串
-                            img_url = img_src
-                            self.log(f"[测试验证码] 通过src()方法获取到图片URL: {img_src}")
-                            # 尝试下载并保存
-                            try:
-                                import requests
-                                headers = {
-                                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                                }
-                                resp = requests.get(img_url, headers=headers, timeout=10)
-                                if resp.status_code == 200:
-                                    img_path = os.path.join(IMG_DIR, "captcha_test_url.png")
-                                    with open(img_path, 'wb') as f:
-                                        f.write(resp.content)
-                                    self.log(f"[测试验证码] URL图片已保存: {img_path}")
-                            except Exception:
-                                pass
+                    data, source = engine.read_captcha_image(captcha_img.locator)
+                    if isinstance(data, str):
+                        img_url = data
+                        self.log(f"[测试验证码] 通过src()方法获取到图片URL: {img_url}")
+                    elif data:
+                        img_data = data
+                        self.log(f"[测试验证码] 通过{source}获取到图片数据，大小: {len(img_data)} 字节")
                 except Exception as e:
-                    self.log(f"[测试验证码] 获取src()失败: {e}")
+                    self.log(f"[测试验证码] 获取图片失败: {e}")
                 
-                # 如果src()方法未获取到数据，尝试截图方式
+                # 既无图片数据也无URL时，尝试截图方式
                 if not img_url and not img_data:
                     try:
-                        img_data = self.driver.capture_element_png(captcha_img_sel, selector_type)
+                        img_data, source = engine.driver.capture_element_png(captcha_img.locator), "截图"
                         if img_data:
-                            img_size = len(img_data)
-                            self.log(f"[测试验证码] 截图成功，图片大小: {img_size} 字节")
-                            # 保存截图到img目录
-                            img_path = os.path.join(IMG_DIR, "captcha_test.png")
-                            try:
-                                with open(img_path, 'wb') as f:
-                                    f.write(img_data)
-                                self.log(f"[测试验证码] 截图已保存: {img_path}")
-                            except Exception as e:
-                                self.log(f"[测试验证码] 保存截图失败: {e}")
+                            self.log(f"[测试验证码] 截图成功，图片大小: {len(img_data)} 字节")
                     except Exception as e:
                         self.log(f"[测试验证码] 截图失败: {e}")
                 
@@ -663,27 +547,40 @@ class App:
                 
                 # 进行OCR识别
                 self.log("[测试验证码] 开始OCR识别...")
-                ocr = self.ensure_ocr()
+                ocr = engine.ensure_ocr()
                 if not ocr:
                     self.log("[测试验证码] ❌ OCR未初始化")
                     return
                 
                 try:
-                    # 优先使用URL识别
+                    # 优先使用图片数据识别
                     result = None
-                    if img_url:
-                        self.log(f"[测试验证码] 使用图片URL进行识别...")
-                        result = ocr.recognize(img_url, char_ranges=0)
+                    if img_data:
+                        self.log("[测试验证码] 使用图片数据进行识别...")
+                        result = ocr.recognize(img_data, char_ranges=profile.char_ranges,
+                                               preprocess=engine.get_preprocessor(profile))
                     
-                    # 如果URL识别失败，使用截图
-                    if not result and img_data:
-                        self.log(f"[测试验证码] 使用截图进行识别...")
-                        result = ocr.recognize(img_data, char_ranges=0)
+                    # 没有图片数据时使用URL识别
+                    if not result and img_url:
+                        self.log("[测试验证码] 使用图片URL进行识别...")
+                        result = ocr.recognize(img_url, char_ranges=profile.char_ranges,
+                                               preprocess=engine.get_preprocessor(profile), http=engine.driver.http)
                     
+                    from util.ocr_helper import check_captcha_rules
+                    reason = check_captcha_rules(result, profile.captcha_rules)
                     if result:
-                        self.log(f"[测试验证码] ✅ 识别成功: {result}")
+                        conf = "-" if result.confidence is None else f"{result.confidence:.2f}"
+                        chars = ", ".join(f"{c}:{p:.2f}" for c, p in zip(result.text, result.char_confidences))
+                        self.log(f"[测试验证码] ✅ 识别成功: {result.text}（置信度 {conf}；逐字符 {chars}）")
+                        if reason:
+                            self.log(f"[测试验证码] ⚠ 未通过站点校验规则: {reason}")
                     else:
-                        self.log(f"[测试验证码] ❌ 识别失败: 未能识别出验证码")
+                        self.log("[测试验证码] ❌ 识别失败: 未能识别出验证码")
+                    engine.archive_captcha(img_data, mode=f"{mode}-test", source=source,
+                                         text=result.text if result else "",
+                                         confidence=result.confidence if result else None,
+                                         outcome=reason or "通过")
+                    engine.log_ocr_stats("[测试验证码] ")
                 except Exception as e:
                     self.log(f"[测试验证码] ❌ 识别过程出错: {e}")
             except Exception as e:
@@ -817,10 +714,36 @@ class AboutDialog:
         self.window.grab_set()
 
 
+def profile_startup(profile) -> int:
+    """--profile-startup：构建并显示窗口后输出各模块导入与初始化耗时，超出预算返回 1"""
+    from util.paths import STARTUP_PROFILE_PATH, describe_paths
+    from util.startup_profile import print_report, write_report
+    with profile.phase("tk_root"):
+        root = tk.Tk()
+    with profile.phase("app_init"):
+        App(root)
+    with profile.phase("first_paint"):
+        root.update()
+    profile.mark_window_shown()
+    root.destroy()
+    report = profile.report(load_app_config().get("startup", {}))
+    print(describe_paths())
+    print_report(report)
+    write_report(report, STARTUP_PROFILE_PATH)
+    return 1 if report["failures"] else 0
+
+
 def main():
+    # OCR 工作进程使用 spawn 方式启动，打包后的 exe 需要 freeze_support
+    import multiprocessing
+    multiprocessing.freeze_support()
+    if STARTUP_PROFILE is not None:
+        raise SystemExit(profile_startup(STARTUP_PROFILE))
     root = tk.Tk()
-    App(root)
+    app = App(root)
     root.mainloop()
+    # 窗口关闭后断开浏览器（browser_session.keep_alive 为 false 时退出浏览器）
+    app.engine.close()
 
 
 if __name__ == '__main__':
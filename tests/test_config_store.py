@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+
+import pytest
+
+from util.config_store import DEFAULT_APP_CONFIG, ConfigStore, _deep_merge
+from util.login_engine import LoginEngine
+
+
+def _store(tmp_path, data=None, debounce=60.0):
+    path = tmp_path / "config.json"
+    if data is not None:
+        path.write_text(json.dumps(data), encoding="utf-8")
+    return path, ConfigStore(str(path), {"x": 1, "y": {"a": 1}}, "测试配置", debounce=debounce)
+
+
+def _external_edit(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))  # 保证 mtime 与上次不同
+
+
+def test_update_is_debounced_until_flush(tmp_path):
+    path, store = _store(tmp_path, {"x": 1})
+    store.get()
+    merged = store.update({"y": {"b": 2}})
+    assert merged["y"] == {"a": 1, "b": 2}
+    assert json.loads(path.read_text(encoding="utf-8")) == {"x": 1}
+    store.flush()
+    assert json.loads(path.read_text(encoding="utf-8"))["y"] == {"a": 1, "b": 2}
+
+
+def test_debounce_timer_writes(tmp_path):
+    path, store = _store(tmp_path, {"x": 1}, debounce=0.01)
+    store.update({"x": 2})
+    store._timer.join(timeout=5)
+    assert json.loads(path.read_text(encoding="utf-8"))["x"] == 2
+
+
+def test_check_reload(tmp_path):
+    path, store = _store(tmp_path, {"x": 1})
+    store.get()
+    assert store.check_reload() is None  # 文件未变化
+
+    _external_edit(path, {"x": 5})
+    data, changed = store.check_reload()
+    assert data["x"] == 5 and changed == ["x"]
+    assert store.check_reload() is None
+
+    # 自己写入的不算外部修改
+    store.update({"x": 6})
+    store.flush()
+    assert store.check_reload() is None
+
+
+def test_check_reload_rejects_invalid(tmp_path):
+    path, store = _store(tmp_path, {"x": 1})
+    store.get()
+    _external_edit(path, {"x": 7})
+    assert store.check_reload(lambda config: "x 不能为 7") is None
+    assert store.get()["x"] == 1
+    _external_edit(path, "[")
+    assert store.check_reload() is None
+
+
+def test_engine_defers_config_during_attempt():
+    engine = LoginEngine(app_config=json.loads(json.dumps(DEFAULT_APP_CONFIG)), log=lambda *a, **k: None)
+    new_config = dict(engine.app_config, marker=True)
+    started, release = threading.Event(), threading.Event()
+
+    def attempt(mode):
+        started.set()
+        release.wait(5)
+        return {"marker": engine.app_config.get("marker")}
+
+    engine._run_attempt = attempt
+    engine.hot_reload = False
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(engine.single_attempt("bm")))
+    worker.start()
+    started.wait(5)
+    engine.set_app_config(new_config)
+    assert "marker" not in engine.app_config  # 尝试进行中不替换
+    release.set()
+    worker.join(5)
+    assert result["marker"] is None
+    assert engine.app_config["marker"] is True
+
+
+def test_check_reload_reports_conflict_with_unsaved_write(tmp_path, capsys):
+    path, store = _store(tmp_path, {"x": 1, "z": 1})
+    store.get()
+    store.update({"x": 9})  # 尚未写盘
+    _external_edit(path, {"x": 7, "z": 2})
+    data, changed = store.check_reload()
+    assert data["x"] == 9 and data["z"] == 2
+    assert changed == ["z"]
+    assert "冲突" in capsys.readouterr().out
+
+
+def test_check_reload_keeps_unsaved_write_without_conflict(tmp_path, capsys):
+    path, store = _store(tmp_path, {"x": 1, "z": 1})
+    store.get()
+    store.update({"x": 9})
+    _external_edit(path, {"x": 1, "z": 2})  # 外部只改了 z
+    data, _ = store.check_reload()
+    assert data["x"] == 9 and data["z"] == 2
+    assert "冲突" not in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("patch, message", [
+    ({"log": {"tick_ms": "fast"}}, "log.tick_ms"),
+    ({"loop_interval": -1}, "loop_interval"),
+    ({"ocr": {"cache": {"ttl": True}}}, "ocr.cache.ttl"),
+    ({"trace": {"enabled": "yes"}}, "trace.enabled"),
+    ({"hot_reload": []}, "hot_reload"),
+])
+def test_engine_rejects_mistyped_reload(patch, message):
+    engine = LoginEngine(app_config=json.loads(json.dumps(DEFAULT_APP_CONFIG)), log=lambda *a, **k: None)
+    error = engine._validate_app_config(_deep_merge(engine.app_config, patch))
+    assert error and message in error
+
+
+def test_engine_accepts_default_config():
+    engine = LoginEngine(app_config=json.loads(json.dumps(DEFAULT_APP_CONFIG)), log=lambda *a, **k: None)
+    assert engine._validate_app_config(json.loads(json.dumps(DEFAULT_APP_CONFIG))) is None
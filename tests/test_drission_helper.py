@@ -0,0 +1,156 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+# util.drission_helper 使用 4.1 起提供的 Chromium 对象
+pytest.importorskip("DrissionPage._base.chromium")
+
+from DrissionPage._elements.chromium_element import convert_argument  # noqa: E402
+
+from util.drission_helper import _FILL_JS, browser_running, fill_batch_args  # noqa: E402
+
+FIELDS = [(("css selector", "#user"), "张三"), (("xpath", "//input[@name='pwd']"), 'p"w\\d')]
+
+
+def test_fill_batch_args_pass_drissionpage_conversion():
+    """run_js 的参数经 DrissionPage 的 convert_argument 转换（列表参数会被拒绝）"""
+    with pytest.raises(TypeError):
+        convert_argument([["css selector", "#user", "x"]])
+    arg = convert_argument(fill_batch_args(FIELDS))
+    assert json.loads(arg["value"]) == [["css selector", "#user", "张三"], ["xpath", "//input[@name='pwd']", 'p"w\\d']]
+
+
+def test_fill_script_parses_json_argument():
+    assert "JSON.parse(arguments[0])" in _FILL_JS
+    assert "return JSON.stringify(failed)" in _FILL_JS
+
+
+class _Packet:
+    def __init__(self, url, body):
+        self.url = url
+        self.response = type("Response", (), {"status": 200, "body": body})()
+
+
+class _Listen:
+    def __init__(self):
+        self.packets = []
+
+    def wait(self, timeout=None):
+        return self.packets.pop(0) if self.packets else False
+
+
+def _capturing_driver():
+    from util.drission_helper import DrissionDriver
+
+    drv = DrissionDriver.__new__(DrissionDriver)
+    drv.page = type("Page", (), {"listen": _Listen()})()
+    drv._capture_targets = True
+    drv._captured = __import__("collections").OrderedDict()
+    drv._capture_seq = 0
+    drv._capture_floor = 0
+    return drv
+
+
+def test_captured_image_ignores_responses_before_mark():
+    """刷新后 src 不变：只返回刷新后新到达的响应，超时返回 None 由调用方改读 DOM"""
+    drv = _capturing_driver()
+    drv.page.listen.packets.append(_Packet("https://x/captcha.jpg", b"old"))
+    assert drv.captured_image("https://x/captcha.jpg", timeout=0) == b"old"
+    mark = drv.capture_mark()
+    assert drv.captured_image("https://x/captcha.jpg", timeout=0, after=mark) is None
+    drv.page.listen.packets.append(_Packet("https://x/captcha.jpg", b"new"))
+    assert drv.captured_image("https://x/captcha.jpg", timeout=0, after=mark) == b"new"
+
+
+def _blocking_driver(sizes):
+    from collections import OrderedDict
+    from util.drission_helper import DrissionDriver
+    from util.login_profile import BlockRules
+
+    drv = DrissionDriver.__new__(DrissionDriver)
+    drv._block = BlockRules(resource_types=("Image",), dry_run=True)
+    drv._load_lock = threading.Lock()
+    drv._load_stats = drv._empty_load_stats()
+    drv._requests = {}
+    drv._resource_sizes = OrderedDict(sizes)
+    return drv
+
+
+def test_blocked_bytes_unknown_without_measured_sizes():
+    """拦截的请求大小全部未知时报告 None，而不是节省 0 字节"""
+    drv = _blocking_driver({})
+    drv._count_blocked("https://x/a.png", "Image", None)
+    assert drv.load_stats()["blocked_bytes"] is None
+    drv._count_blocked("https://x/b.png", "Image", 2048)
+    stats = drv.load_stats()
+    assert (stats["blocked_bytes"], stats["blocked_unknown"]) == (2048, 1)
+
+
+def test_dry_run_measures_sizes_for_later_blocking():
+    drv = _blocking_driver({})
+    drv._on_response(requestId="1", response={"url": "https://x/a.png"}, type="Image")
+    drv._on_loading_finished(requestId="1", encodedDataLength=4096)
+    stats = drv.load_stats()
+    assert (stats["blocked"], stats["blocked_bytes"]) == (1, 4096)
+    assert drv._resource_sizes["https://x/a.png"] == 4096
+
+
+class _Element:
+    def __init__(self, src):
+        self.src = src
+
+    def attr(self, name):
+        return self.src
+
+
+def _submitted_page(url="https://x/login", src="/captcha?1"):
+    drv = _capturing_driver()
+    drv.page.url = url
+    drv.element = _Element(src)
+    drv.find = lambda locator, selector_type='xpath', timeout=0: drv.element
+    return drv, drv.page_state(("css selector", "#img"))
+
+
+def test_wait_page_changed_reasons():
+    img = ("css selector", "#img")
+    drv, state = _submitted_page()
+    assert drv.wait_page_changed(state, img, timeout=0) is None
+
+    drv.element = _Element("/captcha?2")
+    assert drv.wait_page_changed(state, img, timeout=0) == "captcha"
+
+    drv, state = _submitted_page()
+    drv.page.listen.packets.append(_Packet("https://x/captcha?1", b"new"))  # src 不变但换了图
+    assert drv.wait_page_changed(state, img, timeout=0) == "captcha"
+
+    drv, state = _submitted_page()
+    drv.page.url = "https://x/home"
+    assert drv.wait_page_changed(state, img, timeout=0) == "navigated"
+
+    drv, state = _submitted_page()
+    drv.element = None
+    assert drv.wait_page_changed(state, img, timeout=0) == "navigated"
+
+
+class _VersionHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200 if self.path == "/json/version" else 404)
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_browser_running_probes_debug_address():
+    server = HTTPServer(("127.0.0.1", 0), _VersionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        assert browser_running(f"127.0.0.1:{server.server_port}")
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert not browser_running(f"127.0.0.1:{server.server_port}", timeout=0.2)
+
@@ -0,0 +1,58 @@
+import json
+
+from util.config_store import DEFAULT_APP_CONFIG
+from util.login_engine import LoginEngine
+
+
+def _engine():
+    return LoginEngine(app_config=json.loads(json.dumps(DEFAULT_APP_CONFIG)), log=lambda *a, **k: None)
+
+
+def test_warm_page_opens_resolved_url_under_attempt_lock():
+    engine = _engine()
+    calls = []
+
+    def open_page_sync(mode):
+        calls.append((mode, engine._attempt_lock.locked()))
+        return True
+
+    engine.open_page_sync = open_page_sync
+    assert engine.warm_page("bm") is True
+    assert calls == [("bm", True)]
+    assert not engine._attempt_lock.locked()
+
+
+def test_warm_page_without_url_only_starts_browser():
+    engine = _engine()
+    started = []
+    engine.ensure_driver = lambda: started.append(True)
+    assert engine.warm_page("kw") is False  # 默认配置中 kw 没有 URL
+    assert started == [True]
+
+
+def test_warm_page_skipped_during_attempt():
+    engine = _engine()
+    engine.ensure_driver = engine.open_page_sync = None  # 被调用即报错
+    with engine._attempt_lock:
+        assert engine.warm_page("bm") is None
+
+
+def test_resubmitting_same_captcha_image_forces_refresh():
+    """页面没有换图时，读到与上次提交相同的图片不再填入，而是刷新后重新识别"""
+    from util.login_profile import compile_login_profile
+    from util.ocr_helper import OcrResult
+
+    engine = _engine()
+    engine.app_config["archive"]["enabled"] = False
+    profile = compile_login_profile("bm", engine.app_config["login"]["bm"])
+    reads = [OcrResult("ab12", digest=b"old"), OcrResult("cd34", digest=b"new")]
+    refreshed = []
+    engine.driver = type("Driver", (), {"capture_mark": lambda self: 7})()
+    engine._get_captcha_code = lambda profile, after=None: (reads.pop(0), b"", "src()")
+    engine._refresh_captcha = lambda profile, timeout=3: refreshed.append(True) or True
+
+    engine._filled_captcha = OcrResult("ab12", digest=b"old")
+    engine._forget_submitted_captcha()
+    result = engine._read_checked_captcha(profile)
+    assert result.text == "cd34"
+    assert refreshed == [True]
@@ -0,0 +1,88 @@
+import subprocess
+import sys
+
+import pytest
+
+from util.login_profile import ProfileError, compile_login_profile, compile_login_profiles
+
+BASE = {
+    "url": "https://example.com/login",
+    "selector_type": "css",
+    "username": "#user",
+    "password": "#pass",
+    "captcha_image": "#img",
+    "captcha_input": "#code",
+    "submit": "#submit",
+}
+
+
+def login(**overrides):
+    return {**BASE, **overrides}
+
+
+def test_compile_valid_profile():
+    profile = compile_login_profile("bm", login(ready_timeout="5", preprocess=[{"op": "threshold", "block": 9}]))
+    assert [f.name for f in profile.fill_fields] == ["username", "password"]
+    assert profile.has_captcha
+    assert profile.ready_timeout == 5.0
+    assert profile.preprocess[0]["op"] == "threshold"
+    assert profile.char_ranges is None
+
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"username": ""}, "账号选择器未配置"),
+    ({"captcha_input": ""}, "同时配置"),
+    ({"username": {"selector": "#u", "selector_type": "bogus"}}, "选择器类型无效"),
+    ({"ready_state": "loading"}, "ready_state"),
+    ({"ready_timeout": "abc"}, "ready_timeout"),
+    ({"ready_timeout": -1}, "ready_timeout"),
+    ({"captcha_rules": {"length": "four"}}, "captcha_rules.length"),
+    ({"captcha_rules": {"charset": "[0-9"}}, "captcha_rules.charset"),
+    ({"preprocess": [{"op": "sharpen"}]}, "未知的预处理阶段"),
+    ({"preprocess": [{"op": "threshold", "radius": 3}]}, "不支持参数 radius"),
+    ({"preprocess": [{"op": "resize", "height": "64"}]}, "参数 height 无效"),
+    ({"preprocess": [{"op": "remove_lines", "direction": "diagonal"}]}, "direction"),
+    ({"char_ranges": 0}, "char_ranges"),
+    ({"block": {"enabled": True, "resource_types": ["Document"]}}, "resource_types"),
+    ({"block": {"enabled": True, "resource_types": ["Image"]}}, "captcha_capture"),
+    ({"block": {"enabled": True, "resource_types": ["Image"], "allow": ["*.css"]}}, "captcha_capture"),
+    ({"block": {"enabled": True, "allow": "*captcha*"}}, "block.allow"),
+])
+def test_compile_errors(overrides, message):
+    with pytest.raises(ProfileError, match=message):
+        compile_login_profile("bm", login(**overrides))
+
+
+def test_block_rules():
+    profile = compile_login_profile("bm", login(
+        captcha_capture="/captcha/",
+        block={"enabled": True, "resource_types": ["Image", "Font"], "deny": ["*analytics*"]},
+    ))
+    rules = profile.block
+    assert not rules.should_block("https://example.com/captcha/get?t=1", "Image")
+    assert rules.should_block("https://example.com/logo.png", "Image")
+    assert rules.should_block("https://example.com/a.woff2", "Font")
+    assert rules.should_block("https://example.com/analytics.js", "Script")
+    assert not rules.should_block("https://example.com/app.js", "Script")
+
+
+def test_block_rules_image_allowed_in_dry_run_or_without_captcha():
+    block = {"enabled": True, "resource_types": ["Image"]}
+    assert compile_login_profile("bm", login(block={**block, "dry_run": True})).block.dry_run
+    assert compile_login_profile("bm", login(block=block, captcha_image="", captcha_input="")).block is not None
+    rules = compile_login_profile("bm", login(block={**block, "allow": ["*code*"]}, captcha_capture=["/img/"])).block
+    assert rules.allow == ("*code*", "*/img/*")
+
+
+def test_compile_profiles_collects_errors():
+    profiles, errors = compile_login_profiles({"login": {"bm": login(), "kw": login(ready_timeout="x")}})
+    assert list(profiles) == ["bm"]
+    assert "ready_timeout" in errors["kw"]
+
+
+def test_compile_does_not_import_numpy():
+    """编译登录配置（含预处理校验）不加载 NumPy，界面启动保持轻量"""
+    code = ("import sys; from util.login_profile import compile_login_profile; "
+            "compile_login_profile('bm', {'username': '#u', 'preprocess': [{'op': 'grayscale'}]}); "
+            "sys.exit('numpy' in sys.modules)")
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
@@ -0,0 +1,178 @@
+import io
+import subprocess
+import sys
+
+import pytest
+
+from util.ocr_helper import OcrResult, ResultCache, check_captcha_rules, decode_probability, vote_results
+
+CHARSET = ["", "A", "B", "1", "2"]
+
+
+def _row(idx, p, n=len(CHARSET)):
+    """一个时间步的概率分布：idx 处为 p，其余平分剩余概率"""
+    rest = (1.0 - p) / (n - 1)
+    return [p if i == idx else rest for i in range(n)]
+
+
+# "A A _ B 1 _ 2"：连续重复合并、空白符分隔
+STEPS = [_row(1, 0.6), _row(1, 0.9), _row(0, 0.8), _row(2, 0.7), _row(3, 0.95), _row(0, 0.9), _row(4, 0.5)]
+
+
+def test_decode_probability_legacy_format():
+    result = decode_probability({"charsets": CHARSET, "probability": STEPS})
+    assert result.text == "AB12"
+    assert result.char_confidences == pytest.approx([0.9, 0.7, 0.95, 0.5])
+    assert result.confidence == pytest.approx(0.5)
+
+
+def test_decode_probability_legacy_single_step():
+    # 只有一个时间步时 ddddocr 1.5.x 会 squeeze 成一维
+    result = decode_probability({"charsets": CHARSET, "probability": _row(2, 0.8)})
+    assert result.text == "B"
+    assert result.confidence == pytest.approx(0.8)
+
+
+def test_decode_probability_v16_format():
+    # ddddocr 1.6.x：完整 softmax 为 (时间步, 1, 字符)，text 已解码
+    prob = {"text": "AB12", "probabilities": [[row] for row in STEPS], "charset": CHARSET, "confidence": 0.8}
+    result = decode_probability(prob)
+    assert result.text == "AB12"
+    assert result.char_confidences == pytest.approx([0.9, 0.7, 0.95, 0.5])
+    assert result.confidence == pytest.approx(0.5)
+
+
+def test_decode_probability_v16_text_filtered_by_ranges():
+    # set_ranges 过滤掉字母后 text 只剩数字，置信度按顺序对齐到对应字符
+    prob = {"text": "12", "probabilities": [STEPS], "charset": CHARSET, "confidence": 0.8}
+    result = decode_probability(prob)
+    assert result.text == "12"
+    assert result.char_confidences == pytest.approx([0.95, 0.5])
+
+
+def test_decode_probability_v16_unaligned_uses_overall_confidence():
+    prob = {"text": "XY", "probabilities": [[row] for row in STEPS], "charset": CHARSET, "confidence": 0.42}
+    result = decode_probability(prob)
+    assert result.text == "XY"
+    assert result.confidence == pytest.approx(0.42)
+    assert result.char_confidences == []
+
+
+def test_decode_probability_unknown_format():
+    assert decode_probability({"result": "AB12"}) is None
+
+
+def test_check_captcha_rules():
+    result = OcrResult("ab12", 0.6)
+    assert check_captcha_rules(result, {}) is None
+    assert check_captcha_rules(None, {}) == "识别结果为空"
+    assert check_captcha_rules(OcrResult(""), {}) == "识别结果为空"
+    assert "长度" in check_captcha_rules(result, {"length": 5})
+    assert "字符" in check_captcha_rules(result, {"charset": "[0-9]+"})
+    assert check_captcha_rules(result, {"length": 4, "charset": "[0-9a-z]+"}) is None
+    assert "置信度" in check_captcha_rules(result, {"min_confidence": 0.8})
+    # 没有置信度时不按置信度拒绝
+    assert check_captcha_rules(OcrResult("ab12"), {"min_confidence": 0.8}) is None
+
+
+def test_vote_results():
+    voted = vote_results([OcrResult("ab12", 0.9), OcrResult("ab13", 0.6), OcrResult("ab12", 0.3)])
+    assert voted.text == "ab12"
+    assert voted.confidence == pytest.approx((0.9 + 0.3) / 3)
+    assert vote_results([None, OcrResult("")]) is None
+    # 无置信度按 0.5 计
+    assert vote_results([OcrResult("x"), OcrResult("y", 0.6)]).text == "y"
+
+
+def test_result_cache_lru_and_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("util.ocr_helper.time.monotonic", lambda: now[0])
+    cache = ResultCache(max_size=2, ttl=10)
+    cache.put(("a",), OcrResult("a"))
+    cache.put(("b",), OcrResult("b"))
+    assert cache.get(("a",)).text == "a"  # a 变为最近使用
+    cache.put(("c",), OcrResult("c"))  # 淘汰 b
+    assert cache.get(("b",)) is None
+    assert cache.get(("c",)).text == "c"
+    now[0] += 11
+    assert cache.get(("a",)) is None  # 已过期
+    assert cache.stats() == {"size": 1, "hits": 2, "misses": 2}
+
+
+def test_result_cache_discard_by_digest():
+    cache = ResultCache()
+    cache.put((b"img", "std", ""), OcrResult("ab12"))
+    cache.put((b"img", "beta", ""), OcrResult("ab12"))
+    cache.put((b"other", "std", ""), OcrResult("cd34"))
+    assert cache.discard(b"img") == 2
+    assert cache.get((b"img", "std", "")) is None
+    assert cache.get((b"other", "std", "")).text == "cd34"
+
+
+def test_result_cache_disabled():
+    cache = ResultCache(max_size=0)
+    cache.put(("a",), OcrResult("a"))
+    assert cache.get(("a",)) is None
+    assert ResultCache.digest(b"x") != ResultCache.digest(b"y")
+
+
+def test_recognize_with_installed_ddddocr():
+    """用实际安装的 ddddocr 识别：概率输出格式能被解析，结果与普通识别一致"""
+    ddddocr = pytest.importorskip("ddddocr")
+    Image = pytest.importorskip("PIL.Image")
+    from PIL import ImageDraw
+    from util.ocr_helper import CaptchaOcr
+
+    img = Image.new("RGB", (120, 40), "white")
+    ImageDraw.Draw(img).text((10, 10), "AB12", fill="black")
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    plain = ddddocr.DdddOcr(show_ad=False).classification(buf.getvalue())
+    result = CaptchaOcr(cache={"max_size": 0}).recognize(buf.getvalue())
+    assert (result.text if result else "") == plain.strip()
+
+
+def test_forget_drops_cached_result_of_submitted_image():
+    pytest.importorskip("ddddocr")
+    Image = pytest.importorskip("PIL.Image")
+    from util.ocr_helper import CaptchaOcr
+
+    buf = io.BytesIO()
+    Image.new("RGB", (100, 40), "white").save(buf, format="PNG")
+    ocr = CaptchaOcr()
+    ocr._classify = lambda image_bytes, key: OcrResult("ab12", 0.9)
+    result = ocr.recognize(buf.getvalue())
+    assert result.digest == ResultCache.digest(buf.getvalue())
+    assert ocr.cache_stats()["size"] == 1
+    ocr.forget(result)
+    assert ocr.cache_stats()["size"] == 0
+
+
+def test_session_options_applied_to_installed_ddddocr():
+    """ocr.runtime 设置需真正作用到 ddddocr 的推理会话，无法重建会话时抛出异常"""
+    pytest.importorskip("ddddocr")
+    from util.ocr_helper import ModelKey, ModelPool
+
+    pool = ModelPool(runtime={"intra_op_num_threads": 3})
+    ocr = pool.get(ModelKey())
+    engine = getattr(ocr, "ocr_engine", None)
+    session = engine.session if engine is not None else ocr._DdddOcr__ort_session
+    assert session.get_session_options().intra_op_num_threads == 3
+    with pytest.raises(RuntimeError):
+        pool._apply_session_options(object())
+
+
+def test_worker_mode_keeps_onnxruntime_out_of_main_process():
+    """工作进程模式下主进程不创建模型池，也不加载 onnxruntime"""
+    pytest.importorskip("ddddocr")
+    code = (
+        "import sys\n"
+        "from util.ocr_helper import CaptchaOcr\n"
+        "ocr = CaptchaOcr(worker={'enabled': True}, runtime={'intra_op_num_threads': 1})\n"
+        "assert ocr.ready and ocr._worker is not None, 'worker not started'\n"
+        "print(ocr._pool is None, 'onnxruntime' in sys.modules)\n"
+        "ocr._worker.close()\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip().splitlines()[-1] == "True False"
@@ -0,0 +1,68 @@
+import pytest
+
+from util.ocr_worker import OcrWorkerClient
+
+
+class _Proc:
+    pid = 1
+    exitcode = None
+
+    def __init__(self, **kwargs):
+        self.alive = False
+
+    def start(self):
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def kill(self):
+        self.alive = False
+
+    def join(self, timeout=None):
+        pass
+
+
+class _Conn:
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.last = None
+
+    def send(self, msg):
+        self.last = msg
+
+    def poll(self, timeout):
+        self.ctx.polls.append(timeout)
+        return self.ctx.replies.pop(0)
+
+    def recv(self):
+        return self.last[0], True, "pong", 0.0, 0.0
+
+    def close(self):
+        pass
+
+
+class _Ctx:
+    """代替 multiprocessing 上下文：不启动真实进程，按 replies 决定每次请求是否按时回复"""
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.polls = []
+
+    def Pipe(self):
+        return _Conn(self), _Conn(self)
+
+    def Process(self, **kwargs):
+        return _Proc(**kwargs)
+
+
+def test_restarted_worker_gets_start_timeout():
+    """超时重启后的新进程仍在加载模型，下一次请求使用 start_timeout；收到回复后恢复普通超时"""
+    client = OcrWorkerClient({}, timeout=10, start_timeout=60)
+    client._ctx = _Ctx([True, False, True, True])
+    client.start()
+    with pytest.raises(RuntimeError, match="超时"):
+        client.call("ping")
+    assert client.restarts == 1
+    client.call("ping")
+    client.call("ping")
+    assert [round(t) for t in client._ctx.polls] == [60, 10, 60, 10]
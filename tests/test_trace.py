@@ -0,0 +1,26 @@
+from util.stats import percentile
+from util.trace import NULL_TRACE, AttemptTrace
+
+
+def test_null_trace_yields_fresh_attrs():
+    with NULL_TRACE.span("ocr") as attrs:
+        attrs["text"] = "ab12"
+    with NULL_TRACE.span("ocr") as attrs:
+        assert attrs == {}
+
+
+def test_attempt_trace_records_span_attrs():
+    trace = AttemptTrace("bm")
+    with trace.span("captcha", source="src()") as attrs:
+        attrs["ok"] = True
+    trace.set(outcome="submitted")
+    record = trace.to_record()
+    assert record["outcome"] == "submitted"
+    assert record["spans"][0]["name"] == "captcha"
+    assert record["spans"][0]["ok"] is True
+
+
+def test_percentile():
+    assert percentile([], 50) == 0.0
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile(list(range(1, 101)), 95) == 95
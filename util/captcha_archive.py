@@ -0,0 +1,123 @@
+"""
+验证码图片归档（后台写盘）
+
+识别流程只把 (图片字节, 元数据) 放入有界队列，由后台线程写入 IMG_DIR/captcha_archive：
+最近 max_files 张循环覆盖（captcha_000.png ~ captcha_NNN.png），
+每张图片旁有同名 JSON 记录识别文本、置信度、获取方式与校验结果。
+队列满（磁盘慢）时直接丢弃并计数，绝不阻塞登录流程。
+"""
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional
+
+_IMAGE_EXTS = ((b"\x89PNG", ".png"), (b"\xff\xd8", ".jpg"), (b"GIF8", ".gif"), (b"BM", ".bmp"), (b"RIFF", ".webp"))
+
+
+def _image_ext(data: bytes) -> str:
+    for magic, ext in _IMAGE_EXTS:
+        if data.startswith(magic):
+            return ext
+    return ".bin"
+
+
+class CaptchaArchive:
+    def __init__(self, directory: str, max_files: int = 50, queue_size: int = 16):
+        """
+        Args:
+            directory: 归档目录
+            max_files: 保留的最近图片数（环形覆盖）
+            queue_size: 待写队列上限，满时丢弃新图片
+        """
+        self.directory = directory
+        self.max_files = max(1, int(max_files))
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._seq = self._next_seq()
+        self._lock = threading.Lock()
+        self._stats = {"written": 0, "dropped": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, name="captcha-archive", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls, directory: str, config: Optional[Dict[str, Any]] = None) -> Optional["CaptchaArchive"]:
+        """按 app_config.json 的 archive 配置创建，未启用返回 None"""
+        cfg = config or {}
+        if not cfg.get("enabled", True):
+            return None
+        return cls(directory, max_files=cfg.get("max_files", 50), queue_size=cfg.get("queue_size", 16))
+
+    def _next_seq(self) -> int:
+        """从已有 JSON 记录中找到最大序号，重启后接着写而不是从头覆盖"""
+        last = -1
+        for path in glob.glob(os.path.join(self.directory, "captcha_*.json")):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    last = max(last, int(json.load(f).get("seq", -1)))
+            except Exception:
+                continue
+        return last + 1
+
+    def submit(self, data: bytes, **meta: Any) -> bool:
+        """
+        放入待写队列（不阻塞），队列满时丢弃
+        meta: 写入 JSON 的字段，如 text、confidence、source、outcome、mode
+        """
+        if not data:
+            return False
+        try:
+            self._queue.put_nowait((data, meta, time.time()))
+            return True
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+            return False
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self._write(*item)
+                with self._lock:
+                    self._stats["written"] += 1
+            except Exception as e:
+                with self._lock:
+                    self._stats["errors"] += 1
+                print(f"[归档] 验证码图片写入失败: {e}")
+
+    def _write(self, data: bytes, meta: Dict[str, Any], created: float) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        seq = self._seq
+        self._seq += 1
+        base = os.path.join(self.directory, f"captcha_{seq % self.max_files:03d}")
+        # 同一槽位上一轮的图片扩展名可能不同，先清掉
+        for old in glob.glob(base + ".*"):
+            os.remove(old)
+        image_path = base + _image_ext(data)
+        with open(image_path, "wb") as f:
+            f.write(data)
+        record = {
+            "seq": seq,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created)),
+            "image": os.path.basename(image_path),
+            "size": len(data),
+            **meta,
+        }
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "pending": self._queue.qsize()}
+
+    def close(self, timeout: float = 2) -> None:
+        """通知后台线程写完队列中已有的图片后退出"""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
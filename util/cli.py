@@ -0,0 +1,100 @@
+"""
+命令行登录（不导入 Tk）
+
+与 GUI 共用 LoginEngine：账号、密码、浏览器等默认读取 config/user_data.json，可用参数覆盖；
+每次登录尝试向 stdout 输出一行 JSON（结果与分阶段耗时），日志输出到 stderr。
+
+    python -m util.cli                               # 按 user_data.json 的模式登录一次
+    python -m util.cli --mode kw --attempts 5 --headless
+    python -m util.cli --account 123 --password *** --url https://... --quiet
+"""
+import argparse
+import json
+import sys
+import time
+from typing import List, Optional
+
+from .config_store import load_app_config, load_user_data
+from .login_engine import LOG_LEVELS, LoginEngine, LoginInputs
+
+# 视为成功的结果：已提交；未开启自动识别时只填写不提交
+SUCCESS_OUTCOMES = ("submitted", "filled")
+
+
+def make_logger(level: str):
+    """按级别过滤的 stderr 日志"""
+    threshold = LOG_LEVELS.get(level, LOG_LEVELS["info"])
+
+    def log(msg: str, level: str = "info") -> None:
+        if LOG_LEVELS.get(level, LOG_LEVELS["info"]) >= threshold:
+            print(f"{time.strftime('%H:%M:%S')} - {msg}", file=sys.stderr, flush=True)
+    return log
+
+
+def build_inputs(args: argparse.Namespace, user_data: dict, mode: str) -> LoginInputs:
+    """user_data.json 为默认值，命令行参数覆盖"""
+    inputs = LoginInputs.from_user_data(user_data)
+    if args.account is not None:
+        inputs.account = args.account
+    if args.password is not None:
+        inputs.password = args.password
+    if args.serial is not None:
+        inputs.serial = args.serial
+    if args.browser is not None:
+        inputs.browser = args.browser
+    if args.headless is not None:
+        inputs.headless = args.headless
+    if args.auto_ocr is not None:
+        inputs.auto_ocr = args.auto_ocr
+    if args.url:
+        inputs.urls[mode] = args.url
+    return inputs
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="命令行登录（与 GUI 共用登录流程，每次尝试输出一行 JSON）")
+    parser.add_argument("--mode", choices=("bm", "kw"), help="登录模式，默认使用 user_data.json 中的 mode")
+    parser.add_argument("--account", help="账号")
+    parser.add_argument("--password", help="密码")
+    parser.add_argument("--serial", help="序列号（考务）")
+    parser.add_argument("--url", help="登录URL，默认使用 app_config.json 中对应模式的 url")
+    parser.add_argument("--browser", choices=("chrome", "edge", "firefox"), help="浏览器类型")
+    parser.add_argument("--headless", action=argparse.BooleanOptionalAction, default=None, help="无头模式")
+    parser.add_argument("--auto-ocr", action=argparse.BooleanOptionalAction, default=None,
+                        help="自动识别验证码并提交（--no-auto-ocr 只填写不提交）")
+    parser.add_argument("--attempts", type=int, default=1, help="尝试次数（默认 1）")
+    parser.add_argument("--interval", type=float, help="两次尝试之间的间隔（秒），默认使用 loop_interval")
+    parser.add_argument("--log-level", default="info", choices=tuple(LOG_LEVELS), help="stderr 日志级别")
+    parser.add_argument("--quiet", action="store_true", help="不输出日志，只输出 JSON 结果")
+    args = parser.parse_args(argv)
+
+    # 配置、浏览器、OCR 模块的 print 输出一并转到 stderr，stdout 只输出 JSON 结果
+    out, sys.stdout = sys.stdout, sys.stderr
+    user_data = load_user_data()
+    app_config = load_app_config()
+    mode = args.mode or user_data.get("mode", "bm")
+    log = make_logger("error" if args.quiet else args.log_level)
+    engine = LoginEngine(app_config, build_inputs(args, user_data, mode), log=log, collect_timings=True)
+    interval = args.interval if args.interval is not None else float(app_config.get("loop_interval", 1))
+
+    succeeded = 0
+    try:
+        for i in range(max(1, args.attempts)):
+            if i and interval > 0:
+                time.sleep(interval)
+            record = engine.single_attempt(mode)
+            record["attempt"] = i + 1
+            print(json.dumps(record, ensure_ascii=False), file=out, flush=True)
+            if record.get("outcome") in SUCCESS_OUTCOMES:
+                succeeded += 1
+    except KeyboardInterrupt:
+        log("收到中断，停止尝试。", "warn")
+    finally:
+        engine.log_ocr_stats()
+        engine.close()
+        sys.stdout = out
+    return 0 if succeeded else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,10 @@
+import atexit
+import copy
 import json
 import os
-from typing import Any, Dict
+import tempfile
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from .paths import USER_DATA_PATH, APP_CONFIG_PATH
 
@@ -16,6 +20,7 @@ DEFAULT_USER_DATA: Dict[str, Any] = {
     "kw_serial": "",  # 考务序列号
     "browser": "chrome",  # 浏览器类型：chrome | edge | firefox
     "loop_attemptsGUI": 100,  # GUI中的循环次数
+    "warmup": False,  # 启动后是否在后台预热OCR模型与浏览器
 }
 
 # 默认应用配置（选择器、URL等配置信息）
@@ -44,6 +49,36 @@ DEFAULT_APP_CONFIG: Dict[str, Any] = {
             "submit": {
                 "selector": ".register_btn",
                 "selector_type": "css"
+            },
+            "captcha_rules": {
+                "length": 0,  # 验证码期望长度，0 表示不限
+                "charset": "",  # 字符集正则（整体匹配），如 "[0-9a-zA-Z]+"，空表示不限
+                "min_confidence": 0,  # 最低置信度（0-1），0 表示不检查
+                "max_retries": 2,  # 未通过校验时原地刷新验证码重新识别的最大次数
+                "retry_budget": 6  # 刷新重识别的总时间预算（秒），0 表示不限
+            },
+            # 刷新验证码的触发元素（如“换一张”链接），为空时点击验证码图片
+            "captcha_refresh": "",
+            # 监听页面加载的图片响应，直接取验证码原始字节：true 监听所有图片，或验证码URL片段；false 关闭
+            "captcha_capture": True,
+            # 验证码识别前的预处理阶段（见 util/image_preprocess.py），空列表表示不处理
+            "preprocess": [],
+            # 限制 OCR 输出的字符（字符串，如 "0123456789"），null 表示不限制
+            "char_ranges": None,
+            # 页面就绪判定：readyState 达到 ready_state 且 ready_selectors 全部出现（为空时等待账号输入框）
+            "ready_state": "interactive",  # interactive | complete
+            "ready_selectors": [],
+            "ready_timeout": 10,  # 就绪等待的截止时间（秒）
+            # 一次脚本调用批量填写输入框并触发 input/change 事件；
+            # 个别需要模拟键入的输入框可在其选择器对象中设置 "typing": true
+            "batch_fill": True,
+            # 拦截非必要的页面资源：按资源类型或 deny 模式拦截，allow 模式与 captcha_capture 片段总是放行
+            "block": {
+                "enabled": False,
+                "dry_run": False,  # 只统计可拦截的请求与字节，不实际拦截
+                "resource_types": ["Font", "Media"],  # CDP 资源类型，如 Image、Stylesheet、Font、Media
+                "deny": [],  # URL 通配模式（* 与 ?），如 "*google-analytics*"
+                "allow": []  # 总是放行的 URL 通配模式，如验证码接口 "*captcha*"
             }
         },
         "kw": {
@@ -54,10 +89,97 @@ DEFAULT_APP_CONFIG: Dict[str, Any] = {
             "serial": "",
             "captcha_image": "",
             "captcha_input": "",
-            "submit": ""
+            "submit": "",
+            "captcha_rules": {"length": 0, "charset": "", "min_confidence": 0, "max_retries": 2, "retry_budget": 6},
+            "captcha_refresh": "",
+            "captcha_capture": True,
+            "preprocess": [],
+            "char_ranges": None,
+            "ready_state": "interactive",
+            "ready_selectors": [],
+            "ready_timeout": 10,
+            "batch_fill": True,
+            "block": {"enabled": False, "dry_run": False, "resource_types": ["Font", "Media"], "deny": [], "allow": []}
         }
     },
-    "loop_attempts": 3
+    "loop_attempts": 3,
+    "loop_interval": 1,  # 循环登录两次尝试之间的额外间隔（秒），每次提交后另会等待页面跳转或换图
+    # 外部编辑 app_config.json 后自动重新加载（按 mtime 与大小轮询，未变化时不读取文件）
+    "hot_reload": {
+        "enabled": True,
+        "interval_ms": 1000  # 检查间隔（毫秒）
+    },
+    # 启动预算（python main.py --profile-startup 检查），0 表示不检查该项
+    "startup": {
+        "import_budget_ms": 500,  # 模块导入总耗时
+        "window_budget_ms": 1500  # 从进程启动到窗口显示
+    },
+    # 验证码图片归档：后台写入 img/captcha_archive，保留最近 max_files 张并附 JSON 记录
+    "archive": {
+        "enabled": True,
+        "max_files": 50,  # 循环覆盖的图片数上限
+        "queue_size": 16  # 待写队列上限，磁盘慢导致队列满时丢弃新图片而不阻塞登录
+    },
+    # 界面日志：后台线程只写队列，界面按 tick_ms 批量刷新
+    "log": {
+        "level": "info",  # 界面显示的最低级别：debug | info | warn | error，更低级别只进内存历史与日志文件
+        "max_lines": 1000,  # 日志框最多保留的行数，超出时删除最旧的行
+        "tick_ms": 100,  # 刷新间隔（毫秒，最小 10）
+        "history": 2000,  # 内存中保留的全部级别日志条数
+        "file": ""  # 全部级别日志的追加写入文件（相对项目根目录），为空不写
+    },
+    # 登录尝试分阶段计时：每次尝试一行 JSON，汇总用 python -m util.trace
+    "trace": {
+        "enabled": False,
+        "path": "",  # 为空时使用 trace/attempts.jsonl
+        "max_bytes": 5242880,  # 单个文件上限，超过后轮转
+        "backups": 3  # 保留的轮转备份数
+    },
+    # 浏览器之外的 HTTP 请求（如验证码图片URL）：连接复用，携带浏览器 Cookie/UA
+    "http": {
+        "connect_timeout": 3,  # 连接超时（秒）
+        "read_timeout": 10,  # 读取超时（秒）
+        "retries": 2,  # 连接错误与 429/5xx 的最大重试次数
+        "backoff": 0.2,  # 重试退避系数（秒）
+        "pool_size": 4  # 每个主机保持的连接数
+    },
+    # 浏览器进程：持久用户数据目录、连接已运行的浏览器、退出后保留进程
+    "browser_session": {
+        "address": "127.0.0.1:9222",  # 调试地址；edge 使用端口+1、firefox 使用端口+2
+        "attach": False,  # 只连接该地址上已运行的浏览器，不自行启动
+        "user_data_dir": "",  # 持久用户数据目录（相对项目根目录，按浏览器类型分子目录），为空使用 DrissionPage 默认临时目录
+        "keep_alive": True  # 切换浏览器或退出时保留浏览器进程，下次启动直接连接
+    },
+    # OCR 设置
+    "ocr": {
+        "pool_size": 4,  # 模型池最大实例数（按 beta/字符范围/自定义模型区分），超出按 LRU 淘汰
+        "custom_model": {
+            "onnx_path": "",  # 自定义 ONNX 模型路径（可选）
+            "charsets_path": ""  # 自定义模型字符集文件路径
+        },
+        "ensemble": {
+            "enabled": False,  # 多模型并发识别并按置信度加权投票
+            "models": ["std", "beta"]  # 参与投票的模型：std | beta | custom
+        },
+        "cache": {
+            "max_size": 64,  # 按图片内容哈希缓存识别结果的条目数，0 表示关闭
+            "ttl": 300  # 缓存有效期（秒）
+        },
+        "worker": {
+            "enabled": False,  # 在独立子进程中加载模型与推理，避免识别时界面卡顿
+            "timeout": 10,  # 单次识别超时（秒），超时后重启工作进程
+            "start_timeout": 60  # 工作进程启动并加载模型的超时（秒）
+        },
+        # onnxruntime 会话设置，空值（0 / "" / null）表示使用默认
+        "runtime": {
+            "intra_op_num_threads": 0,  # 单算子内并行线程数
+            "inter_op_num_threads": 0,  # 算子间并行线程数（仅 parallel 模式有效）
+            "graph_optimization_level": "",  # disable | basic | extended | all
+            "enable_mem_arena": None,  # CPU 内存池开关
+            "enable_mem_pattern": None,  # 内存复用模式开关
+            "execution_mode": ""  # sequential | parallel
+        }
+    }
 }
 
 
@@ -90,12 +212,29 @@ def _load_json(file_path: str, default_data: Dict[str, Any], file_name: str) ->
         return dict(default_data)
 
 
+def _atomic_write_json(file_path: str, data: Dict[str, Any]) -> None:
+    """原子写入：先写同目录临时文件并 fsync，再 rename 覆盖，崩溃时不会留下截断的 JSON"""
+    directory = os.path.dirname(file_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(file_path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
 def _save_json(file_path: str, data: Dict[str, Any]) -> None:
     """保存JSON文件"""
     try:
-        print(f"[配置] 正在保存配置到: {file_path}")
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        _atomic_write_json(file_path, data)
         print(f"[配置] 配置保存成功: {file_path}")
     except Exception as e:
         print(f"[配置] 配置保存失败: {e}，路径: {file_path}")
@@ -112,6 +251,40 @@ def _deep_merge(default: Dict[str, Any], got: Dict[str, Any]) -> Dict[str, Any]:
     return out
 
 
+def config_type_errors(config: Dict[str, Any], defaults: Dict[str, Any], skip: Tuple[str, ...] = (),
+                       prefix: str = "") -> List[str]:
+    """
+    按默认值的类型检查配置：数值需为非负数、开关需为 true/false、字符串/列表/对象类型一致
+    默认值为 null 的项与 skip 中的顶层键（如单独编译校验的 login）不检查
+
+    Returns:
+        错误信息列表，为空表示通过
+    """
+    errors = []
+    for key, default in defaults.items():
+        if key not in config or key in skip:
+            continue
+        value, name = config[key], f"{prefix}{key}"
+        if isinstance(default, bool):
+            if not isinstance(value, bool):
+                errors.append(f"{name} 需为 true/false: {value!r}")
+        elif isinstance(default, (int, float)):
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                errors.append(f"{name} 需为非负数: {value!r}")
+        elif isinstance(default, str):
+            if not isinstance(value, str):
+                errors.append(f"{name} 需为字符串: {value!r}")
+        elif isinstance(default, list):
+            if not isinstance(value, list):
+                errors.append(f"{name} 需为列表: {value!r}")
+        elif isinstance(default, dict):
+            if not isinstance(value, dict):
+                errors.append(f"{name} 需为对象: {value!r}")
+            else:
+                errors += config_type_errors(value, default, prefix=f"{name}.")
+    return errors
+
+
 # ============ 辅助函数：解析选择器配置 ============
 
 def parse_selector_config(element_config: Any, default_selector_type: str) -> tuple[str, str]:
@@ -140,48 +313,195 @@ def parse_selector_config(element_config: Any, default_selector_type: str) -> tu
         return ("", default_selector_type)
 
 
+# ============ 内存配置与防抖写盘 ============
+
+class ConfigStore:
+    """
+    内存中的配置文件
+    首次访问时读取一次，之后的读取与修改都在内存中进行（锁保护）；
+    修改记录脏键，由后台定时器防抖（debounce 秒内无新修改）后原子写盘，调用方不等待文件 I/O；
+    check_reload 通过比较文件 mtime 与大小发现外部编辑，未变化时不读取文件
+    """
+    def __init__(self, path: str, defaults: Dict[str, Any], file_name: str, debounce: float = 0.5):
+        self.path = path
+        self.defaults = defaults
+        self.file_name = file_name
+        self.debounce = debounce
+        self._lock = threading.RLock()
+        self._data: Optional[Dict[str, Any]] = None
+        self._dirty: Set[str] = set()
+        self._timer: Optional[threading.Timer] = None
+        self._stat: Optional[Tuple[int, int]] = None  # 最近一次读/写后文件的 (mtime_ns, size)
+        self._saved: Dict[str, Any] = {}  # 最近一次读/写时文件的内容，用于判断外部修改了哪些键
+
+    def _file_stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _loaded(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = _deep_merge(self.defaults, _load_json(self.path, self.defaults, self.file_name))
+            self._stat = self._file_stat()
+            self._saved = copy.deepcopy(self._data)
+        return self._data
+
+    def get(self) -> Dict[str, Any]:
+        """当前配置的副本"""
+        with self._lock:
+            return copy.deepcopy(self._loaded())
+
+    def update(self, patch: Dict[str, Any]) -> Dict[str, Any]:
+        """深度合并到内存，有键值变化时安排写盘，返回合并后的副本"""
+        with self._lock:
+            current = self._loaded()
+            merged = _deep_merge(current, copy.deepcopy(patch))
+            changed = {k for k in patch if merged.get(k) != current.get(k)}
+            if changed:
+                self._data = merged
+                self._dirty.update(changed)
+                self._schedule()
+            return copy.deepcopy(self._data)
+
+    def replace(self, data: Dict[str, Any]) -> None:
+        """整体替换并安排写盘"""
+        with self._lock:
+            self._data = copy.deepcopy(data)
+            self._dirty.update(data.keys())
+            self._schedule()
+
+    def reload(self) -> Dict[str, Any]:
+        """丢弃内存副本，重新从文件读取（未写盘的修改会先写入）"""
+        self.flush()
+        with self._lock:
+            self._data = None
+            return copy.deepcopy(self._loaded())
+
+    def check_reload(self, validate: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None
+                     ) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+        """
+        检查文件是否被外部修改，修改过则重新解析、校验并整体替换内存中的配置
+        尚未写盘的修改（脏键）保留内存中的值；外部也修改了同一个键时打印冲突，以内存中的值为准
+        
+        Args:
+            validate: 校验函数，返回错误信息则拒绝本次修改（内存配置保持不变）
+        
+        Returns:
+            (新配置副本, 变化的顶层键)；文件未变化、解析或校验失败时返回 None
+        """
+        stat = self._file_stat()
+        with self._lock:
+            if self._data is None or stat is None or stat == self._stat:
+                return None
+            # 无论成功与否都记下本次状态，同一份有问题的文件不会被反复读取
+            self._stat = stat
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                got = json.load(f)
+            if not isinstance(got, dict):
+                raise ValueError("顶层必须是对象")
+        except Exception as e:
+            print(f"[配置] {self.file_name}已修改但解析失败，保持原配置: {e}")
+            return None
+        with self._lock:
+            new = _deep_merge(self.defaults, got)
+            saved, self._saved = self._saved, copy.deepcopy(new)
+            for key in self._dirty:
+                if key in self._data:
+                    if new.get(key) != saved.get(key) and new.get(key) != self._data[key]:
+                        print(f"[配置] {self.file_name}的 {key} 被外部修改，但与尚未保存的修改冲突，"
+                              f"保留未保存的修改（外部修改将被覆盖）")
+                    new[key] = copy.deepcopy(self._data[key])
+            error = validate(copy.deepcopy(new)) if validate else None
+            if error:
+                print(f"[配置] {self.file_name}已修改但校验失败，保持原配置: {error}")
+                return None
+            changed = sorted(k for k in set(new) | set(self._data) if new.get(k) != self._data.get(k))
+            self._data = new
+            print(f"[配置] {self.file_name}已重新加载，变化: {', '.join(changed) or '无'}")
+            return copy.deepcopy(new), changed
+
+    def _schedule(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.debounce, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self) -> None:
+        """立即写入未保存的修改"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            dirty, self._dirty = sorted(self._dirty), set()
+            data = copy.deepcopy(self._data)
+        # 写盘在锁外进行，期间的新修改会安排下一次写入
+        try:
+            _atomic_write_json(self.path, data)
+            with self._lock:
+                self._stat = self._file_stat()  # 自己写入的不算外部修改
+                self._saved = data
+            print(f"[配置] {self.file_name}已保存（{', '.join(dirty)}）")
+        except Exception as e:
+            print(f"[配置] {self.file_name}保存失败: {e}，路径: {self.path}")
+            with self._lock:
+                self._dirty.update(dirty)
+
+
+USER_DATA_STORE = ConfigStore(USER_DATA_PATH, DEFAULT_USER_DATA, "用户数据文件")
+APP_CONFIG_STORE = ConfigStore(APP_CONFIG_PATH, DEFAULT_APP_CONFIG, "应用配置文件")
+
+
+@atexit.register
+def flush_all() -> None:
+    """写入所有未保存的修改（程序退出时自动调用）"""
+    USER_DATA_STORE.flush()
+    APP_CONFIG_STORE.flush()
+
+
 # ============ 用户数据操作 ============
 
 def load_user_data() -> Dict[str, Any]:
     """加载用户数据"""
-    data = _load_json(USER_DATA_PATH, DEFAULT_USER_DATA, "用户数据文件")
-    return _deep_merge(DEFAULT_USER_DATA, data)
+    return USER_DATA_STORE.get()
 
 
 def save_user_data(data: Dict[str, Any]) -> None:
     """保存用户数据"""
-    _save_json(USER_DATA_PATH, data)
+    USER_DATA_STORE.replace(data)
 
 
 def update_user_data(patch: Dict[str, Any]) -> Dict[str, Any]:
-    """更新用户数据"""
-    current = load_user_data()
-    merged = _deep_merge(current, patch)
-    print(f"[配置] 更新用户数据项: {list(patch.keys())}")
-    save_user_data(merged)
-    return merged
+    """更新用户数据（内存中立即生效，后台写盘）"""
+    return USER_DATA_STORE.update(patch)
 
 
 # ============ 应用配置操作 ============
 
 def load_app_config() -> Dict[str, Any]:
     """加载应用配置"""
-    data = _load_json(APP_CONFIG_PATH, DEFAULT_APP_CONFIG, "应用配置文件")
-    return _deep_merge(DEFAULT_APP_CONFIG, data)
+    return APP_CONFIG_STORE.get()
 
 
 def save_app_config(config: Dict[str, Any]) -> None:
     """保存应用配置"""
-    _save_json(APP_CONFIG_PATH, config)
+    APP_CONFIG_STORE.replace(config)
 
 
 def update_app_config(patch: Dict[str, Any]) -> Dict[str, Any]:
-    """更新应用配置"""
-    current = load_app_config()
-    merged = _deep_merge(current, patch)
-    print(f"[配置] 更新应用配置项: {list(patch.keys())}")
-    save_app_config(merged)
-    return merged
+    """更新应用配置（内存中立即生效，后台写盘）"""
+    return APP_CONFIG_STORE.update(patch)
+
+
+def reload_app_config(validate: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None
+                      ) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+    """应用配置文件被外部修改时重新加载，见 ConfigStore.check_reload"""
+    return APP_CONFIG_STORE.check_reload(validate)
 
 
 # ============ 兼容性函数（向后兼容）============
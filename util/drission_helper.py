@@ -1,27 +1,101 @@
-from typing import Optional, Tuple
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
 
 from DrissionPage._configs.chromium_options import ChromiumOptions
 from DrissionPage._base.chromium import Chromium
-from selenium.webdriver.common.by import By
+
+from .http_client import HttpClient
+from .login_profile import BlockRules, Locator, resolve_locator
+from .paths import ROOT_DIR
+
+# 各浏览器类型使用的调试端口偏移，切换浏览器后不会连接到另一种浏览器
+PORT_OFFSETS = {"chrome": 0, "edge": 1, "firefox": 2}
+
+# 批量填写脚本：按定位元组查找输入框，用原生 value setter 赋值（兼容 React/Vue 等受控组件），
+# 再依次触发 input、change 事件；返回未能填写的字段下标。
+# 参数与返回值均为 JSON 字符串：run_js 不接受列表参数，返回数组时还会多一次 CDP 往返逐项读取
+_FILL_JS = """
+const items = JSON.parse(arguments[0]);
+const failed = [];
+function pick(by, sel) {
+    switch (by) {
+        case 'xpath':
+            return document.evaluate(sel, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        case 'css selector': return document.querySelector(sel);
+        case 'id': return document.getElementById(sel);
+        case 'name': return document.getElementsByName(sel)[0] || null;
+        case 'class name': return document.getElementsByClassName(sel)[0] || null;
+        case 'tag name': return document.getElementsByTagName(sel)[0] || null;
+    }
+    return null;
+}
+items.forEach(function (item, i) {
+    let el = null;
+    try { el = pick(item[0], item[1]); } catch (e) {}
+    if (!el || el.disabled || el.readOnly || !('value' in el)) { failed.push(i); return; }
+    const proto = Object.getPrototypeOf(el);
+    const desc = Object.getOwnPropertyDescriptor(proto, 'value');
+    if (desc && desc.set) { desc.set.call(el, item[2]); } else { el.value = item[2]; }
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    if (el.value !== item[2]) { failed.push(i); }
+});
+return JSON.stringify(failed);
+"""
+
+
+def browser_running(address: str, timeout: float = 0.5) -> bool:
+    """调试地址上是否已有浏览器在运行（请求 /json/version）"""
+    from urllib.request import urlopen
+    try:
+        with urlopen(f"http://{address}/json/version", timeout=timeout) as resp:
+            return resp.status == 200
+    except (OSError, ValueError):
+        return False
+
+
+def fill_batch_args(fields: List[Tuple[Locator, str]]) -> str:
+    """批量填写脚本的参数：[[定位方式, 选择器, 值], ...] 序列化为 JSON 字符串"""
+    return json.dumps([[by, sel, value] for (by, sel), value in fields], ensure_ascii=False)
 
 
 class DrissionDriver:
-    def __init__(self, headless: bool = False, browser: str = "chrome"):
+    INPUT_ROUND_TRIPS = 3  # input() 每个字段约需的 CDP 往返次数（查找、清空、键入）
+
+    def __init__(self, headless: bool = False, browser: str = "chrome", http: Optional[dict] = None,
+                 session: Optional[dict] = None):
         """
         初始化浏览器驱动
+        调试地址上已有浏览器在运行时直接连接，否则启动新浏览器；start_path / start_ms 记录走了哪条路径及耗时
         
         Args:
-            headless: 是否无头模式
+            headless: 是否无头模式（连接已运行的浏览器时以该浏览器为准）
             browser: 浏览器类型，支持 "chrome", "edge", "firefox"
+            http: 浏览器外 HTTP 客户端配置（见 app_config.json 的 http）
+            session: 浏览器进程配置（见 app_config.json 的 browser_session）
         """
-        # 设置启动端口，静音
-        co = ChromiumOptions().set_address("127.0.0.1:9222").mute(True)
-        if headless:
+        cfg = session or {}
+        self.address = self._browser_address(cfg.get("address") or "127.0.0.1:9222", browser)
+        self.keep_alive = bool(cfg.get("keep_alive", True))
+        self.user_data_dir = ""
+        attach = bool(cfg.get("attach", False))
+        # 设置调试地址，静音
+        co = ChromiumOptions().set_address(self.address).mute(True)
+        if attach:
+            # 只连接已运行的浏览器；不设置无头，避免与运行中的浏览器不一致时被重启
+            co.existing_only(True)
+        elif headless:
             co.headless()
+        if cfg.get("user_data_dir"):
+            # 持久用户数据目录：缓存、Cookie、编译后的脚本在重启后保留
+            self.user_data_dir = os.path.join(ROOT_DIR, cfg["user_data_dir"], browser)
+            co.set_user_data_path(self.user_data_dir)
         
         # 根据浏览器类型设置浏览器路径
-        import os
-        
         if browser == "edge":
             # Edge浏览器的常见路径
             edge_paths = [
@@ -54,39 +128,363 @@ class DrissionDriver:
             # 如果找不到Firefox，会回退到默认浏览器
         # chrome是默认值，不需要特别设置
         
-        # 重新创建 Chromium 实例
+        # 连接或启动浏览器（先自行探测调试地址，不依赖 DrissionPage 的内部属性判断走了哪条路径）
+        start = time.perf_counter()
+        self.start_path = "attach" if browser_running(self.address) else "launch"
         self._chromium = Chromium(addr_or_opts=co)
+        self.start_ms = (time.perf_counter() - start) * 1000
+        print(f"[DrissionDriver] {self.describe_start()}")
         # 挂载dom后加载
         self._chromium.set.load_mode.normal()
         self.page = self._chromium.latest_tab
+        # 网络监听：捕获页面加载的图片响应体（URL -> bytes），验证码可直接取原始字节
+        self._capture_targets = None
+        self._captured: "OrderedDict[str, Tuple[int, bytes]]" = OrderedDict()  # URL -> (序号, 字节)
+        self._capture_seq = 0  # 已捕获的响应数，用于区分刷新/重新打开页面前后的同 URL 图片
+        self._capture_floor = 0  # 最近一次 goto 时的序号，之前捕获的图片属于旧页面
+        # 请求拦截：当前生效的规则与本次页面加载的统计（拦截回调在 CDP 事件线程中执行）
+        self._block: Optional[BlockRules] = None
+        self._load_lock = threading.Lock()
+        self._load_stats = self._empty_load_stats()
+        self._requests: dict = {}  # requestId -> (url, 资源类型)，等待 loadingFinished
+        self._resource_sizes: "OrderedDict[str, int]" = OrderedDict()  # URL -> 传输字节，估算拦截节省量
+        # 浏览器之外的请求共用的 HTTP 客户端（连接复用，携带当前标签页的 Cookie/UA）
+        self.http = HttpClient.from_config(self.page, http)
+
+    @staticmethod
+    def _browser_address(address: str, browser: str) -> str:
+        """按浏览器类型偏移调试端口"""
+        host, _, port = address.rpartition(":")
+        offset = PORT_OFFSETS.get(browser, 0)
+        if not host or not port.isdigit() or not offset:
+            return address
+        return f"{host}:{int(port) + offset}"
+
+    def describe_start(self) -> str:
+        """浏览器启动路径与耗时说明"""
+        if self.start_path == "attach":
+            text = f"已连接运行中的浏览器 {self.address}"
+        else:
+            text = f"已启动新浏览器 {self.address}"
+            if self.user_data_dir:
+                text += f"（用户数据目录 {self.user_data_dir}）"
+        return f"{text}，耗时 {self.start_ms:.0f}ms"
 
     def goto(self, url: str) -> None:
+        self._capture_floor = self.capture_mark()
+        with self._load_lock:
+            self._load_stats = self._empty_load_stats()
+            self._requests.clear()
         self.page.get(url)
 
-    def find(self, selector: str, selector_type: str = 'xpath', timeout: float = 5):
-        """查找元素，支持 css、xpath、class_name、id 等选择器类型"""
-        if selector_type == 'css':
-            return self.page.ele((By.CSS_SELECTOR, selector), timeout=timeout)
-        elif selector_type == 'class_name' or selector_type == 'class':
-            return self.page.ele((By.CLASS_NAME, selector), timeout=timeout)
-        elif selector_type == 'id':
-            return self.page.ele((By.ID, selector), timeout=timeout)
-        elif selector_type == 'name':
-            return self.page.ele((By.NAME, selector), timeout=timeout)
-        elif selector_type == 'tag':
-            return self.page.ele((By.TAG_NAME, selector), timeout=timeout)
-        else:
-            # 默认使用 xpath
-            return self.page.ele((By.XPATH, selector), timeout=timeout)
+    RESOURCE_SIZES_MAX = 512  # 最多记住的资源大小数
+
+    @staticmethod
+    def _empty_load_stats() -> dict:
+        return {"blocked": 0, "blocked_bytes": 0, "blocked_unknown": 0, "blocked_types": {},
+                "loaded": 0, "loaded_bytes": 0}
+
+    def set_blocking(self, rules: Optional[BlockRules]) -> bool:
+        """
+        按规则拦截页面请求（需在打开页面前调用），rules 为 None 时关闭
+        只有候选请求（规则中的资源类型、deny 模式）经过拦截回调；dry_run 时只统计不拦截
+        """
+        if rules == self._block:
+            return True
+        driver = self.page.driver
+        try:
+            if rules is None:
+                driver.set_callback("Fetch.requestPaused", None, immediate=True)
+                driver.set_callback("Network.responseReceived", None)
+                driver.set_callback("Network.loadingFinished", None)
+                self.page.run_cdp("Fetch.disable")
+                self.page.run_cdp("Network.disable")
+            else:
+                # Network 事件用于统计实际加载量，并记住各资源大小以估算拦截节省的字节
+                driver.set_callback("Network.responseReceived", self._on_response)
+                driver.set_callback("Network.loadingFinished", self._on_loading_finished)
+                self.page.run_cdp("Network.enable")
+                if rules.dry_run:
+                    driver.set_callback("Fetch.requestPaused", None, immediate=True)
+                    self.page.run_cdp("Fetch.disable")
+                else:
+                    driver.set_callback("Fetch.requestPaused", self._on_request_paused, immediate=True)
+                    self.page.run_cdp("Fetch.enable", patterns=rules.fetch_patterns())
+        except Exception as e:
+            print(f"[DrissionDriver] 设置请求拦截失败: {e}")
+            return False
+        self._block = rules
+        return True
+
+    def _count_blocked(self, url: str, resource_type: str, size: Optional[int]) -> None:
+        with self._load_lock:
+            st = self._load_stats
+            st["blocked"] += 1
+            st["blocked_types"][resource_type] = st["blocked_types"].get(resource_type, 0) + 1
+            if size is None:
+                st["blocked_unknown"] += 1
+            else:
+                st["blocked_bytes"] += size
 
-    def text(self, selector: str, selector_type: str = 'xpath', timeout: float = 5) -> Optional[str]:
+    def _on_request_paused(self, **params) -> None:
+        """Fetch.requestPaused：按规则拦截或放行（任何异常都放行，避免请求一直挂起）"""
+        request_id = params.get("requestId")
+        url = params.get("request", {}).get("url", "")
+        resource_type = params.get("resourceType", "Other")
+        rules = self._block
+        try:
+            if rules is not None and rules.should_block(url, resource_type):
+                self.page.driver.run("Fetch.failRequest", requestId=request_id, errorReason="BlockedByClient")
+                self._count_blocked(url, resource_type, self._resource_sizes.get(url))
+                return
+        except Exception:
+            pass
+        try:
+            self.page.driver.run("Fetch.continueRequest", requestId=request_id)
+        except Exception:
+            pass
+
+    def _on_response(self, **params) -> None:
+        with self._load_lock:
+            self._requests[params.get("requestId")] = (params.get("response", {}).get("url", ""),
+                                                       params.get("type", "Other"))
+
+    def _on_loading_finished(self, **params) -> None:
+        size = int(params.get("encodedDataLength") or 0)
+        with self._load_lock:
+            request = self._requests.pop(params.get("requestId"), None)
+            if request is None:
+                return
+            url, resource_type = request
+            self._load_stats["loaded"] += 1
+            self._load_stats["loaded_bytes"] += size
+            self._resource_sizes.pop(url, None)
+            self._resource_sizes[url] = size
+            while len(self._resource_sizes) > self.RESOURCE_SIZES_MAX:
+                self._resource_sizes.popitem(last=False)
+        rules = self._block
+        if rules is not None and rules.dry_run and rules.should_block(url, resource_type):
+            self._count_blocked(url, resource_type, size)
+
+    def load_stats(self) -> dict:
+        """
+        最近一次 goto 的请求统计（开启拦截后有效）：
+        blocked 拦截数（dry_run 时为可拦截数）、blocked_bytes 按已知大小估算的节省字节
+        （拦截的请求大小全部未知时为 None，表示无法估算而不是 0）、blocked_unknown 大小未知的拦截数、
+        blocked_types 按资源类型计数、loaded / loaded_bytes 实际加载量
+        资源大小只能从实际加载过的请求得知：本次会话中先以 dry_run 打开一次页面即可测量
+        """
+        with self._load_lock:
+            st = dict(self._load_stats)
+            st["blocked_types"] = dict(st["blocked_types"])
+        if st["blocked"] and st["blocked_unknown"] == st["blocked"]:
+            st["blocked_bytes"] = None
+        return st
+
+    CAPTURE_MAX = 16  # 最多保留的已捕获图片数
+
+    def start_capture(self, targets: Any = True) -> bool:
+        """
+        开始监听页面加载的图片响应（需在打开页面前调用），之后可用 captured_image 取原始字节
+        
+        Args:
+            targets: True 监听所有图片，或 URL 片段（字符串或列表）
+        """
+        if self._capture_targets == targets:
+            return True
+        try:
+            self.page.listen.start(targets=targets, res_type="Image")
+        except Exception as e:
+            print(f"[DrissionDriver] 启动网络监听失败: {e}")
+            return False
+        self._capture_targets = targets
+        self._captured.clear()
+        self._capture_floor = self._capture_seq
+        return True
+
+    def _drain_capture(self, timeout: float) -> None:
+        """取出监听队列中已到达的图片响应"""
+        deadline = time.monotonic() + timeout
+        while True:
+            # listen.wait 的 timeout 为 0/None 时会无限等待，这里至少给 10ms
+            packet = self.page.listen.wait(timeout=max(0.01, min(0.05, deadline - time.monotonic())))
+            if not packet:
+                return
+            try:
+                body = packet.response.body
+                if packet.response.status == 200 and isinstance(body, bytes) and body:
+                    self._capture_seq += 1
+                    self._captured.pop(packet.url, None)
+                    self._captured[packet.url] = (self._capture_seq, body)
+                    while len(self._captured) > self.CAPTURE_MAX:
+                        self._captured.popitem(last=False)
+            except Exception:
+                pass
+
+    def capture_mark(self) -> int:
+        """
+        当前捕获序号（先取出已到达的响应）；刷新验证码前记下，
+        之后用 captured_image(after=序号) 只取刷新后新到达的图片
+        """
+        if self._capture_targets is None:
+            return self._capture_seq
+        try:
+            self._drain_capture(0)
+        except Exception as e:
+            print(f"[DrissionDriver] 读取网络监听数据失败: {e}")
+        return self._capture_seq
+
+    def captured_image(self, url: Optional[str] = None, timeout: float = 0.5,
+                       after: Optional[int] = None) -> Optional[bytes]:
+        """
+        获取网络监听到的图片响应体：浏览器已加载的原始字节，不发起额外请求、不截图
+        只返回本次打开页面后、且序号大于 after 的响应，刷新后 src 不变时不会取到旧图片
+        
+        Args:
+            url: 图片地址（元素 src），为空时返回最近一张
+            timeout: 尚未捕获到时继续等待的时间（秒），超时返回 None，由调用方改用 src()
+            after: capture_mark() 返回的序号
+        """
+        if self._capture_targets is None:
+            return None
+        floor = max(self._capture_floor, after or 0)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self._drain_capture(0)
+            except Exception as e:
+                print(f"[DrissionDriver] 读取网络监听数据失败: {e}")
+                return None
+            for captured_url in reversed(self._captured):
+                seq, body = self._captured[captured_url]
+                if seq <= floor:
+                    break  # 按到达顺序存放，更早的都是旧图片
+                if not url or captured_url == url or captured_url.endswith(url):
+                    return body
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.05)
+
+    @staticmethod
+    def _poll(check: Callable[[], Any], timeout: float, interval: float = 0.05) -> bool:
+        """在截止时间前轮询 check，返回真值即成功；页面跳转中的脚本异常视为未就绪"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if check():
+                    return True
+            except Exception:
+                pass
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+
+    def wait_doc_ready(self, timeout: float = 10, state: str = "complete") -> bool:
+        """
+        等待 document.readyState 就绪
+        
+        Args:
+            timeout: 截止时间（秒）
+            state: "complete"（全部资源加载完成）或 "interactive"（DOM 解析完成即可）
+        """
+        accepted = ("interactive", "complete") if state == "interactive" else ("complete",)
+        return self._poll(lambda: self.page.run_js("return document.readyState") in accepted, timeout)
+
+    def wait_selectors(self, locators: List[Locator], timeout: float = 10) -> bool:
+        """等待所有定位元组对应的元素出现，共用一个截止时间"""
+        deadline = time.monotonic() + timeout
+        for locator in locators:
+            remaining = max(0.0, deadline - time.monotonic())
+            if not self.find(locator, timeout=remaining):
+                return False
+        return True
+
+    def wait_attr_change(self, selector: str | Locator, attr: str, old_value: Optional[str],
+                         selector_type: str = 'xpath', timeout: float = 2) -> bool:
+        """等待元素属性值不同于 old_value（如刷新验证码后 src 变化）"""
+        return self._poll(lambda: self.get_attr(selector, attr, selector_type, timeout=0.2) != old_value, timeout)
+
+    def wait_image_loaded(self, selector: str | Locator, selector_type: str = 'xpath', timeout: float = 5) -> bool:
+        """等待图片元素加载并解码完成（complete 且 naturalWidth > 0）"""
+        deadline = time.monotonic() + timeout
+        ele = self.find(selector, selector_type, timeout)
+        if not ele:
+            return False
+        return self._poll(lambda: ele.run_js("return this.complete && this.naturalWidth > 0"),
+                          max(0.0, deadline - time.monotonic()))
+
+    def wait_image_changed(self, selector: str | Locator, old_src: Optional[str], old_content: Any = None,
+                           selector_type: str = 'xpath', timeout: float = 3) -> bool:
+        """
+        等待图片更新并加载完成：src 属性变化，或 src 不变但图片内容（src() 返回的字节）变化
+        old_content 为 None 时只比较 src 属性
+        """
+        deadline = time.monotonic() + timeout
+
+        def changed():
+            ele = self.find(selector, selector_type, timeout=0.2)
+            if not ele:
+                return False
+            if ele.attr("src") != old_src:
+                return True
+            if old_content is None:
+                return False
+            content = ele.src(timeout=0.2, base64_to_bytes=True)
+            return bool(content) and content != old_content
+
+        if not self._poll(changed, timeout, interval=0.1):
+            return False
+        return self.wait_image_loaded(selector, selector_type, max(0.0, deadline - time.monotonic()))
+
+    def page_state(self, img: Optional[Locator] = None) -> Tuple[str, Optional[str], int]:
+        """提交前记下页面状态：(当前URL, 验证码图片 src, 网络捕获序号)，供 wait_page_changed 比较"""
+        src = self.get_attr(img, "src", timeout=0.5) if img else None
+        return self.page.url, src, self.capture_mark()
+
+    def wait_page_changed(self, state: Tuple[str, Optional[str], int], img: Optional[Locator] = None,
+                          timeout: float = 5) -> Optional[str]:
+        """
+        提交后等待页面作出响应，返回变化原因，超时返回 None：
+        "navigated" 已跳转（URL 变化或验证码元素消失），"captcha" 验证码已刷新
+        （src 变化，或 src 不变但网络监听到了新的验证码图片）
+        """
+        old_url, old_src, mark = state
+        reason = []
+
+        def changed():
+            if self.page.url != old_url:
+                reason.append("navigated")
+                return True
+            if img is None:
+                return False
+            ele = self.find(img, timeout=0.2)
+            if not ele:
+                reason.append("navigated")
+                return True
+            src = ele.attr("src")
+            if src != old_src or (src and self.captured_image(src, timeout=0, after=mark)):
+                reason.append("captcha")
+                return True
+            return False
+
+        return reason[-1] if self._poll(changed, timeout, interval=0.1) else None
+
+    def find(self, selector: str | Locator, selector_type: str = 'xpath', timeout: float = 5):
+        """
+        查找元素，支持 css、xpath、class_name、id 等选择器类型
+        selector 也可以是预先解析好的定位元组（见 login_profile.resolve_locator），此时忽略 selector_type
+        """
+        locator = selector if isinstance(selector, tuple) else resolve_locator(selector, selector_type)
+        return self.page.ele(locator, timeout=timeout)
+
+    def text(self, selector: str | Locator, selector_type: str = 'xpath', timeout: float = 5) -> Optional[str]:
         ele = self.find(selector, selector_type, timeout)
         if not ele:
             return None
         value = (ele.text or '').strip()
         return value
 
-    def input(self, selector: str, value: str, selector_type: str = 'xpath', clear: bool = True, timeout: float = 5) -> bool:
+    def input(self, selector: str | Locator, value: str, selector_type: str = 'xpath', clear: bool = True, timeout: float = 5) -> bool:
         """输入文本到元素"""
         ele = self.find(selector, selector_type, timeout)
         if not ele:
@@ -103,7 +501,26 @@ class DrissionDriver:
             print(f"[DrissionDriver] 输入失败 {selector} ({selector_type}): {e}")
             return False
 
-    def click(self, selector: str, selector_type: str = 'xpath', timeout: float = 5) -> bool:
+    def fill_batch(self, fields: List[Tuple[Locator, str]]) -> List[int]:
+        """
+        一次脚本调用填写多个输入框，并触发页面依赖的 input/change 事件
+        
+        Args:
+            fields: [(定位元组, 值), ...]
+        
+        Returns:
+            未能填写的字段下标（元素不存在、不可写或脚本执行失败），由调用方逐个回退到 input()
+        """
+        if not fields:
+            return []
+        try:
+            failed = self.page.run_js(_FILL_JS, fill_batch_args(fields))
+            return [int(i) for i in json.loads(failed or "[]")]
+        except Exception as e:
+            print(f"[DrissionDriver] 批量填写失败: {e}")
+            return list(range(len(fields)))
+
+    def click(self, selector: str | Locator, selector_type: str = 'xpath', timeout: float = 5) -> bool:
         ele = self.find(selector, selector_type, timeout)
         if not ele:
             return False
@@ -133,24 +550,23 @@ class DrissionDriver:
                     else:
                         # 备用方案：在页面中心双击
                         self.page.actions.click().click()
-                except:
-                    # 最终备用方案：直接执行双击动作
-                    try:
-                        self.page.actions.click().click()
-                    except:
-                        pass
+                except Exception as e:
+                    # 最终备用方案：直接执行双击动作，再失败由外层记录
+                    print(f"[DrissionDriver] 在 body 上双击失败，改为直接双击: {e}")
+                    self.page.actions.click().click()
             return True
         except Exception as e:
-            # 静默处理错误，不影响流程
+            # 不影响流程，只打印原因
+            print(f"[DrissionDriver] 双击失败: {e}")
             return False
 
-    def get_attr(self, selector: str, attr: str, selector_type: str = 'xpath', timeout: float = 5) -> Optional[str]:
+    def get_attr(self, selector: str | Locator, attr: str, selector_type: str = 'xpath', timeout: float = 5) -> Optional[str]:
         ele = self.find(selector, selector_type, timeout)
         if not ele:
             return None
         return ele.attr(attr)
 
-    def get_src(self, selector: str, selector_type: str = 'xpath', timeout: float = 5, base64_to_bytes: bool = True) -> Optional[str | bytes]:
+    def get_src(self, selector: str | Locator, selector_type: str = 'xpath', timeout: float = 5, base64_to_bytes: bool = True) -> Optional[str | bytes]:
         """
         获取元素的src属性资源
         base64格式可转为bytes返回，其它的以str返回
@@ -175,7 +591,7 @@ class DrissionDriver:
             print(f"[DrissionDriver] 获取src失败 {selector} ({selector_type}): {e}")
             return None
 
-    def capture_element_png(self, selector: str, selector_type: str = 'xpath', timeout: float = 5) -> Optional[bytes]:
+    def capture_element_png(self, selector: str | Locator, selector_type: str = 'xpath', timeout: float = 5) -> Optional[bytes]:
         ele = self.find(selector, selector_type, timeout)
         if not ele:
             return None
@@ -191,8 +607,8 @@ class DrissionDriver:
             key: 按键名称，如 'Escape', 'Enter', 'Tab' 等
         """
         try:
-            from selenium.webdriver.common.keys import Keys
-            # 将字符串转换为Keys常量
+            from DrissionPage.common import Keys
+            # 将按键名称转换为 DrissionPage 的 Keys 常量（不依赖 selenium）
             key_map = {
                 'Escape': Keys.ESCAPE,
                 'ESC': Keys.ESCAPE,
@@ -220,16 +636,20 @@ class DrissionDriver:
                 # 如果不是特殊键，直接使用原字符串
                 key_value = key
             
-            # 使用页面对象发送按键
-            self.page.key.press(key_value)
+            # 通过动作链发送按键（按下并抬起）
+            self.page.actions.type(key_value)
             return True
         except Exception as e:
             print(f"[DrissionDriver] 按键失败 {key}: {e}")
             return False
 
     def close(self) -> None:
+        """断开浏览器；keep_alive 时保留浏览器进程（下次启动直接连接），否则退出浏览器"""
+        self.http.close()
+        if self.keep_alive:
+            return
         try:
-            self.page.close()
+            self._chromium.quit()
         except Exception:
             pass
 
@@ -0,0 +1,114 @@
+"""
+浏览器会话感知的 HTTP 客户端
+
+浏览器之外的请求（如验证码图片URL）统一走这里：
+    - requests.Session + 连接池，复用 keep-alive 连接
+    - 请求前从 DrissionPage 标签页同步 Cookie、User-Agent，Referer 默认为当前页面
+    - 统一的连接/读取超时，对连接错误与 5xx/429 做有限次数的退避重试
+由 DrissionDriver 持有（driver.http）；没有浏览器时使用 default_client()。
+"""
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9',
+}
+
+
+class HttpClient:
+    def __init__(self, page=None, connect_timeout: float = 3, read_timeout: float = 10,
+                 retries: int = 2, backoff: float = 0.2, pool_size: int = 4):
+        """
+        Args:
+            page: DrissionPage 标签页，提供 Cookie/User-Agent/Referer；None 时不同步浏览器会话
+            connect_timeout / read_timeout: 连接与读取超时（秒）
+            retries: 连接错误与 429/5xx 的最大重试次数（仅 GET/HEAD）
+            backoff: 重试退避系数（秒）
+            pool_size: 每个主机保持的连接数
+        """
+        self.page = page
+        self.timeout: Tuple[float, float] = (float(connect_timeout), float(read_timeout))
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        retry = Retry(total=int(retries), backoff_factor=float(backoff),
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset({"GET", "HEAD"}), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=int(pool_size), pool_maxsize=int(pool_size), max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, page=None, config: Optional[Dict[str, Any]] = None) -> "HttpClient":
+        """按 app_config.json 的 http 配置创建"""
+        cfg = config or {}
+        return cls(page,
+                   connect_timeout=cfg.get("connect_timeout", 3),
+                   read_timeout=cfg.get("read_timeout", 10),
+                   retries=cfg.get("retries", 2),
+                   backoff=cfg.get("backoff", 0.2),
+                   pool_size=cfg.get("pool_size", 4))
+
+    def sync_from_page(self) -> int:
+        """从浏览器标签页同步 Cookie 与 User-Agent，返回同步的 Cookie 数"""
+        if self.page is None:
+            return 0
+        try:
+            cookies = self.page.cookies(all_domains=False)
+            user_agent = self.page.user_agent
+        except Exception as e:
+            print(f"[HTTP] 同步浏览器会话失败: {e}")
+            return 0
+        with self._lock:
+            for c in cookies:
+                self.session.cookies.set(c["name"], c["value"],
+                                         domain=c.get("domain", ""), path=c.get("path", "/"))
+            if user_agent:
+                self.session.headers["User-Agent"] = user_agent
+        return len(cookies)
+
+    def get(self, url: str, referer: Optional[str] = None, sync: bool = True, **kwargs) -> requests.Response:
+        """
+        GET 请求；sync=True 时先同步浏览器会话，referer 为空时使用当前页面地址
+        其余参数透传给 requests（未指定 timeout 时使用默认超时）
+        """
+        if sync:
+            self.sync_from_page()
+        if referer is None and self.page is not None:
+            try:
+                referer = self.page.url
+            except Exception:
+                referer = None
+        headers = dict(kwargs.pop("headers", None) or {})
+        if referer:
+            headers.setdefault("Referer", referer)
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, headers=headers, **kwargs)
+
+    def get_bytes(self, url: str, **kwargs) -> bytes:
+        """GET 并返回响应体，非 2xx 时抛出 requests.HTTPError"""
+        resp = self.get(url, **kwargs)
+        resp.raise_for_status()
+        return resp.content
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_default_client: Optional[HttpClient] = None
+_default_lock = threading.Lock()
+
+
+def default_client() -> HttpClient:
+    """不绑定浏览器的共享客户端（基准测试等无浏览器场景）"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
@@ -0,0 +1,245 @@
+"""
+验证码图片预处理（NumPy 向量化实现）
+
+在取得图片字节与 OCR 识别之间执行，按站点配置的阶段依次处理：
+    grayscale     灰度化
+    threshold     自适应阈值二值化（局部均值，积分图计算）
+    remove_lines  去除细干扰线（厚度不超过 max_width 的横/竖/斜线段）
+    despeckle     去除噪点（3x3 邻域内深色邻居少于 min_neighbors 的深色像素）
+    crop          裁剪（固定 box 或按深色像素自动裁剪）
+    resize        缩放（最近邻，按 scale 或目标 height）
+    invert        反色
+
+配置示例（app_config.json 中 login.<模式>.preprocess）：
+    [
+      {"op": "grayscale"},
+      {"op": "threshold", "block": 15, "offset": 10},
+      {"op": "remove_lines", "max_width": 1, "min_length": 10},
+      {"op": "despeckle", "min_neighbors": 2},
+      {"op": "crop", "auto": true, "margin": 2},
+      {"op": "resize", "height": 64}
+    ]
+"""
+import inspect
+import io
+import json
+import time
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple
+
+# NumPy / Pillow 在处理图片时才导入，编译登录配置时的 validate_stages 不加载
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def _to_gray(img: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+    if img.ndim == 2:
+        return img
+    rgb = img[..., :3].astype(np.float32)
+    return (rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)).astype(np.uint8)
+
+
+def _dark_mask(img: "np.ndarray") -> "np.ndarray":
+    """深色（前景）像素掩码；未二值化的灰度图按 128 划分"""
+    return _to_gray(img) < 128
+
+
+def _from_mask(mask: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+    return np.where(mask, 0, 255).astype(np.uint8)
+
+
+def grayscale(img: "np.ndarray") -> "np.ndarray":
+    return _to_gray(img)
+
+
+def threshold(img: "np.ndarray", block: int = 15, offset: float = 10) -> "np.ndarray":
+    """自适应阈值：像素比 block×block 邻域均值暗 offset 以上视为前景"""
+    import numpy as np
+    gray = _to_gray(img).astype(np.float64)
+    h, w = gray.shape
+    r = max(1, int(block) // 2)
+    padded = np.pad(gray, r, mode="edge")
+    integral = np.pad(padded.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    k = 2 * r + 1
+    total = (integral[k:k + h, k:k + w] - integral[:h, k:k + w]
+             - integral[k:k + h, :w] + integral[:h, :w])
+    mean = total / (k * k)
+    return _from_mask(gray < mean - offset)
+
+
+def _in_runs(mask: "np.ndarray", length: int, axis: int) -> "np.ndarray":
+    """沿 axis 方向处于长度 >= length 的连续深色段内的像素"""
+    import numpy as np
+    n = max(1, int(length))
+    m = np.moveaxis(mask, axis, 0).astype(np.int32)
+    if m.shape[0] < n:
+        return np.zeros_like(mask)
+    csum = np.concatenate([np.zeros((1,) + m.shape[1:], np.int32), m.cumsum(0)])
+    # full[i] 表示从 i 开始的 n 个像素全为深色
+    full = (csum[n:] - csum[:-n]) == n
+    covered = np.zeros(m.shape, dtype=bool)
+    for j in range(n):
+        covered[j:j + full.shape[0]] |= full
+    return np.moveaxis(covered, 0, axis)
+
+
+def remove_lines(img: "np.ndarray", max_width: int = 1, min_length: int = 10,
+                 direction: str = "both") -> "np.ndarray":
+    """
+    去除细干扰线
+    横线：竖直方向厚度 <= max_width 且水平方向连续长度 >= min_length
+    竖线：反之；斜线：两个方向厚度都 <= max_width（字符笔画一般更粗）
+    """
+    mask = _dark_mask(img)
+    thin_v = mask & ~_in_runs(mask, max_width + 1, axis=0)
+    thin_h = mask & ~_in_runs(mask, max_width + 1, axis=1)
+    lines = thin_v & thin_h
+    if direction in ("both", "horizontal"):
+        lines |= thin_v & _in_runs(thin_v, min_length, axis=1)
+    if direction in ("both", "vertical"):
+        lines |= thin_h & _in_runs(thin_h, min_length, axis=0)
+    return _from_mask(mask & ~lines)
+
+
+def despeckle(img: "np.ndarray", min_neighbors: int = 2) -> "np.ndarray":
+    """去除孤立噪点"""
+    import numpy as np
+    mask = _dark_mask(img)
+    p = np.pad(mask, 1).astype(np.uint8)
+    h, w = mask.shape
+    neighbors = sum(p[1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+                    for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx)
+    return _from_mask(mask & (neighbors >= int(min_neighbors)))
+
+
+def crop(img: "np.ndarray", box: List[int] = None, auto: bool = False, margin: int = 2) -> "np.ndarray":
+    """box=[left, top, right, bottom]；auto=True 时裁到深色像素外接框"""
+    import numpy as np
+    if box:
+        left, top, right, bottom = [int(v) for v in box]
+        return img[top:bottom, left:right]
+    if auto:
+        mask = _dark_mask(img)
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        if rows.size and cols.size:
+            h, w = mask.shape
+            top, bottom = max(0, rows[0] - margin), min(h, rows[-1] + 1 + margin)
+            left, right = max(0, cols[0] - margin), min(w, cols[-1] + 1 + margin)
+            return img[top:bottom, left:right]
+    return img
+
+
+def resize(img: "np.ndarray", scale: float = 0, height: int = 0) -> "np.ndarray":
+    """最近邻缩放"""
+    import numpy as np
+    h, w = img.shape[:2]
+    if height:
+        scale = float(height) / h
+    if not scale or scale == 1:
+        return img
+    nh, nw = max(1, int(round(h * scale))), max(1, int(round(w * scale)))
+    rows = np.minimum((np.arange(nh) / scale).astype(np.intp), h - 1)
+    cols = np.minimum((np.arange(nw) / scale).astype(np.intp), w - 1)
+    return img[rows[:, None], cols]
+
+
+def invert(img: "np.ndarray") -> "np.ndarray":
+    return 255 - img
+
+
+STAGES: Dict[str, Callable[..., "np.ndarray"]] = {
+    "grayscale": grayscale,
+    "threshold": threshold,
+    "remove_lines": remove_lines,
+    "despeckle": despeckle,
+    "crop": crop,
+    "resize": resize,
+    "invert": invert,
+}
+
+
+def _check_param(op: str, name: str, value: Any, default: Any) -> None:
+    """按阶段函数参数的默认值类型检查配置值"""
+    if isinstance(default, bool):
+        ok = isinstance(value, bool)
+    elif isinstance(default, (int, float)):
+        ok = isinstance(value, (int, float)) and not isinstance(value, bool)
+    elif isinstance(default, str):
+        ok = isinstance(value, str)
+    else:  # crop.box
+        ok = value is None or (isinstance(value, (list, tuple)) and len(value) == 4
+                               and all(isinstance(v, (int, float)) for v in value))
+    if not ok:
+        raise ValueError(f"预处理阶段 {op} 的参数 {name} 无效: {value!r}")
+
+
+def validate_stages(stages: Any) -> None:
+    """
+    校验阶段列表（阶段名、参数名与参数类型），不加载 NumPy，供编译登录配置时调用
+
+    Raises:
+        ValueError: 阶段或参数无效
+    """
+    if not isinstance(stages, (list, tuple)):
+        raise ValueError(f"预处理配置需为阶段列表: {stages!r}")
+    for stage in stages:
+        if isinstance(stage, str):
+            stage = {"op": stage}
+        if not isinstance(stage, Mapping):
+            raise ValueError(f"预处理阶段需为对象或阶段名: {stage!r}")
+        op = stage.get("op", "")
+        if op not in STAGES:
+            raise ValueError(f"未知的预处理阶段: {op}（可选: {', '.join(STAGES)}）")
+        params = list(inspect.signature(STAGES[op]).parameters.values())[1:]
+        defaults = {p.name: p.default for p in params}
+        for name, value in stage.items():
+            if name == "op":
+                continue
+            if name not in defaults:
+                raise ValueError(f"预处理阶段 {op} 不支持参数 {name}（可选: {', '.join(defaults) or '无'}）")
+            _check_param(op, name, value, defaults[name])
+        if op == "remove_lines" and stage.get("direction", "both") not in ("both", "horizontal", "vertical"):
+            raise ValueError(f"预处理阶段 remove_lines 的 direction 无效: {stage['direction']}")
+
+
+class Preprocessor:
+    """按配置的阶段列表处理图片字节，记录每个阶段耗时"""
+    def __init__(self, stages: List[Dict[str, Any]]):
+        self.stages: List[Tuple[str, Callable[..., "np.ndarray"], Dict[str, Any]]] = []
+        # 阶段配置的规范化字符串，用于区分不同预处理下的识别缓存
+        self.signature = json.dumps(list(stages or []), sort_keys=True, ensure_ascii=False, default=dict)
+        validate_stages(list(stages or []))
+        for stage in stages or []:
+            if isinstance(stage, str):
+                stage = {"op": stage}
+            op = stage.get("op", "")
+            params = {k: v for k, v in stage.items() if k != "op"}
+            self.stages.append((op, STAGES[op], params))
+
+    def __bool__(self) -> bool:
+        return bool(self.stages)
+
+    def run(self, image_bytes: bytes) -> Tuple[bytes, Dict[str, float]]:
+        """
+        Returns:
+            (处理后的 PNG 字节, {阶段名: 耗时ms})，耗时包含 decode/encode
+        """
+        import numpy as np
+        from PIL import Image
+
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        img = np.asarray(Image.open(io.BytesIO(image_bytes)).convert("RGB"))
+        timings["decode"] = (time.perf_counter() - start) * 1000
+        for i, (op, func, params) in enumerate(self.stages):
+            start = time.perf_counter()
+            img = func(img, **params)
+            timings[f"{i}.{op}"] = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        buf = io.BytesIO()
+        Image.fromarray(np.ascontiguousarray(img)).save(buf, format="PNG")
+        timings["encode"] = (time.perf_counter() - start) * 1000
+        return buf.getvalue(), timings
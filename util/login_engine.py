@@ -0,0 +1,758 @@
+"""
+登录流程引擎（不依赖 Tk）
+
+浏览器、OCR、登录配置与单次登录尝试的编排都在这里，GUI（main.App）与命令行（util.cli）
+共用同一个引擎，只各自提供输入（LoginInputs）与日志输出方式。
+"""
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from .config_store import DEFAULT_APP_CONFIG, config_type_errors, load_app_config, reload_app_config
+from .login_profile import LoginProfile, compile_login_profiles
+from .paths import IMG_DIR
+from .trace import NULL_TRACE, AttemptTrace, TraceWriter
+
+# 日志级别：低于 log.level 的日志只进入内存历史与日志文件，不显示在界面上
+LOG_LEVELS = {"debug": 10, "info": 20, "warn": 30, "error": 40}
+
+# 热加载后需要重新创建对象才生效的配置项
+RESTART_KEYS = ("ocr", "http", "archive", "browser_session")
+
+
+@dataclass
+class LoginInputs:
+    """前端提供的登录输入（GUI 的输入框/复选框，或命令行参数）"""
+    account: str = ""
+    password: str = ""
+    serial: str = ""
+    browser: str = "chrome"
+    headless: bool = False
+    auto_ocr: bool = True
+    urls: Dict[str, str] = field(default_factory=dict)  # 模式 -> 登录URL，为空时使用配置文件中的URL
+
+    @classmethod
+    def from_user_data(cls, user_data: Dict[str, Any]) -> "LoginInputs":
+        return cls(account=user_data.get("account", ""),
+                   password=user_data.get("password", ""),
+                   serial=user_data.get("kw_serial", ""),
+                   browser=user_data.get("browser", "chrome"),
+                   headless=bool(user_data.get("headless", False)),
+                   auto_ocr=bool(user_data.get("auto_ocr", True)))
+
+
+def print_log(msg: str, level: str = "info") -> None:
+    """默认日志：输出到 stderr（stdout 留给命令行的结果输出）"""
+    print(f"{time.strftime('%H:%M:%S')} - {msg}", file=sys.stderr)
+
+
+def mode_name(mode: str) -> str:
+    return '报名' if mode == 'bm' else '考务'
+
+
+class LoginEngine:
+    def __init__(self, app_config: Optional[Dict[str, Any]] = None, inputs: Optional[LoginInputs] = None,
+                 log: Callable[..., None] = print_log,
+                 on_ready: Optional[Callable[[str, str], None]] = None,
+                 on_reload: Optional[Callable[[List[str]], None]] = None,
+                 collect_timings: bool = False):
+        """
+        Args:
+            app_config: 应用配置，None 时从 app_config.json 读取
+            inputs: 登录输入，前端在每次操作前更新
+            log: 日志函数 log(msg, level="info")
+            on_ready: 浏览器/OCR 就绪状态回调 on_ready(名称, 状态)
+            on_reload: 配置热加载成功后的回调 on_reload(变化的顶层键)
+            collect_timings: 未启用 trace 文件时也记录分阶段耗时（用于命令行输出）
+        """
+        self.app_config = app_config if app_config is not None else load_app_config()
+        self.inputs = inputs or LoginInputs()
+        self.log = log
+        self._on_ready = on_ready
+        self._on_reload = on_reload
+        self.collect_timings = collect_timings
+
+        self.driver = None
+        self.current_browser = None  # 记录当前使用的浏览器类型
+        self.ocr = None
+        self._driver_lock = threading.Lock()  # 防止预热线程与按钮操作重复创建浏览器
+        self._ocr_lock = threading.Lock()
+        self._preprocessors = {}  # 模式 -> (LoginProfile, Preprocessor)
+        self._captcha_pool = None  # 验证码获取与识别的后台线程（与填写表单并行）
+        self._archive = None  # 验证码图片归档（后台写盘），首次使用时创建
+        self._archive_lock = threading.Lock()
+        self._filled_captcha = None  # 本次尝试填入的验证码识别结果（OcrResult）
+        self._submitted_digest = b""  # 上次提交的验证码图片哈希，再次读到同一张图片时先刷新
+        self.tracer = TraceWriter.from_config(self.app_config.get("trace"))  # 未启用时为 None
+        self._local = threading.local()  # 每个线程当前登录尝试的分阶段计时（见 trace 属性）
+        self.profiles: Dict[str, LoginProfile] = {}  # 模式 -> 编译后的 LoginProfile
+        self.profile_errors: Dict[str, str] = {}  # 模式 -> 配置错误信息
+        self._profiles_source = None  # 上次编译时 login 配置的快照
+        self.compile_profiles()
+        self._attempt_lock = threading.Lock()  # 登录尝试期间持有，配置热加载只在两次尝试之间进行
+        self._pending_config = None  # 登录尝试进行中收到的新配置，尝试结束后再替换
+        self._pending_lock = threading.Lock()
+        self.hot_reload = bool(self.app_config.get("hot_reload", {}).get("enabled", True))
+
+    def _set_ready(self, name: str, state: str) -> None:
+        if self._on_ready is not None:
+            self._on_ready(name, state)
+
+    @property
+    def trace(self):
+        """当前线程所属登录尝试的 AttemptTrace，不在尝试中时为 NULL_TRACE"""
+        return getattr(self._local, "trace", NULL_TRACE)
+
+    @trace.setter
+    def trace(self, trace) -> None:
+        self._local.trace = trace
+
+    # ---- 配置 ----
+
+    def set_app_config(self, app_config: Dict[str, Any]) -> None:
+        """
+        前端修改配置（如保存 URL）后替换，login 变化时重新编译
+        有登录尝试进行中时先暂存，等该次尝试结束后再替换，尝试过程中配置保持不变
+        """
+        with self._pending_lock:
+            self._pending_config = app_config
+        if self._attempt_lock.acquire(blocking=False):
+            try:
+                self._apply_pending_config()
+            finally:
+                self._attempt_lock.release()
+
+    def _apply_pending_config(self) -> None:
+        """替换暂存的配置（调用方需持有 _attempt_lock）"""
+        with self._pending_lock:
+            app_config, self._pending_config = self._pending_config, None
+        if app_config is not None:
+            self._apply_app_config(app_config)
+
+    def _apply_app_config(self, app_config: Dict[str, Any]) -> None:
+        self.app_config = app_config
+        self.compile_profiles()
+        self.tracer = TraceWriter.from_config(self.app_config.get("trace"))
+
+    def compile_profiles(self):
+        """login 配置变化时重新编译 LoginProfile，配置错误在加载时即报告"""
+        source = json.dumps(self.app_config.get("login", {}), sort_keys=True, ensure_ascii=False)
+        if source == self._profiles_source:
+            return
+        self.profiles, self.profile_errors = compile_login_profiles(self.app_config)
+        self._profiles_source = source
+        for mode, err in self.profile_errors.items():
+            print(f"[配置] login.{mode} 无效: {err}")
+
+    def get_profile(self, mode: str):
+        """获取当前模式编译后的登录配置，配置无效时记录日志并返回 None"""
+        profile = self.profiles.get(mode)
+        if profile is None:
+            err = self.profile_errors.get(mode, "未配置")
+            self.log(f"{mode_name(mode)}登录配置无效: {err}")
+        return profile
+
+    def _validate_app_config(self, config: dict):
+        """热加载校验：其余配置项的类型需与默认值一致，原本有效的登录配置不能变为无效"""
+        broken = config_type_errors(config, DEFAULT_APP_CONFIG, skip=("login",))
+        _, errors = compile_login_profiles(config)
+        broken += [f"login.{m}: {e}" for m, e in errors.items() if m in self.profiles]
+        return "; ".join(broken) or None
+
+    def reload_config_if_changed(self) -> bool:
+        """
+        app_config.json 被外部修改时重新加载并整体替换（调用方需持有 _attempt_lock）
+        文件未变化时只做一次 stat，不读取文件
+        """
+        result = reload_app_config(self._validate_app_config)
+        if result is None:
+            return False
+        app_config, changed = result
+        self._apply_app_config(app_config)
+        self.log(f"配置文件已重新加载，变化: {', '.join(changed) or '无'}")
+        later = [k for k in changed if k in RESTART_KEYS]
+        if later:
+            self.log(f"{', '.join(later)} 配置将在下次创建浏览器/OCR或重启后生效")
+        if self._on_reload is not None:
+            self._on_reload(changed)
+        return True
+
+    def poll_reload(self) -> None:
+        """定时检查配置文件；有登录尝试进行中时跳过，由下一次尝试开始前检查"""
+        if self._attempt_lock.acquire(blocking=False):
+            try:
+                self._apply_pending_config()
+                self.reload_config_if_changed()
+            except Exception as e:
+                self.log(f"配置热加载失败: {e}", level="error")
+            finally:
+                self._attempt_lock.release()
+
+    # ---- 浏览器与 OCR ----
+
+    def ensure_driver(self):
+        browser = self.inputs.browser
+        with self._driver_lock:
+            # 如果driver不存在，或者浏览器类型改变了，需要重新创建driver
+            if self.driver is None or self.current_browser != browser:
+                # 关闭旧的driver
+                if self.driver is not None:
+                    try:
+                        self.driver.close()
+                    except Exception:
+                        pass
+                # 懶加載，減少GUI啟動時間
+                from .drission_helper import DrissionDriver
+                with self.trace.span("driver_start", browser=browser) as attrs:
+                    self.driver = DrissionDriver(headless=self.inputs.headless, browser=browser,
+                                                 http=self.app_config.get("http"),
+                                                 session=self.app_config.get("browser_session"))
+                    attrs["path"] = self.driver.start_path
+                self.log(f"浏览器{self.driver.describe_start()}")
+                self.current_browser = browser
+                self._set_ready("浏览器", "就绪")
+            return self.driver
+
+    def ensure_ocr(self):
+        with self._ocr_lock:
+            if self.ocr is None:
+                # 懶加載OCR，避免導入大模型拖慢啟動
+                from .ocr_helper import CaptchaOcr
+                ocr_cfg = self.app_config.get("ocr", {})
+                self.ocr = CaptchaOcr(pool_size=int(ocr_cfg.get("pool_size", 4)),
+                                      custom_model=ocr_cfg.get("custom_model"),
+                                      ensemble=ocr_cfg.get("ensemble"),
+                                      cache=ocr_cfg.get("cache"),
+                                      worker=ocr_cfg.get("worker"),
+                                      runtime=ocr_cfg.get("runtime"))
+                self._set_ready("OCR", "就绪" if self.ocr.ready else "失败")
+            return self.ocr
+
+    def get_preprocessor(self, profile: LoginProfile):
+        """获取登录配置对应的验证码预处理器（配置重新编译时重建），未配置返回 None"""
+        if not profile.preprocess:
+            return None
+        cached = self._preprocessors.get(profile.mode)
+        if cached is None or cached[0] is not profile:
+            from .image_preprocess import Preprocessor
+            cached = (profile, Preprocessor(profile.preprocess))
+            self._preprocessors[profile.mode] = cached
+        return cached[1]
+
+    def log_ocr_stats(self, prefix: str = ""):
+        """输出OCR模型池与识别缓存统计（命中/未命中/构建耗时）"""
+        if self.ocr is None:
+            return
+        st = self.ocr.pool_stats()
+        self.log(f"{prefix}OCR模型池: 命中 {st['hits']} / 未命中 {st['misses']} / "
+                 f"淘汰 {st['evictions']} / 构建耗时 {st['build_time']:.2f}s")
+        cs = self.ocr.cache_stats()
+        self.log(f"{prefix}识别缓存: 命中 {cs['hits']} / 未命中 {cs['misses']} / 条目 {cs['size']}")
+        if self._archive is not None:
+            ar = self._archive.stats()
+            self.log(f"{prefix}验证码归档: 已写 {ar['written']} / 丢弃 {ar['dropped']} / "
+                     f"失败 {ar['errors']} / 待写 {ar['pending']}")
+
+    def close(self) -> None:
+        """关闭浏览器并写完待归档的验证码（命令行退出时调用）"""
+        if self._captcha_pool is not None:
+            self._captcha_pool.shutdown(wait=True)
+        if self.driver is not None:
+            try:
+                self.driver.close()
+            except Exception:
+                pass
+            self.driver = None
+        if self._archive is not None:
+            self._archive.close()
+
+    # ---- 页面 ----
+
+    def resolve_url(self, mode: str) -> str:
+        """登录URL：优先使用前端输入的URL，没有则从配置文件读取"""
+        url = (self.inputs.urls.get(mode) or "").strip()
+        if not url:
+            url = self.app_config.get("login", {}).get(mode, {}).get("url", "")
+        return url
+
+    def goto(self, drv, mode: str, url: str):
+        """
+        打开登录页；按配置先开启图片网络监听（直接取得验证码原始字节）
+        与非必要资源拦截，页面加载后报告拦截的请求数与节省的字节
+        """
+        profile = self.profiles.get(mode)
+        if profile is not None and profile.captcha_capture:
+            drv.start_capture(profile.captcha_capture)
+        block = profile.block if profile is not None else None
+        blocking = drv.set_blocking(block) and block is not None
+        with self.trace.span("goto") as span:
+            drv.goto(url)
+            if blocking:
+                stats = drv.load_stats()
+                span.update(blocked=stats["blocked"], blocked_bytes=stats["blocked_bytes"],
+                            loaded=stats["loaded"], loaded_bytes=stats["loaded_bytes"])
+        if blocking:
+            self.log_block_stats(stats, block.dry_run)
+
+    def log_block_stats(self, stats: dict, dry_run: bool = False) -> None:
+        """输出一次页面加载的拦截统计"""
+        if stats["blocked_bytes"] is None:
+            saved = "节省字节未知，可先用 dry_run 打开一次页面测量资源大小"
+        else:
+            saved = f"约 {stats['blocked_bytes'] / 1024:.0f}KB"
+            if stats["blocked_unknown"]:
+                saved += f"，另有 {stats['blocked_unknown']} 个大小未知"
+        types = "、".join(f"{t} {n}" for t, n in sorted(stats["blocked_types"].items(), key=lambda kv: -kv[1]))
+        action = "可拦截" if dry_run else "已拦截"
+        self.log(f"资源拦截：{action} {stats['blocked']} 个请求（{saved}）{'：' + types if types else ''}；"
+                 f"实际加载 {stats['loaded']} 个请求 {stats['loaded_bytes'] / 1024:.0f}KB")
+
+    def open_page_sync(self, mode: str) -> bool:
+        """在当前（后台）线程中启动浏览器并打开登录页"""
+        url = self.resolve_url(mode)
+        if not url:
+            self.log(f"请填写{mode_name(mode)}登录URL")
+            return False
+        self.log(f"正在打开{mode_name(mode)}登录页...")
+        self.goto(self.ensure_driver(), mode, url)
+        return True
+
+    def warm_page(self, mode: str) -> Optional[bool]:
+        """
+        预热浏览器：启动浏览器，已配置 URL 时同时打开登录页
+        与登录尝试共用 _attempt_lock，已有尝试在进行（用户先点了登录）时直接跳过
+
+        Returns:
+            None 跳过；True 已打开登录页；False 只启动了浏览器
+        """
+        if not self._attempt_lock.acquire(blocking=False):
+            return None
+        try:
+            if self.resolve_url(mode):
+                return self.open_page_sync(mode)
+            self.ensure_driver()
+            return False
+        finally:
+            self._attempt_lock.release()
+
+    def wait_page_ready(self, profile: LoginProfile) -> bool:
+        """
+        等待登录页可操作：document.readyState 达到 ready_state，且 ready_selectors 中的元素全部出现
+        未配置 ready_selectors 时等待账号输入框；整体不超过 ready_timeout 秒
+        """
+        timeout = profile.ready_timeout
+        deadline = time.monotonic() + timeout
+        start = time.perf_counter()
+        with self.trace.span("ready.doc", state=profile.ready_state):
+            ok = self.driver.wait_doc_ready(timeout, state=profile.ready_state)
+        if not ok:
+            self.log(f"页面在 {timeout:.0f}s 内未就绪")
+            return False
+        locators = [f.locator for f in profile.ready_selectors]
+        with self.trace.span("ready.selectors"):
+            ok = self.driver.wait_selectors(locators, max(0.0, deadline - time.monotonic()))
+        if not ok:
+            self.log(f"页面元素在 {timeout:.0f}s 内未出现: {[f.selector for f in profile.ready_selectors]}")
+            return False
+        self.log(f"页面已就绪，等待 {(time.perf_counter() - start) * 1000:.0f}ms", "debug")
+        return True
+
+    # ---- 填写表单 ----
+
+    def _field_values(self, mode: str) -> dict:
+        """各输入框要填写的值；序列号（考务模式）仅在开启自动识别验证码时输入"""
+        values = {
+            "username": self.inputs.account.strip(),
+            "password": self.inputs.password,
+        }
+        if mode == 'kw' and self.inputs.auto_ocr:
+            values["serial"] = self.inputs.serial.strip()
+        return values
+
+    def _fill_login_form(self, mode: str) -> bool:
+        self._filled_captcha = None
+        profile = self.get_profile(mode)
+        if profile is None:
+            return False
+
+        # 等待页面加载完成（按需等待，不再固定睡眠）
+        if not self.wait_page_ready(profile):
+            return False
+
+        # 验证码的获取与识别不依赖已输入的字段：页面就绪后立即在后台开始，与填写账号密码并行
+        start = time.perf_counter()
+        fill_done = threading.Event()
+        captcha_future = None
+        if self.inputs.auto_ocr and profile.has_captcha:
+            captcha_future = self._captcha_executor().submit(self._timed_captcha, profile, fill_done, self.trace)
+
+        # 按编译好的顺序输入账号、密码、序列号
+        try:
+            values = self._field_values(mode)
+            pairs = [(spec, values[spec.name]) for spec in profile.fill_fields if spec.name in values]
+            with self.trace.span("fill"):
+                ok = self._fill_fields(profile, pairs)
+            fill_ms = (time.perf_counter() - start) * 1000
+        finally:
+            fill_done.set()
+        if not ok:
+            if captcha_future:
+                captcha_future.exception()  # 等后台识别结束，避免与下一次尝试争用页面
+            return False
+        for spec, value in pairs:
+            if spec.name == "username":
+                self.log(f"已输入账号: {value}")
+            elif spec.name == "password":
+                self.log("已输入密码", "debug")
+            else:
+                self.log("已输入序列号", "debug")
+
+        # 处理验证码：等待后台识别结果后填入
+        if captcha_future:
+            result, captcha_ms = captcha_future.result()
+            total_ms = (time.perf_counter() - start) * 1000
+            self.log(f"阶段耗时: 填写 {fill_ms:.0f}ms / 验证码获取+识别 {captcha_ms:.0f}ms / "
+                     f"实际 {total_ms:.0f}ms（并行节省约 {max(0.0, fill_ms + captcha_ms - total_ms):.0f}ms）")
+            if result:
+                self.trace.set(captcha=result.text, confidence=result.confidence)
+                if not self._fill_fields(profile, [(profile.captcha_input, result.text)]):
+                    # 验证码没有填进去时提交只会被服务器拒绝
+                    self.log("验证码输入失败，本次不提交。")
+                    return False
+                self._filled_captcha = result
+                self.log(f"验证码识别并输入: {result.text}")
+            else:
+                # 未得到可信的验证码时不提交，避免白白消耗一次服务器往返
+                self.log("验证码识别失败，本次不提交。")
+                return False
+
+        return True
+
+    def _captcha_executor(self):
+        if self._captcha_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._captcha_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="captcha")
+        return self._captcha_pool
+
+    def _timed_captcha(self, profile: LoginProfile, fill_done: threading.Event, trace):
+        """后台识别验证码，计时记入发起线程的 trace，返回 (OcrResult 或 None, 耗时ms)"""
+        start = time.perf_counter()
+        self.trace = trace
+        try:
+            with trace.span("captcha") as attrs:
+                result = self._read_checked_captcha(profile, fill_done)
+                attrs["ok"] = result is not None
+        finally:
+            self.trace = NULL_TRACE
+        return result, (time.perf_counter() - start) * 1000
+
+    def _fill_fields(self, profile: LoginProfile, pairs: list) -> bool:
+        """
+        填写输入框：默认一次脚本调用批量填写并触发 input/change 事件，
+        批量填写失败或标记了 typing 的字段逐个模拟键入
+        pairs: [(FieldSpec, 值), ...]
+        """
+        batch = [(spec, value) for spec, value in pairs if not spec.typing] if profile.batch_fill else []
+        done = set()
+        if batch:
+            with self.trace.span("fill.batch", fields=[spec.name for spec, _ in batch]):
+                failed = set(self.driver.fill_batch([(spec.locator, value) for spec, value in batch]))
+            done = {spec.name for i, (spec, _) in enumerate(batch) if i not in failed}
+            if done:
+                saved = len(done) * self.driver.INPUT_ROUND_TRIPS - 1
+                self.log(f"批量填写 {len(done)} 个输入框，1 次脚本调用（约节省 {saved} 次往返）", "debug")
+        for spec, value in pairs:
+            if spec.name in done:
+                continue
+            with self.trace.span(f"fill.{spec.name}"):
+                ok = self.driver.input(spec.locator, value)
+            if not ok:
+                self.log(f"{spec.label}定位失败。选择器: {spec.describe()}")
+                return False
+        return True
+
+    # ---- 验证码 ----
+
+    def _read_checked_captcha(self, profile: LoginProfile, fill_done: threading.Event = None):
+        """
+        识别验证码并按站点规则（长度/字符集/最低置信度）本地校验
+        不通过时原地刷新验证码（账号密码保持已填写）并重新识别，
+        最多 max_retries 次，且总耗时不超过 retry_budget 秒
+        fill_done: 与填写表单并行时，刷新验证码（点击）前等待填写结束，避免抢走输入焦点
+        """
+        from .ocr_helper import check_captcha_rules
+
+        rules = profile.captcha_rules
+        retries = max(0, int(rules.get("max_retries", 0) or 0))
+        budget = float(rules.get("retry_budget", 0) or 0)
+        deadline = time.monotonic() + budget if budget > 0 else None
+        mark = None  # 刷新前的网络捕获序号，刷新后只接受新到达的图片
+        for attempt in range(retries + 1):
+            result, data, source = self._get_captcha_code(profile, after=mark)
+            if result and "queue_wait" in result.timings:
+                self.log(f"OCR工作进程: 排队 {result.timings['queue_wait']:.0f}ms / "
+                         f"推理 {result.timings['inference']:.0f}ms", "debug")
+            reason = check_captcha_rules(result, rules)
+            if reason is None and result.digest and result.digest == self._submitted_digest:
+                # 页面还没换图：这张已提交过（服务器已拒绝或已失效），刷新后重新识别
+                reason = "与上次提交的是同一张图片"
+            self.archive_captcha(data, mode=profile.mode, source=source,
+                                 text=result.text if result else "",
+                                 confidence=result.confidence if result else None,
+                                 outcome=reason or "通过")
+            if reason is None:
+                return result
+            self.log(f"验证码未通过本地校验: {reason}（{result.text if result else ''}）")
+            if attempt < retries:
+                if fill_done is not None:
+                    fill_done.wait()
+                timeout = 3.0
+                if deadline is not None:
+                    timeout = min(timeout, deadline - time.monotonic())
+                    if timeout <= 0:
+                        self.log(f"验证码刷新重识别已用完时间预算 {budget:.0f}s")
+                        break
+                start = time.perf_counter()
+                mark = self.driver.capture_mark()
+                if not self._refresh_captcha(profile, timeout):
+                    break
+                self.log(f"已刷新验证码（{(time.perf_counter() - start) * 1000:.0f}ms），"
+                         f"重新识别（{attempt + 1}/{retries}）")
+        return None
+
+    def _refresh_captcha(self, profile: LoginProfile, timeout: float = 3) -> bool:
+        """
+        触发验证码刷新（点击配置的 captcha_refresh 元素，未配置时点击验证码图片），
+        并等待图片 src 或内容变化且新图片加载完成
+        """
+        img = profile.captcha_image.locator
+        trigger = profile.captcha_refresh or profile.captcha_image
+        old_src = self.driver.get_attr(img, "src", timeout=1)
+        old_content = self.driver.get_src(img, timeout=1)
+        if not self.driver.click(trigger.locator, timeout=1):
+            self.log(f"{trigger.label}定位失败: {trigger.describe()}")
+            return False
+        with self.trace.span("captcha.refresh_wait"):
+            ok = self.driver.wait_image_changed(img, old_src, old_content, timeout=timeout)
+        if not ok:
+            self.log(f"刷新后验证码在 {timeout:.1f}s 内未变化")
+            return False
+        return True
+
+    def read_captcha_image(self, img, after: Optional[int] = None):
+        """
+        按清晰度依次获取验证码图片：网络监听到的原始响应体（页面已加载的字节，无额外请求）
+        → src()（base64 或浏览器缓存，拿不到字节时返回URL字符串）
+        after: 刷新前的捕获序号（driver.capture_mark()），只接受其后到达的响应，等待超时再读 DOM
+
+        Returns:
+            (bytes / URL 字符串 / None, 来源说明)
+        """
+        src = self.driver.get_attr(img, "src", timeout=1)
+        if src and not src.startswith("data:"):
+            with self.trace.span("captcha.network") as attrs:
+                data = self.driver.captured_image(src, after=after)
+                attrs["ok"] = bool(data)
+            if data:
+                return data, "网络监听"
+        with self.trace.span("captcha.src") as attrs:
+            data = self.driver.get_src(img, base64_to_bytes=True)
+            attrs["ok"] = bool(data)
+        if data:
+            return data, "src()"
+        return None, ""
+
+    def archive_captcha(self, data: bytes, **meta):
+        """验证码图片交给后台归档（不阻塞，队列满时丢弃），未启用时忽略"""
+        cfg = self.app_config.get("archive", {})
+        if not data or not cfg.get("enabled", True):
+            return
+        with self._archive_lock:
+            if self._archive is None:
+                from .captcha_archive import CaptchaArchive
+                self._archive = CaptchaArchive.from_config(os.path.join(IMG_DIR, "captcha_archive"), cfg)
+        if not self._archive.submit(data, **meta):
+            self.log(f"验证码归档队列已满，丢弃本张（累计丢弃 {self._archive.stats()['dropped']}）")
+
+    def _get_captcha_code(self, profile: LoginProfile, after: Optional[int] = None):
+        """
+        获取并识别验证码
+        使用 ddddocr，按 char_ranges 限制输出字符（未配置时不限制）
+        优先使用网络监听到的原始图片字节，其次 src()，最后退而截图
+        after: 刷新前的网络捕获序号，见 read_captcha_image
+
+        Returns:
+            (OcrResult 或 None, 图片字节或 None, 获取方式)
+        """
+        ocr = self.ensure_ocr()
+        if not ocr:
+            return None, None, ""
+        preprocess = self.get_preprocessor(profile)
+        img = profile.captcha_image.locator
+
+        # 等待验证码图片加载并解码完成
+        with self.trace.span("captcha.image_loaded"):
+            loaded = self.driver.wait_image_loaded(img, timeout=5)
+        if not loaded:
+            self.log("验证码图片在 5s 内未加载完成，继续尝试获取")
+
+        data, source = self.read_captcha_image(img, after)
+        if isinstance(data, str):
+            # 只拿到图片URL：用携带浏览器 Cookie 的共享 HTTP 客户端下载后识别
+            self.log(f"通过src()方法获取到图片URL: {data[:50]}...")
+            with self.trace.span("captcha.url") as attrs:
+                code = ocr.recognize(data, char_ranges=profile.char_ranges, preprocess=preprocess,
+                                     http=self.driver.http)
+                attrs["ok"] = code is not None
+            if code:
+                return code, None, "URL"
+            data = None
+        if not data:
+            # 退而使用截图方式（清晰度较低）
+            self.log("未获取到图片数据，使用截图方式作为备选...")
+            with self.trace.span("captcha.screenshot"):
+                data, source = self.driver.capture_element_png(img), "截图"
+        if not data:
+            return None, None, ""
+
+        self.log(f"通过{source}获取到验证码图片（{len(data)} 字节）", "debug")
+        with self.trace.span("ocr", source=source) as attrs:
+            result = ocr.recognize(data, char_ranges=profile.char_ranges, preprocess=preprocess)
+            if result is not None:
+                attrs.update(text=result.text, confidence=result.confidence, **result.timings)
+        return result, data, source
+
+    # ---- 提交 ----
+
+    def _close_dialog(self, mode: str):
+        """
+        关闭弹窗
+        点击登录后，使用配置的关闭弹窗选择器，timeout=4去抓取该元素
+        元素一出现就可以找到，没有的时候也可以懒加载
+        """
+        try:
+            profile = self.profiles.get(mode)
+            if profile is None or profile.close_dialog is None:
+                # 如果没有配置关闭弹窗选择器，直接返回
+                return
+
+            # 使用timeout=4去抓取该元素，元素一出现就可以找到
+            self.log("等待并查找关闭弹窗按钮...", "debug")
+            with self.trace.span("close_dialog"):
+                clicked = self.driver.click(profile.close_dialog.locator, timeout=4)
+            if clicked:
+                self.log("已点击关闭弹窗按钮")
+            else:
+                self.log("未找到关闭弹窗按钮（可能弹窗未出现）")
+        except Exception as e:
+            # 不影响主流程，只记录调试日志
+            self.log(f"关闭弹窗失败: {e}", "debug")
+
+    def _submit(self, mode: str) -> bool:
+        profile = self.get_profile(mode)
+        if profile is None:
+            return False
+        if profile.submit is None:
+            self.log("提交按钮选择器未配置")
+            return False
+        with self.trace.span("submit"):
+            ok = self.driver.click(profile.submit.locator)
+        if not ok:
+            self.log(f"提交按钮定位失败。选择器: {profile.submit.describe()}")
+        return ok
+
+    # ---- 登录尝试 ----
+
+    def single_attempt(self, mode: str) -> Dict[str, Any]:
+        """
+        执行一次登录尝试
+
+        Returns:
+            本次结果：mode、outcome、total_ms，记录计时时另含 spans 等分阶段耗时
+        """
+        with self._attempt_lock:
+            # 尝试开始前应用前端暂存及外部修改的配置，尝试过程中配置保持不变
+            self._apply_pending_config()
+            if self.hot_reload:
+                self.reload_config_if_changed()
+            try:
+                return self._run_attempt(mode)
+            finally:
+                # 尝试期间前端保存的配置此时替换，不必等到下一次尝试
+                self._apply_pending_config()
+
+    def _begin_trace(self, mode: str):
+        if self.tracer:
+            return self.tracer.begin(mode)
+        return AttemptTrace(mode) if self.collect_timings else NULL_TRACE
+
+    def _attempt_steps(self, mode: str) -> str:
+        """登录尝试的各步骤，返回结果 outcome"""
+        if not self.driver and not self.open_page_sync(mode):
+            return "no_page"
+        if not self._fill_login_form(mode):
+            return "fill_failed"
+        # 当未开启自动识别验证码时，仅输入账号密码（和可选序列号）但不提交
+        if not self.inputs.auto_ocr:
+            self.log("未开启自动识别验证码：已输入账号/密码（不提交登录）。")
+            return "filled"
+        profile = self.profiles[mode]
+        img = profile.captcha_image.locator if profile.captcha_image else None
+        state = self.driver.page_state(img)
+        if not self._submit(mode):
+            return "submit_failed"
+        self.log("已尝试提交登录。")
+        self._forget_submitted_captcha()
+
+        # 点击登录后，尝试关闭弹窗
+        self._close_dialog(mode)
+        self._wait_after_submit(profile, state)
+        return "submitted"
+
+    def _forget_submitted_captcha(self) -> None:
+        """已提交的验证码随即失效：记下图片哈希并丢弃其识别缓存，同一张图片不会被再次提交"""
+        result, self._filled_captcha = self._filled_captcha, None
+        if result is None:
+            return
+        self._submitted_digest = result.digest
+        if self.ocr is not None:
+            self.ocr.forget(result)
+
+    def _wait_after_submit(self, profile: LoginProfile, state) -> None:
+        """
+        提交后等待页面作出响应（跳转或刷新验证码），最多 ready_timeout 秒，
+        下一次尝试不会在仍在变化的旧页面上填写、读到刚提交过的验证码
+        """
+        img = profile.captcha_image.locator if profile.captcha_image else None
+        with self.trace.span("submit.wait") as attrs:
+            reason = self.driver.wait_page_changed(state, img, profile.ready_timeout)
+            attrs["changed"] = reason
+        if reason == "navigated":
+            self.log("提交后页面已跳转", "debug")
+        elif reason == "captcha":
+            self.log("提交后验证码已刷新", "debug")
+        else:
+            self.log(f"提交后 {profile.ready_timeout:.0f}s 内页面与验证码均未变化，下次尝试不会重复提交同一张验证码")
+
+    def _run_attempt(self, mode: str) -> Dict[str, Any]:
+        tracer = self.tracer
+        trace = self.trace = self._begin_trace(mode)
+        start = time.perf_counter()
+        try:
+            outcome = self._attempt_steps(mode)
+            trace.set(outcome=outcome)
+        except Exception as e:
+            outcome = "error"
+            trace.set(outcome=outcome, error=str(e))
+            self.log(f"登录流程失败: {e}")
+        finally:
+            self.trace = NULL_TRACE
+            if tracer and trace.enabled:
+                tracer.write(trace)
+        if trace.enabled:
+            return trace.to_record()
+        return {"mode": mode, "outcome": outcome, "total_ms": round((time.perf_counter() - start) * 1000, 2)}
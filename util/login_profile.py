@@ -0,0 +1,267 @@
+"""
+登录配置编译
+
+将 app_config.json 中 login.<模式> 的配置一次性编译为不可变的 LoginProfile：
+选择器预先解析为 DrissionPage 定位元组，必填项在加载时校验，
+每次登录尝试直接使用编译结果，不再逐字段解析配置字典。
+配置变化（保存设置、热加载）时重新编译。
+"""
+import re
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from .config_store import parse_selector_config
+from .image_preprocess import validate_stages
+
+Locator = Tuple[str, str]
+
+# selector_type -> DrissionPage 定位方式（定位元组的方式名，无需 selenium 的 By 常量）
+LOCATOR_BY: Dict[str, str] = {
+    "css": "css selector",
+    "class_name": "class name",
+    "class": "class name",
+    "id": "id",
+    "name": "name",
+    "tag": "tag name",
+    "xpath": "xpath",
+}
+
+
+# 可拦截的资源类型（CDP Network.ResourceType，页面文档本身不可拦截）
+BLOCKABLE_TYPES = (
+    "Stylesheet", "Image", "Media", "Font", "Script", "TextTrack", "XHR", "Fetch", "Prefetch",
+    "EventSource", "WebSocket", "Manifest", "SignedExchange", "Ping", "CSPViolationReport", "Other",
+)
+
+
+class ProfileError(ValueError):
+    """登录配置无效"""
+
+
+def resolve_locator(selector: str, selector_type: str = "xpath") -> Locator:
+    """将 (selector, selector_type) 解析为定位元组，未知类型按 xpath 处理"""
+    return (LOCATOR_BY.get(selector_type, "xpath"), selector)
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """已解析的页面元素"""
+    name: str
+    label: str
+    selector: str
+    selector_type: str
+    locator: Locator
+    typing: bool = False  # 需要模拟逐字键入（不参与批量填写）
+
+    def describe(self) -> str:
+        return f"{self.selector} ({self.selector_type})"
+
+
+@dataclass(frozen=True)
+class BlockRules:
+    """
+    页面资源拦截规则（URL 模式支持 * 与 ? 通配）
+    allow 优先：匹配 allow 的请求总是放行（验证码接口），否则按资源类型或 deny 模式拦截
+    """
+    resource_types: Tuple[str, ...] = ()
+    deny: Tuple[str, ...] = ()
+    allow: Tuple[str, ...] = ()
+    dry_run: bool = False  # 只统计可拦截的请求与字节，不实际拦截
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if any(fnmatchcase(url, p) for p in self.allow):
+            return False
+        if resource_type in self.resource_types:
+            return True
+        return any(fnmatchcase(url, p) for p in self.deny)
+
+    def fetch_patterns(self) -> List[Dict[str, str]]:
+        """Fetch.enable 的请求模式：只暂停候选请求，其余请求不经过拦截回调"""
+        patterns = [{"urlPattern": "*", "resourceType": t, "requestStage": "Request"} for t in self.resource_types]
+        patterns += [{"urlPattern": p, "requestStage": "Request"} for p in self.deny]
+        return patterns
+
+
+@dataclass(frozen=True)
+class LoginProfile:
+    """单个模式（bm/kw）编译后的登录配置"""
+    mode: str
+    url: str
+    fill_fields: Tuple[FieldSpec, ...]  # 按顺序填写的输入框（账号、密码、序列号）
+    captcha_image: Optional[FieldSpec]
+    captcha_input: Optional[FieldSpec]
+    captcha_refresh: Optional[FieldSpec]  # 刷新验证码的触发元素，None 时点击验证码图片
+    submit: Optional[FieldSpec]
+    close_dialog: Optional[FieldSpec]
+    ready_state: str
+    ready_selectors: Tuple[FieldSpec, ...]
+    ready_timeout: float
+    captcha_rules: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+    preprocess: Tuple[Mapping[str, Any], ...] = ()
+    char_ranges: Optional[str] = None  # OCR 只输出其中的字符（ddddocr set_ranges），None 为不限制
+    batch_fill: bool = True  # 一次脚本调用批量填写输入框
+    captcha_capture: Any = True  # 网络监听目标：True 所有图片 / URL 片段 / False 关闭
+    block: Optional[BlockRules] = None  # 页面资源拦截规则，None 为不拦截
+
+    @property
+    def has_captcha(self) -> bool:
+        return self.captcha_image is not None and self.captcha_input is not None
+
+
+def _field(name: str, label: str, config: Any, default_selector_type: str) -> Optional[FieldSpec]:
+    selector, selector_type = parse_selector_config(config, default_selector_type)
+    if not selector:
+        return None
+    if selector_type not in LOCATOR_BY:
+        raise ProfileError(f"{label}的选择器类型无效: {selector_type}（可选: {', '.join(LOCATOR_BY)}）")
+    typing = bool(config.get("typing", False)) if isinstance(config, dict) else False
+    return FieldSpec(name, label, selector, selector_type, resolve_locator(selector, selector_type), typing)
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _number(config: Mapping[str, Any], key: str, default: float, label: str) -> float:
+    """读取非负数值配置，类型错误时抛出 ProfileError（而不是让重新加载整体失败）"""
+    value = config.get(key, default)
+    if isinstance(value, bool):
+        raise ProfileError(f"{label}需为数字: {value!r}")
+    try:
+        number = float(value if value is not None else default)
+    except (TypeError, ValueError):
+        raise ProfileError(f"{label}需为数字: {value!r}") from None
+    if number < 0:
+        raise ProfileError(f"{label}不能为负数: {value!r}")
+    return number
+
+
+def _captcha_rules(config: Any) -> Mapping[str, Any]:
+    """校验验证码规则的数值与字符集正则"""
+    if not isinstance(config, dict):
+        raise ProfileError(f"captcha_rules 需为对象: {config!r}")
+    _number(config, "length", 0, "captcha_rules.length ")
+    _number(config, "min_confidence", 0, "captcha_rules.min_confidence ")
+    _number(config, "max_retries", 2, "captcha_rules.max_retries ")
+    _number(config, "retry_budget", 6, "captcha_rules.retry_budget ")
+    if config.get("charset"):
+        try:
+            re.compile(config["charset"])
+        except (re.error, TypeError) as e:
+            raise ProfileError(f"captcha_rules.charset 不是有效的正则: {e}") from None
+    return _freeze(config)
+
+
+def _block_rules(config: Any, captcha_capture: Any, has_captcha: bool) -> Optional[BlockRules]:
+    """
+    编译资源拦截规则，未启用返回 None；captcha_capture 配置的 URL 片段自动加入 allow
+    拦截 Image 时只有 captcha_capture 的 URL 片段能保证验证码图片被放行（allow 中的其他模式未必匹配验证码），
+    没有配置该片段时视为无效（dry_run 除外）
+    """
+    if not isinstance(config, dict) or not config.get("enabled", False):
+        return None
+    for key in ("resource_types", "deny", "allow"):
+        items = config.get(key) or []
+        if not isinstance(items, list) or not all(isinstance(i, str) for i in items):
+            raise ProfileError(f"block.{key} 需为字符串列表: {items!r}")
+    resource_types = tuple(config.get("resource_types") or [])
+    invalid = [t for t in resource_types if t not in BLOCKABLE_TYPES]
+    if invalid:
+        raise ProfileError(f"block.resource_types 无效: {', '.join(invalid)}（可选: {', '.join(BLOCKABLE_TYPES)}）")
+    fragments = [captcha_capture] if isinstance(captcha_capture, str) else captcha_capture
+    captcha_allow = [f"*{f}*" for f in fragments if f] if isinstance(fragments, list) else []
+    dry_run = bool(config.get("dry_run", False))
+    if has_captcha and "Image" in resource_types and not captcha_allow and not dry_run:
+        raise ProfileError("block.resource_types 包含 Image 时需将 captcha_capture 设为验证码图片的 URL 片段"
+                           "（如 \"/captcha\"），该片段会自动放行")
+    allow = list(config.get("allow") or []) + captcha_allow
+    return BlockRules(resource_types=resource_types,
+                      deny=tuple(config.get("deny") or []),
+                      allow=tuple(allow),
+                      dry_run=dry_run)
+
+
+def compile_login_profile(mode: str, login: Dict[str, Any]) -> LoginProfile:
+    """
+    编译单个模式的登录配置
+
+    Raises:
+        ProfileError: 必填项缺失，选择器类型、数值、预处理阶段或拦截的资源类型无效
+    """
+    default_selector_type = login.get("selector_type", "xpath")
+    username = _field("username", "账号输入框", login.get("username", ""), default_selector_type)
+    if username is None:
+        raise ProfileError("账号选择器未配置")
+    password = _field("password", "密码输入框", login.get("password", ""), default_selector_type)
+    serial = _field("serial", "序列号输入框", login.get("serial", ""), default_selector_type)
+    captcha_image = _field("captcha_image", "验证码图片", login.get("captcha_image", ""), default_selector_type)
+    captcha_input = _field("captcha_input", "验证码输入框", login.get("captcha_input", ""), default_selector_type)
+    if (captcha_image is None) != (captcha_input is None):
+        raise ProfileError("验证码图片与验证码输入框选择器需同时配置")
+    captcha_refresh = _field("captcha_refresh", "验证码刷新按钮", login.get("captcha_refresh", ""), default_selector_type)
+    submit = _field("submit", "提交按钮", login.get("submit", ""), default_selector_type)
+    close_dialog = _field("close_dialog", "关闭弹窗按钮", login.get("close_dialog", ""), default_selector_type)
+
+    ready_state = login.get("ready_state", "interactive")
+    if ready_state not in ("interactive", "complete"):
+        raise ProfileError(f"ready_state 无效: {ready_state}（可选: interactive, complete）")
+    ready_selectors = tuple(
+        f for f in (_field("ready", "就绪判定元素", c, default_selector_type)
+                    for c in login.get("ready_selectors") or []) if f
+    ) or (username,)
+
+    char_ranges = login.get("char_ranges")
+    if char_ranges is not None and (not isinstance(char_ranges, str) or not char_ranges):
+        # 整数范围在 ddddocr 各版本中含义不同（1.5.x 的 0 为纯数字），只接受字符串
+        raise ProfileError(f"char_ranges 需为字符串（如 \"0123456789\"）或 null: {char_ranges!r}")
+
+    preprocess = login.get("preprocess") or []
+    try:
+        validate_stages(preprocess)
+    except ValueError as e:
+        raise ProfileError(str(e)) from None
+
+    fill_fields = tuple(f for f in (username, password, serial) if f)
+
+    return LoginProfile(
+        mode=mode,
+        url=login.get("url", ""),
+        fill_fields=fill_fields,
+        captcha_image=captcha_image,
+        captcha_input=captcha_input,
+        captcha_refresh=captcha_refresh,
+        submit=submit,
+        close_dialog=close_dialog,
+        ready_state=ready_state,
+        ready_selectors=ready_selectors,
+        ready_timeout=_number(login, "ready_timeout", 10, "ready_timeout "),
+        captcha_rules=_captcha_rules(login.get("captcha_rules") or {}),
+        preprocess=_freeze(preprocess),
+        char_ranges=char_ranges,
+        batch_fill=bool(login.get("batch_fill", True)),
+        captcha_capture=_freeze(login.get("captcha_capture", True)),
+        block=_block_rules(login.get("block"), login.get("captcha_capture", True), captcha_image is not None),
+    )
+
+
+def compile_login_profiles(app_config: Dict[str, Any]) -> Tuple[Dict[str, LoginProfile], Dict[str, str]]:
+    """
+    编译所有模式的登录配置
+
+    Returns:
+        ({模式: LoginProfile}, {模式: 错误信息})
+    """
+    profiles: Dict[str, LoginProfile] = {}
+    errors: Dict[str, str] = {}
+    for mode, login in (app_config.get("login") or {}).items():
+        try:
+            profiles[mode] = compile_login_profile(mode, login or {})
+        except ProfileError as e:
+            errors[mode] = str(e)
+    return profiles, errors
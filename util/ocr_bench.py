@@ -0,0 +1,358 @@
+"""
+验证码 OCR 离线基准测试
+
+对一个已标注的验证码图片目录逐张识别，按配置（标准/beta 模型、字符范围、自定义模型、多模型集成、预处理）
+统计准确率、p50/p95/p99 延迟、吞吐量与内存占用，输出控制台表格与 JSON 报告。
+内存：rss_delta_mb 为该配置运行前后的常驻内存增量（含首次加载的模型），
+process_peak_rss_mb 为整个进程启动以来的峰值（各配置累积，不代表单个配置）。
+
+标注方式（二选一）：
+1. 目录下 labels.json：{"文件名": "验证码文本", ...}
+2. 文件名即标注：ab12.png、ab12_001.png（取第一个下划线前的部分）
+
+用法：
+    python -m util.ocr_bench --dir img/labelled
+    python -m util.ocr_bench --dir img/labelled --models std,beta --ranges none,0123456789 --out bench.json
+    python -m util.ocr_bench --dir img/labelled --models std,beta,ens  # 对比集成投票的准确率与延迟
+    python -m util.ocr_bench --dir img/labelled --preprocess none,kw,stages.json  # 对比无预处理/站点预处理/自定义阶段
+    python -m util.ocr_bench --dir img/labelled --models std --runtime-sweep threads  # 扫描 onnxruntime 设置
+    python -m util.ocr_bench --dir img/labelled --baseline bench_old.json  # 与历史报告比较，退化时返回非0
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config_store import load_app_config
+from .paths import IMG_DIR
+from .stats import percentile
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp")
+
+
+def load_dataset(data_dir: str) -> List[Tuple[str, bytes, str]]:
+    """读取标注图片，返回 [(文件名, 图片字节, 标注文本), ...]"""
+    labels: Dict[str, str] = {}
+    labels_path = os.path.join(data_dir, "labels.json")
+    if os.path.exists(labels_path):
+        with open(labels_path, 'r', encoding='utf-8') as f:
+            labels = json.load(f)
+
+    samples = []
+    for name in sorted(os.listdir(data_dir)):
+        if not name.lower().endswith(IMAGE_EXTS):
+            continue
+        label = labels.get(name)
+        if label is None:
+            if labels:
+                continue  # 有 labels.json 时只测试已标注的图片
+            label = os.path.splitext(name)[0].split("_", 1)[0]
+        with open(os.path.join(data_dir, name), 'rb') as f:
+            samples.append((name, f.read(), str(label)))
+    return samples
+
+
+def current_rss_mb() -> Optional[float]:
+    """当前常驻内存（MB），不可用时返回 None"""
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().rss / (1024 * 1024), 1)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
+
+
+def process_peak_rss_mb() -> Optional[float]:
+    """进程启动以来的峰值常驻内存（MB，整个进程累计，不区分配置），不可用时返回 None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+def load_preprocess_options(names: List[str], app_config: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    解析预处理选项：none（不处理）、站点名（使用 login.<站点>.preprocess）或阶段列表 JSON 文件路径
+    返回 {名称: 阶段列表}
+    """
+    options: Dict[str, List[Dict[str, Any]]] = {}
+    for name in names:
+        if name == "none":
+            options[name] = []
+        elif name in app_config.get("login", {}):
+            options[name] = app_config["login"][name].get("preprocess") or []
+        else:
+            with open(name, 'r', encoding='utf-8') as f:
+                options[os.path.splitext(os.path.basename(name))[0]] = json.load(f)
+    return options
+
+
+def build_configs(models: List[str], ranges: List[Optional[int | str]], has_custom: bool,
+                  preprocess: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> List[Dict[str, Any]]:
+    """生成待测配置列表：模型 × 字符范围 × 预处理"""
+    preprocess = preprocess or {"none": []}
+    configs = []
+    for model in models:
+        if model == "custom" and not has_custom:
+            print("[基准] 未配置自定义模型，跳过 custom")
+            continue
+        for cr in ranges:
+            for pp_name, stages in preprocess.items():
+                suffix = "" if pp_name == "none" else f"/pp={pp_name}"
+                configs.append({
+                    "name": f"{model}/ranges={'none' if cr is None else cr}{suffix}",
+                    "preprocess": stages,
+                    "use_beta": model == "beta",
+                    "use_custom": model == "custom",
+                    "ensemble": model == "ens",
+                    "char_ranges": cr,
+                })
+    return configs
+
+
+def run_config(ocr, samples: List[Tuple[str, bytes, str]], cfg: Dict[str, Any],
+               ignore_case: bool = True) -> Dict[str, Any]:
+    """用一种配置跑完整个数据集，返回统计结果"""
+    kwargs = {
+        "char_ranges": cfg.get("char_ranges"),
+        "use_beta": cfg.get("use_beta", False),
+        "use_custom": cfg.get("use_custom", False),
+        "ensemble": cfg.get("ensemble", False),
+    }
+    if cfg.get("preprocess"):
+        from .image_preprocess import Preprocessor
+        kwargs["preprocess"] = Preprocessor(cfg["preprocess"])
+    stage_times: Dict[str, List[float]] = {}
+    rss_before = current_rss_mb()
+    # 模型加载与首轮推理不计入延迟
+    load_time = ocr.warmup(**{k: v for k, v in kwargs.items() if k != "preprocess"})
+
+    latencies: List[float] = []
+    confidences: List[float] = []
+    correct = 0
+    failures = []
+    sink = io.StringIO()
+    total_start = time.perf_counter()
+    for name, data, label in samples:
+        with contextlib.redirect_stdout(sink):
+            start = time.perf_counter()
+            result = ocr.recognize(data, **kwargs)
+            latencies.append((time.perf_counter() - start) * 1000)
+        got = result.text if result else ""
+        if result and result.confidence is not None:
+            confidences.append(result.confidence)
+        if result:
+            for stage, ms in result.timings.items():
+                stage_times.setdefault(stage, []).append(ms)
+        ok = got.lower() == label.lower() if ignore_case else got == label
+        if ok:
+            correct += 1
+        elif len(failures) < 20:
+            failures.append({"file": name, "label": label, "got": got})
+        sink.seek(0)
+        sink.truncate()
+    total = time.perf_counter() - total_start
+    rss_after = current_rss_mb()
+
+    count = len(samples)
+    return {
+        "name": cfg["name"],
+        "config": {k: v for k, v in cfg.items() if k != "name"},
+        "count": count,
+        "accuracy": round(correct / count, 4) if count else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "throughput": round(count / total, 2) if total > 0 else 0.0,
+        "avg_confidence": round(sum(confidences) / len(confidences), 4) if confidences else None,
+        "load_s": round(load_time, 3),
+        "rss_delta_mb": None if rss_before is None or rss_after is None else round(rss_after - rss_before, 1),
+        "process_peak_rss_mb": process_peak_rss_mb(),
+        "preprocess_ms": {k: round(sum(v) / len(v), 3) for k, v in stage_times.items()},
+        "failures": failures,
+    }
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    """控制台表格输出"""
+    header = f"{'配置':<28}{'准确率':>8}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}{'张/秒':>9}{'加载s':>8}{'内存增量MB':>12}"
+    print(header)
+    print("-" * 93)
+    for r in results:
+        rss = "-" if r["rss_delta_mb"] is None else f"{r['rss_delta_mb']:+.1f}"
+        print(f"{r['name']:<28}{r['accuracy'] * 100:>7.1f}%{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+              f"{r['p99_ms']:>9.2f}{r['throughput']:>9.2f}{r['load_s']:>8.2f}{rss:>12}")
+
+
+def compare_baseline(results: List[Dict[str, Any]], baseline_path: str,
+                     max_acc_drop: float, max_p95_increase: float) -> List[str]:
+    """与历史报告比较，返回退化描述列表（为空表示无退化）"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {r["name"]: r for r in json.load(f).get("results", [])}
+    regressions = []
+    for r in results:
+        old = baseline.get(r["name"])
+        if not old:
+            continue
+        if old["accuracy"] - r["accuracy"] > max_acc_drop:
+            regressions.append(f"{r['name']}: 准确率 {old['accuracy']:.3f} -> {r['accuracy']:.3f}")
+        if old["p95_ms"] > 0 and (r["p95_ms"] - old["p95_ms"]) / old["p95_ms"] > max_p95_increase:
+            regressions.append(f"{r['name']}: p95 {old['p95_ms']:.2f}ms -> {r['p95_ms']:.2f}ms")
+    return regressions
+
+
+def load_runtime_sweep(spec: str, base: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    解析 onnxruntime 设置扫描列表，返回 {标签: runtime 设置}
+    spec: 空 -> 仅使用配置文件中的设置；threads -> 扫描 intra_op 线程数与执行模式；
+          其他 -> JSON 文件路径，内容为 runtime 设置列表或 {标签: 设置} 字典
+    """
+    if not spec:
+        return {"config": base}
+    if spec == "threads":
+        cpus = os.cpu_count() or 1
+        counts = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+        sweep = {"default": {}}
+        for n in counts:
+            sweep[f"intra{n}"] = {"intra_op_num_threads": n, "execution_mode": "sequential"}
+        sweep[f"parallel{cpus}"] = {"intra_op_num_threads": cpus, "inter_op_num_threads": 2,
+                                    "execution_mode": "parallel"}
+        sweep["no_arena"] = {"enable_mem_arena": False}
+        return sweep
+    with open(spec, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return {f"rt{i}": item for i, item in enumerate(data)}
+    return data
+
+
+def fastest_runtime(results: List[Dict[str, Any]]) -> Optional[str]:
+    """按各运行时设置下 p50 延迟之和选出最快的设置标签"""
+    totals: Dict[str, float] = {}
+    for r in results:
+        label = r["config"].get("runtime_label")
+        if label is not None:
+            totals[label] = totals.get(label, 0.0) + r["p50_ms"]
+    return min(totals, key=totals.get) if totals else None
+
+
+def _parse_ranges(text: str) -> List[Optional[int | str]]:
+    """none、整数或字符串（限制输出的字符，如 0123456789）"""
+    ranges: List[Optional[int | str]] = []
+    for item in (i.strip() for i in text.split(",")):
+        if not item:
+            continue
+        if item.lower() == "none":
+            ranges.append(None)
+        elif item.isdigit() and len(item) == 1:
+            ranges.append(int(item))
+        else:
+            ranges.append(item)
+    return ranges
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="验证码 OCR 离线基准测试")
+    parser.add_argument("--dir", default=os.path.join(IMG_DIR, "labelled"), help="已标注验证码图片目录")
+    parser.add_argument("--models", default="std,beta", help="模型列表：std,beta,custom,ens（集成投票）")
+    parser.add_argument("--ranges", default="none",
+                        help="字符范围列表：none、ddddocr 整数范围或字符串（如 none,0123456789）")
+    parser.add_argument("--preprocess", default="none",
+                        help="预处理列表：none、站点名(bm/kw，使用其 preprocess 配置)或阶段列表 JSON 文件")
+    parser.add_argument("--runtime-sweep", default="",
+                        help="onnxruntime 设置扫描：threads 或设置列表 JSON 文件，留空使用配置文件中的 ocr.runtime")
+    parser.add_argument("--case-sensitive", action="store_true", help="区分大小写比较")
+    parser.add_argument("--out", default="", help="JSON 报告输出路径")
+    parser.add_argument("--baseline", default="", help="历史 JSON 报告，用于回归检查")
+    parser.add_argument("--max-acc-drop", type=float, default=0.01, help="允许的准确率下降（绝对值）")
+    parser.add_argument("--max-p95-increase", type=float, default=0.2, help="允许的 p95 延迟增幅（比例）")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.dir):
+        print(f"[基准] 目录不存在: {args.dir}")
+        return 2
+    samples = load_dataset(args.dir)
+    if not samples:
+        print(f"[基准] 目录中没有已标注的图片: {args.dir}")
+        return 2
+    print(f"[基准] 数据集: {args.dir}，共 {len(samples)} 张")
+
+    from .ocr_helper import CaptchaOcr
+    app_config = load_app_config()
+    ocr_cfg = app_config.get("ocr", {})
+    custom_model = ocr_cfg.get("custom_model") or {}
+    configs = build_configs([m.strip() for m in args.models.split(",") if m.strip()],
+                            _parse_ranges(args.ranges), bool(custom_model.get("onnx_path")),
+                            load_preprocess_options([p.strip() for p in args.preprocess.split(",") if p.strip()],
+                                                    app_config))
+    sweep = load_runtime_sweep(args.runtime_sweep, ocr_cfg.get("runtime") or {})
+    results = []
+    for label, runtime in sweep.items():
+        # 每种运行时设置使用独立实例；关闭识别缓存，保证每张图片都真实推理
+        ocr = CaptchaOcr(pool_size=int(ocr_cfg.get("pool_size", 4)), custom_model=custom_model,
+                         ensemble={**(ocr_cfg.get("ensemble") or {}), "enabled": False},
+                         cache={"max_size": 0}, runtime=runtime)
+        if not ocr.ready:
+            print(f"[基准] 运行时设置 {label} 无法应用（见上方 [OCR] 错误），终止测试")
+            return 2
+        for cfg in configs:
+            if len(sweep) > 1:
+                cfg = {**cfg, "name": f"{cfg['name']}/rt={label}", "runtime_label": label, "runtime": runtime}
+            print(f"[基准] 运行配置: {cfg['name']}")
+            results.append(run_config(ocr, samples, cfg, ignore_case=not args.case_sensitive))
+
+    print()
+    print_table(results)
+    best = fastest_runtime(results)
+    if best is not None:
+        print(f"[基准] 本机最快的 onnxruntime 设置: {best} {json.dumps(sweep[best], ensure_ascii=False)}")
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dataset": os.path.abspath(args.dir),
+            "count": len(samples),
+        },
+        "results": results,
+    }
+    if best is not None:
+        report["fastest_runtime"] = {"label": best, "runtime": sweep[best]}
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[基准] JSON 报告已保存: {args.out}")
+
+    if args.baseline:
+        regressions = compare_baseline(results, args.baseline, args.max_acc_drop, args.max_p95_increase)
+        if regressions:
+            print("[基准] 检测到退化：")
+            for item in regressions:
+                print(f"  - {item}")
+            return 1
+        print("[基准] 与历史报告相比无退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,52 +1,518 @@
 import re
 import base64
-from typing import Optional
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Tuple
 
-import requests
-import ddddocr
+# ddddocr / onnxruntime / requests 在首次使用时才导入，界面启动与 check_captcha_rules 等轻量调用不加载
+if TYPE_CHECKING:
+    from .http_client import HttpClient
+
+
+@dataclass
+class OcrResult:
+    """
+    识别结果
+    confidence 为各字符置信度中的最小值（无概率输出时为 None）
+    """
+    text: str
+    confidence: Optional[float] = None
+    char_confidences: List[float] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)  # 各阶段耗时（ms），如预处理各阶段
+    digest: bytes = b""  # 识别的图片内容哈希（ResultCache.digest），用于判断是否为同一张验证码
+
+    def __str__(self) -> str:
+        return self.text
+
+
+def _ctc_best_path(steps: List[List[float]], charset: List[str]) -> Tuple[List[str], List[float]]:
+    """
+    CTC 最优路径解码：每个时间步取概率最大的字符，合并连续重复，去掉空白符("")
+    每个输出字符的置信度取其所在连续段内的最大概率
+    """
+    chars: List[str] = []
+    confs: List[float] = []
+    last_idx = -1
+    for row in steps:
+        idx = max(range(len(row)), key=row.__getitem__) if row else -1
+        p = float(row[idx]) if idx >= 0 else 0.0
+        ch = charset[idx] if 0 <= idx < len(charset) else ""
+        if idx == last_idx:
+            if ch and p > confs[-1]:
+                confs[-1] = p
+            continue
+        last_idx = idx
+        if ch:
+            chars.append(ch)
+            confs.append(p)
+    return chars, confs
+
+
+def _squeeze_steps(steps: Any) -> List[List[float]]:
+    """概率输出整理为 [时间步][字符]：去掉 batch 维，只有一个时间步时补回被 squeeze 掉的一维"""
+    if not steps:
+        return []
+    if not isinstance(steps[0], list):
+        return [steps]
+    if steps[0] and isinstance(steps[0][0], list):
+        # 三维输出：(1, 时间步, 字符) 或 (时间步, 1, 字符)
+        return steps[0] if len(steps) == 1 else [row[0] for row in steps]
+    return steps
+
+
+def decode_probability(prob: Dict[str, Any]) -> Optional[OcrResult]:
+    """
+    解码 ddddocr classification(probability=True) 的输出，兼容两种格式：
+        1.5.x 及更早: {"charsets": 字符集（或 set_ranges 后的范围）, "probability": [时间步][字符]}
+        1.6.x:       {"text": 文本, "probabilities": 完整 softmax, "charset": 字符集, "confidence": 平均置信度}
+    1.6.x 的 text 已按字符范围过滤，以其为准，逐字符置信度按顺序对齐到 CTC 解码结果；
+    两种键都不存在时返回 None，由调用方退回普通识别
+    """
+    if "probabilities" in prob:
+        text = (prob.get("text") or "").strip()
+        chars, confs = _ctc_best_path(_squeeze_steps(prob["probabilities"]), prob.get("charset") or [])
+        aligned: List[float] = []
+        i = 0
+        for ch in text:
+            while i < len(chars) and chars[i] != ch:
+                i += 1
+            if i == len(chars):
+                break
+            aligned.append(confs[i])
+            i += 1
+        if text and len(aligned) == len(text):
+            return OcrResult(text, min(aligned), aligned)
+        confidence = prob.get("confidence")
+        return OcrResult(text, None if confidence is None else float(confidence))
+    if "probability" in prob:
+        chars, confs = _ctc_best_path(_squeeze_steps(prob["probability"]), prob.get("charsets") or [])
+        return OcrResult("".join(chars).strip(), min(confs) if confs else None, confs)
+    return None
+
+
+def check_captcha_rules(result: Optional[OcrResult], rules: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    按站点规则校验识别结果
+    rules: {"length": 期望长度(0不限), "charset": 字符集正则, "min_confidence": 最低置信度}
+    
+    Returns:
+        不通过的原因，通过返回 None
+    """
+    if result is None or not result.text:
+        return "识别结果为空"
+    rules = rules or {}
+    length = int(rules.get("length", 0) or 0)
+    if length and len(result.text) != length:
+        return f"长度 {len(result.text)} != {length}"
+    charset = rules.get("charset", "")
+    if charset and not re.fullmatch(charset, result.text):
+        return f"字符不符合 {charset}"
+    min_conf = float(rules.get("min_confidence", 0) or 0)
+    if min_conf and result.confidence is not None and result.confidence < min_conf:
+        return f"置信度 {result.confidence:.2f} < {min_conf:.2f}"
+    return None
+
+
+def vote_results(results: List[OcrResult]) -> Optional[OcrResult]:
+    """
+    多模型结果按置信度加权投票
+    相同文本的置信度相加（无置信度按 0.5 计），得分最高的文本胜出；
+    合并后的置信度 = 胜出得分 / 参与投票的模型数，模型意见不一致时置信度随之降低
+    """
+    results = [r for r in results if r and r.text]
+    if not results:
+        return None
+    scores: Dict[str, float] = {}
+    best: Dict[str, OcrResult] = {}
+    for r in results:
+        weight = 0.5 if r.confidence is None else r.confidence
+        scores[r.text] = scores.get(r.text, 0.0) + weight
+        if r.text not in best or weight > (best[r.text].confidence or 0.5):
+            best[r.text] = r
+    text = max(scores, key=scores.get)
+    return OcrResult(text, scores[text] / len(results), list(best[text].char_confidences))
+
+
+class ModelKey(NamedTuple):
+    """模型池键：同一键对应同一个 DdddOcr 实例（字符范围已设置好）"""
+    beta: bool = False
+    char_ranges: Optional[int | str] = None
+    model_path: str = ""  # 自定义 ONNX 模型路径，空字符串表示内置模型
+
+
+def build_session_options(runtime: Optional[Dict[str, Any]]):
+    """
+    根据配置生成 onnxruntime.SessionOptions，未配置任何项时返回 None（保持 ddddocr 默认）
+    runtime: {
+        "intra_op_num_threads": 0,            # 单算子内并行线程数，0 为 onnxruntime 默认
+        "inter_op_num_threads": 0,            # 算子间并行线程数（仅 parallel 模式有效）
+        "graph_optimization_level": "all",    # disable | basic | extended | all
+        "enable_mem_arena": true,             # CPU 内存池
+        "enable_mem_pattern": true,           # 内存复用模式
+        "execution_mode": "sequential"        # sequential | parallel
+    }
+    """
+    # 空值（None、""、线程数 0）表示沿用默认
+    runtime = {k: v for k, v in (runtime or {}).items()
+               if v is not None and v != "" and not (k.endswith("_threads") and not v)}
+    if not runtime:
+        return None
+    import onnxruntime as ort
+
+    so = ort.SessionOptions()
+    if runtime.get("intra_op_num_threads"):
+        so.intra_op_num_threads = int(runtime["intra_op_num_threads"])
+    if runtime.get("inter_op_num_threads"):
+        so.inter_op_num_threads = int(runtime["inter_op_num_threads"])
+    levels = {
+        "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }
+    if "graph_optimization_level" in runtime:
+        so.graph_optimization_level = levels[str(runtime["graph_optimization_level"]).lower()]
+    if "enable_mem_arena" in runtime:
+        so.enable_cpu_mem_arena = bool(runtime["enable_mem_arena"])
+    if "enable_mem_pattern" in runtime:
+        so.enable_mem_pattern = bool(runtime["enable_mem_pattern"])
+    if "execution_mode" in runtime:
+        so.execution_mode = (ort.ExecutionMode.ORT_PARALLEL if str(runtime["execution_mode"]).lower() == "parallel"
+                             else ort.ExecutionMode.ORT_SEQUENTIAL)
+    return so
+
+
+class ModelPool:
+    """
+    DdddOcr 实例池
+    按 (beta, char_ranges, 自定义模型路径) 缓存已加载的模型，避免每次识别都重新加载 ONNX
+    超出 max_size 时按 LRU 淘汰最久未使用的实例
+    """
+    def __init__(self, max_size: int = 4, charsets_paths: Optional[Dict[str, str]] = None,
+                 runtime: Optional[Dict[str, Any]] = None):
+        self.max_size = max(1, int(max_size))
+        # 自定义模型路径 -> 字符集文件路径
+        self._charsets_paths = dict(charsets_paths or {})
+        self._session_options = build_session_options(runtime)
+        self._models: "OrderedDict[ModelKey, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.build_time = 0.0  # 累计模型构建耗时（秒）
+
+    def _build(self, key: ModelKey):
+        """构建模型实例（调用方持有锁）"""
+        import ddddocr
+        if key.model_path:
+            ocr = ddddocr.DdddOcr(det=False, ocr=False, show_ad=False,
+                                  import_onnx_path=key.model_path,
+                                  charsets_path=self._charsets_paths.get(key.model_path, ""))
+        else:
+            ocr = ddddocr.DdddOcr(beta=key.beta, show_ad=False)
+        if key.char_ranges is not None:
+            ocr.set_ranges(key.char_ranges)
+        if self._session_options is not None:
+            self._apply_session_options(ocr)
+        return ocr
+
+    def _apply_session_options(self, ocr) -> None:
+        """
+        ddddocr 不支持传入 SessionOptions，这里用相同模型文件与执行提供者重建其推理会话：
+        1.6.x 为 ocr.ocr_engine.session，1.5.x 为名称改写后的私有属性
+        两者都不存在时抛出 RuntimeError，避免设置未生效却仍按新设置统计（如基准测试扫描）
+        """
+        import onnxruntime as ort
+
+        engine = getattr(ocr, "ocr_engine", None)
+        session = getattr(engine, "session", None)
+        if session is not None:
+            graph_path = getattr(session, "_model_path", None) or getattr(engine, "import_onnx_path", "")
+            if graph_path:
+                engine.session = ort.InferenceSession(graph_path, sess_options=self._session_options,
+                                                      providers=session.get_providers())
+                return
+        graph_path = getattr(ocr, "_DdddOcr__graph_path", None)
+        if graph_path and hasattr(ocr, "_DdddOcr__ort_session"):
+            providers = getattr(ocr, "_DdddOcr__providers", None) or ["CPUExecutionProvider"]
+            ocr._DdddOcr__ort_session = ort.InferenceSession(graph_path, sess_options=self._session_options,
+                                                             providers=providers)
+            return
+        raise RuntimeError("当前 ddddocr 版本无法重建推理会话，onnxruntime 运行时设置（ocr.runtime）无法生效")
+
+    def get(self, key: ModelKey):
+        """获取模型实例，不存在则构建并放入池中"""
+        with self._lock:
+            ocr = self._models.get(key)
+            if ocr is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return ocr
+            self.misses += 1
+            start = time.perf_counter()
+            ocr = self._build(key)
+            cost = time.perf_counter() - start
+            self.build_time += cost
+            print(f"[OCR] 模型已加载 {tuple(key)}，耗时 {cost * 1000:.0f}ms")
+            self._models[key] = ocr
+            while len(self._models) > self.max_size:
+                old_key, _ = self._models.popitem(last=False)
+                self.evictions += 1
+                print(f"[OCR] 模型池已满，淘汰 {tuple(old_key)}")
+            return ocr
+
+    def stats(self) -> Dict[str, Any]:
+        """模型池统计：命中/未命中/淘汰次数与累计构建耗时"""
+        with self._lock:
+            return {
+                "size": len(self._models),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "build_time": round(self.build_time, 3),
+            }
+
+
+class ResultCache:
+    """
+    按图片内容哈希缓存识别结果（LRU + TTL）
+    同一张验证码图片（测试验证码与登录流程、src 与截图回退）重复识别时直接返回结果
+    """
+    def __init__(self, max_size: int = 64, ttl: float = 300):
+        self.max_size = max(0, int(max_size))
+        self.ttl = float(ttl)
+        self._items: "OrderedDict[tuple, Tuple[float, OcrResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(image_bytes: bytes) -> bytes:
+        return hashlib.blake2b(image_bytes, digest_size=16).digest()
+
+    def get(self, key: tuple) -> Optional[OcrResult]:
+        if not self.max_size:
+            return None
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and (self.ttl <= 0 or time.monotonic() - item[0] < self.ttl):
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                del self._items[key]  # 已过期
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, result: OcrResult) -> None:
+        if not self.max_size:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic(), result)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def discard(self, digest: bytes) -> int:
+        """删除某张图片的所有缓存结果（各模型/预处理组合），返回删除的条目数"""
+        with self._lock:
+            keys = [k for k in self._items if k[0] == digest]
+            for key in keys:
+                del self._items[key]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._items), "hits": self.hits, "misses": self.misses}
 
 
 class CaptchaOcr:
     """
     使用 ddddocr 进行验证码识别
-    支持数字和字母组合的验证码
+    支持数字和字母组合的验证码（兼容 ddddocr 1.5.x 与 1.6.x 的概率输出格式）
     """
-    def __init__(self):
+    ENSEMBLE_MODELS = ("std", "beta", "custom")
+
+    def __init__(self, pool_size: int = 4, custom_model: Optional[Dict[str, str]] = None,
+                 ensemble: Optional[Dict[str, Any]] = None, cache: Optional[Dict[str, Any]] = None,
+                 worker: Optional[Dict[str, Any]] = None, runtime: Optional[Dict[str, Any]] = None):
         """
         初始化 ddddocr 实例
         注意：只需初始化一次，不要重复初始化以提升性能
+
+        Args:
+            pool_size: 模型池最大实例数（每种 beta/字符范围/自定义模型组合占一个）
+            custom_model: 自定义模型配置 {"onnx_path": "...", "charsets_path": "..."}
+            ensemble: 多模型集成配置 {"enabled": bool, "models": ["std", "beta", "custom"]}
+            cache: 识别结果缓存配置 {"max_size": 64, "ttl": 300}，max_size 为 0 时关闭
+            worker: 工作进程配置 {"enabled": bool, "timeout": 10, "start_timeout": 60}
+                    开启后模型在子进程中加载与推理，接口不变
+            runtime: onnxruntime 会话设置（线程数、图优化级别、内存池等，见 build_session_options）
         """
+        custom_model = custom_model or {}
+        self._custom_onnx = custom_model.get("onnx_path", "") or ""
+        charsets = {self._custom_onnx: custom_model.get("charsets_path", "")} if self._custom_onnx else {}
+        self._pool: Optional[ModelPool] = None  # 只在进程内识别时创建，工作进程模式下主进程不加载 onnxruntime
+
+        ensemble = ensemble or {}
+        self.ensemble_enabled = bool(ensemble.get("enabled", False))
+        self._ensemble_models = [m for m in ensemble.get("models", ["std", "beta"])
+                                 if m in self.ENSEMBLE_MODELS and (m != "custom" or self._custom_onnx)]
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        cache = cache or {}
+        self._cache = ResultCache(cache.get("max_size", 64), cache.get("ttl", 300))
+        self._ocr = None
+        self._worker = None
+        worker = worker or {}
+        if worker.get("enabled"):
+            from .ocr_worker import OcrWorkerClient
+            options = {"pool_size": pool_size, "custom_model": custom_model, "ensemble": ensemble,
+                       "runtime": runtime}
+            self._worker = OcrWorkerClient(options, timeout=worker.get("timeout", 10),
+                                           start_timeout=worker.get("start_timeout", 60))
+            try:
+                self._worker.start()
+                print("[OCR] ddddocr 工作进程初始化成功")
+                return
+            except Exception as e:
+                print(f"[OCR] 工作进程启动失败: {e}，改为进程内识别")
+                self._worker.close()
+                self._worker = None
+
         try:
             # 初始化 ddddocr，默认使用第一套 OCR 模型
-            self._ocr = ddddocr.DdddOcr()
+            self._pool = ModelPool(pool_size, charsets, runtime)
+            self._ocr = self._pool.get(ModelKey())
             print("[OCR] ddddocr 初始化成功")
         except Exception as e:
             print(f"[OCR] ddddocr 初始化失败: {e}")
             self._ocr = None
 
-    def _get_image_bytes(self, input_data: bytes | str) -> Optional[bytes]:
+    @property
+    def ready(self) -> bool:
+        """模型是否可用（进程内已加载或工作进程已启动）"""
+        return self._worker is not None or self._ocr is not None
+
+    def model_key(self, char_ranges: Optional[int | str] = None, use_beta: bool = False,
+                  use_custom: bool = False) -> ModelKey:
+        """根据识别参数生成模型池键"""
+        if use_custom and self._custom_onnx:
+            return ModelKey(False, char_ranges, self._custom_onnx)
+        return ModelKey(bool(use_beta), char_ranges, "")
+
+    def ensemble_keys(self, char_ranges: Optional[int | str] = None) -> List[ModelKey]:
+        """集成模式下参与投票的模型键"""
+        return [self.model_key(char_ranges, use_beta=(m == "beta"), use_custom=(m == "custom"))
+                for m in self._ensemble_models]
+
+    def _use_ensemble(self, ensemble: Optional[bool]) -> bool:
+        use = self.ensemble_enabled if ensemble is None else ensemble
+        return bool(use) and len(self._ensemble_models) > 1
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """返回模型池统计信息（工作进程模式下为子进程内的模型池）"""
+        if self._worker is not None:
+            try:
+                return self._worker.call("stats")
+            except Exception as e:
+                print(f"[OCR] 获取工作进程统计失败: {e}")
+                return {}
+        return self._pool.stats() if self._pool is not None else {}
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """返回识别结果缓存统计信息"""
+        return self._cache.stats()
+
+    def forget(self, result: Optional[OcrResult]) -> None:
+        """
+        丢弃该结果对应图片的缓存：验证码提交后即失效，
+        页面没有换图时再次读到同一张图片不应直接拿缓存结果重复提交
+        """
+        if result is not None and result.digest:
+            self._cache.discard(result.digest)
+
+    def warmup(self, char_ranges: Optional[int | str] = None, use_beta: bool = False,
+               use_custom: bool = False, ensemble: Optional[bool] = None) -> float:
+        """
+        预热：加载对应模型并执行一次空白图片推理，提前分配 onnxruntime 内存
+        集成模式下预热所有参与投票的模型
+        
+        Returns:
+            预热耗时（秒）
+        """
+        if self._worker is not None:
+            return self._worker.call("warmup", timeout=self._worker.start_timeout, char_ranges=char_ranges,
+                                     use_beta=use_beta, use_custom=use_custom, ensemble=ensemble)
+
+        import io
+        from PIL import Image
+
+        start = time.perf_counter()
+        if self._use_ensemble(ensemble):
+            keys = self.ensemble_keys(char_ranges)
+        else:
+            keys = [self.model_key(char_ranges, use_beta, use_custom)]
+        buf = io.BytesIO()
+        Image.new("RGB", (100, 40), "white").save(buf, format="PNG")
+        for key in keys:
+            self._pool.get(key).classification(buf.getvalue())
+        return time.perf_counter() - start
+
+    def _classify(self, image_bytes: bytes, key: ModelKey) -> Optional[OcrResult]:
+        """用指定模型识别一张图片（概率输出；无法解码的输出格式退回普通识别，此时没有置信度）"""
+        ocr = self._pool.get(key)
+        prob = ocr.classification(image_bytes, probability=True)
+        if isinstance(prob, dict):
+            result = decode_probability(prob)
+            if result is not None:
+                return result
+            print(f"[OCR] 无法解析的概率输出（键: {', '.join(prob)}），改用普通识别")
+            prob = ocr.classification(image_bytes)
+        return OcrResult((prob or "").strip())
+
+    def _classify_ensemble(self, image_bytes: bytes, char_ranges: Optional[int | str]) -> Optional[OcrResult]:
+        """多个模型在线程池中并发识别同一张图片，再按置信度加权投票"""
+        keys = self.ensemble_keys(char_ranges)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=len(self.ENSEMBLE_MODELS),
+                                                thread_name_prefix="ocr-ensemble")
+        futures = [self._executor.submit(self._classify, image_bytes, key) for key in keys]
+        results = []
+        for key, fut in zip(keys, futures):
+            try:
+                results.append(fut.result())
+            except Exception as e:
+                print(f"[OCR] 集成模型 {tuple(key)} 识别失败: {e}")
+        voted = vote_results(results)
+        if voted:
+            votes = ", ".join(f"{r.text}:{r.confidence:.2f}" if r.confidence is not None else r.text
+                              for r in results if r)
+            print(f"[OCR] 集成投票: {votes} -> {voted.text}")
+        return voted
+
+    def _get_image_bytes(self, input_data: bytes | str, http: Optional["HttpClient"] = None) -> Optional[bytes]:
         """
         将输入转换为图片字节数据
         支持：bytes、URL、base64、本地文件路径
-        注意：对于需要浏览器会话的验证码图片URL，直接访问可能会失败（405错误）
+        注意：URL 需要浏览器会话时应传入绑定浏览器的 http（driver.http），否则可能失败（405错误）
         """
         try:
             if isinstance(input_data, bytes):
                 return input_data
             elif isinstance(input_data, str):
-                # URL
+                # URL：走共享的 HTTP 客户端（连接复用；绑定浏览器时携带页面的 Cookie/UA/Referer）
                 if re.match(r'^https?://', input_data):
-                    # 尝试添加基本的请求头，模拟浏览器访问
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                        'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
-                        'Accept-Language': 'zh-CN,zh;q=0.9',
-                        'Referer': input_data.rsplit('/', 2)[0] if '/' in input_data else input_data
-                    }
+                    import requests
+                    from .http_client import default_client
+                    client = http or default_client()
                     try:
-                        resp = requests.get(input_data, headers=headers, timeout=10)
-                        resp.raise_for_status()
-                        return resp.content
+                        return client.get_bytes(input_data)
                     except requests.exceptions.HTTPError as e:
                         # 如果是405或其他HTTP错误，说明需要浏览器会话，返回None让调用者使用截图方式
                         if e.response.status_code in (405, 403, 401):
@@ -66,60 +532,84 @@ class CaptchaOcr:
             return None
 
     def recognize(self, input_data: bytes | str, 
-                  char_ranges: Optional[int] = None,
-                  use_beta: bool = False) -> Optional[str]:
+                  char_ranges: Optional[int | str] = None,
+                  use_beta: bool = False,
+                  use_custom: bool = False,
+                  ensemble: Optional[bool] = None,
+                  preprocess=None,
+                  http: Optional["HttpClient"] = None) -> Optional[OcrResult]:
         """
         识别验证码
         
         Args:
             input_data: 图片数据（bytes、URL、base64、文件路径）
-            char_ranges: 字符范围限制（0-7，见下方说明）
-                        0: 纯数字 0-9
-                        4: 小写英文a-z + 数字0-9
-                        5: 大写英文A-Z + 数字0-9
-                        6: 小写英文a-z + 大写英文A-Z + 数字0-9 (推荐用于数字+字母组合)
-                        7: 默认字符库 - 小写英文a-z - 大写英文A-Z - 数字0-9
+            char_ranges: 字符范围限制，传给 ddddocr 的 set_ranges
+                        字符串: 只输出其中的字符，如 "0123456789"（各版本含义一致，推荐）
+                        整数: ddddocr 1.5.x 中 0 为纯数字、6 为大小写字母+数字；1.6.x 含义不同，不建议使用
                         None: 不限制（使用默认字符集）
             use_beta: 是否使用第二套OCR模型（beta版本）
+            use_custom: 是否使用配置的自定义 ONNX 模型
+            ensemble: 是否使用多模型集成投票（None 表示按配置；开启时忽略 use_beta/use_custom）
+            preprocess: 识别前执行的图片预处理（util.image_preprocess.Preprocessor），None 表示不处理
+            http: 下载 URL 图片使用的 HTTP 客户端（util.http_client.HttpClient），None 时使用不绑定浏览器的共享客户端
         
         Returns:
-            识别出的验证码文本，失败返回 None
+            OcrResult（文本、整体与逐字符置信度），失败返回 None
         """
-        if self._ocr is None:
+        if not self.ready:
             print("[OCR] OCR未初始化")
             return None
         
         try:
             # 获取图片字节数据
-            image_bytes = self._get_image_bytes(input_data)
+            image_bytes = self._get_image_bytes(input_data, http)
             if image_bytes is None:
                 return None
-            
-            # 如果需要切换模型，需要重新初始化（不推荐频繁切换）
-            ocr_instance = self._ocr
-            if use_beta:
-                # 仅在需要时创建 beta 实例
-                if not hasattr(self, '_ocr_beta') or self._ocr_beta is None:
-                    self._ocr_beta = ddddocr.DdddOcr(beta=True)
-                ocr_instance = self._ocr_beta
-            
-            # 如果指定了字符范围，设置字符集限制
-            # 对于数字+字母组合的验证码，推荐使用 char_ranges=0
-            temp_ocr = ocr_instance
-            if char_ranges is not None:
-                # 创建一个临时实例来设置字符范围，避免影响全局实例
-                temp_ocr = ddddocr.DdddOcr(beta=use_beta)
-                temp_ocr.set_ranges(char_ranges)
-            
-            # 执行OCR识别
-            result = temp_ocr.classification(image_bytes)
-            
-            text = result.strip() if result else None
-            if text:
-                print(f"[OCR] 识别结果: {text}")
+
+            use_ensemble = self._use_ensemble(ensemble)
+            cache_key = (
+                ResultCache.digest(image_bytes),
+                tuple(self.ensemble_keys(char_ranges)) if use_ensemble
+                else self.model_key(char_ranges, use_beta, use_custom),
+                preprocess.signature if preprocess else "",
+            )
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                print(f"[OCR] 命中识别缓存: {cached.text}")
+                return replace(cached, timings={})
+
+            if self._worker is not None:
+                # 交给工作进程预处理与推理，本进程只负责取图与缓存
+                result = self._worker.call("recognize", input_data=image_bytes, char_ranges=char_ranges,
+                                           use_beta=use_beta, use_custom=use_custom, ensemble=ensemble,
+                                           preprocess=preprocess.signature if preprocess else "")
+                queue_wait, run_time = self._worker.last_timing
+                print(f"[OCR] 工作进程: 排队 {queue_wait * 1000:.0f}ms, 推理 {run_time * 1000:.0f}ms")
+                timings = {"queue_wait": queue_wait * 1000, "inference": run_time * 1000}
             else:
-                print("[OCR] 识别结果为空")
-            return text
+                timings = {}
+                if preprocess:
+                    image_bytes, timings = preprocess.run(image_bytes)
+                    detail = ", ".join(f"{k} {v:.1f}ms" for k, v in timings.items())
+                    print(f"[OCR] 预处理完成: {detail}")
+                
+                # 从模型池取出对应 (beta, 字符范围, 自定义模型) 的实例，首次使用时才加载
+                start = time.perf_counter()
+                if use_ensemble:
+                    result = self._classify_ensemble(image_bytes, char_ranges)
+                else:
+                    result = self._classify(image_bytes, self.model_key(char_ranges, use_beta, use_custom))
+                timings["inference"] = (time.perf_counter() - start) * 1000
+            
+            if result and result.text:
+                result.digest = cache_key[0]
+                self._cache.put(cache_key, replace(result, timings={}))
+                result.timings.update(timings)
+                conf = "-" if result.confidence is None else f"{result.confidence:.2f}"
+                print(f"[OCR] 识别结果: {result.text} (置信度 {conf})")
+                return result
+            print("[OCR] 识别结果为空")
+            return None
             
         except Exception as e:
             print(f"[OCR] 验证码识别失败: {e}")
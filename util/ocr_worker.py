@@ -0,0 +1,147 @@
+"""
+OCR 工作进程
+
+模型常驻在独立的子进程中，推理不与 Tk 主循环争抢 GIL。
+主进程通过 Pipe 发送 (请求ID, 操作, 参数)，子进程返回 (请求ID, 结果, 排队耗时, 执行耗时)；
+请求超时或子进程崩溃时自动重启。
+"""
+import itertools
+import multiprocessing
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+def _worker_main(conn, options: Dict[str, Any]) -> None:
+    """子进程入口：持有 CaptchaOcr 实例，循环处理请求"""
+    from .ocr_helper import CaptchaOcr
+
+    # 子进程内不再启用工作进程与结果缓存（缓存由主进程负责）
+    ocr = CaptchaOcr(**{**options, "worker": None, "cache": {"max_size": 0}})
+    preprocessors: Dict[str, Any] = {}
+
+    while True:
+        try:
+            req_id, op, kwargs, sent_at = conn.recv()
+        except (EOFError, OSError):
+            break
+        queue_wait = max(0.0, time.time() - sent_at)
+        start = time.perf_counter()
+        try:
+            if op == "recognize":
+                signature = kwargs.pop("preprocess", "")
+                if signature:
+                    if signature not in preprocessors:
+                        import json
+                        from .image_preprocess import Preprocessor
+                        preprocessors[signature] = Preprocessor(json.loads(signature))
+                    kwargs["preprocess"] = preprocessors[signature]
+                result = ocr.recognize(**kwargs)
+            elif op == "warmup":
+                result = ocr.warmup(**kwargs)
+            elif op == "stats":
+                result = ocr.pool_stats()
+            elif op == "ping":
+                result = ocr.ready
+            else:
+                raise ValueError(f"未知操作: {op}")
+            reply = (req_id, True, result, queue_wait, time.perf_counter() - start)
+        except Exception as e:
+            reply = (req_id, False, str(e), queue_wait, time.perf_counter() - start)
+        try:
+            conn.send(reply)
+        except (EOFError, OSError):
+            break
+
+
+class OcrWorkerClient:
+    """
+    主进程侧的工作进程客户端
+    同一时刻只有一个请求在途（锁保护），超时或进程退出时重启工作进程
+    """
+    def __init__(self, options: Dict[str, Any], timeout: float = 10, start_timeout: float = 60):
+        self._options = options
+        self.timeout = float(timeout)
+        self.start_timeout = float(start_timeout)
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._proc = None
+        self._conn = None
+        self._fresh = False  # 新启动的进程还没有回复过，仍在导入 ddddocr、加载模型
+        self.restarts = 0
+        self.last_timing: Tuple[float, float] = (0.0, 0.0)  # (排队耗时, 执行耗时) 秒
+
+    def _start(self) -> None:
+        parent_conn, child_conn = self._ctx.Pipe()
+        proc = self._ctx.Process(target=_worker_main, args=(child_conn, self._options),
+                                 name="ocr-worker", daemon=True)
+        proc.start()
+        child_conn.close()
+        self._proc, self._conn = proc, parent_conn
+        self._fresh = True
+        print(f"[OCR] 工作进程已启动 pid={proc.pid}")
+
+    def _stop(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        if self._proc is not None and self._proc.is_alive():
+            self._proc.kill()
+            self._proc.join(timeout=2)
+        self._proc, self._conn = None, None
+
+    def _restart(self, reason: str) -> None:
+        print(f"[OCR] 工作进程异常（{reason}），正在重启...")
+        self._stop()
+        self.restarts += 1
+        self._start()
+
+    def call(self, op: str, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        发送请求并等待结果
+        超时或工作进程崩溃时重启工作进程并抛出 RuntimeError
+        """
+        timeout = self.timeout if timeout is None else timeout
+        wait_start = time.perf_counter()
+        with self._lock:
+            if self._proc is None or not self._proc.is_alive():
+                if self._proc is not None:
+                    self._restart(f"进程已退出 exitcode={self._proc.exitcode}")
+                else:
+                    self._start()
+            if self._fresh:
+                # 新进程（包括超时/崩溃后重启的）需要先加载模型
+                timeout = max(timeout, self.start_timeout)
+            req_id = next(self._ids)
+            try:
+                self._conn.send((req_id, op, kwargs, time.time()))
+                deadline = time.monotonic() + timeout
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._conn.poll(remaining):
+                        self._restart(f"请求 {req_id} 超时 {timeout:.1f}s")
+                        raise RuntimeError(f"OCR 工作进程请求超时（{timeout:.1f}s）")
+                    reply_id, ok, result, queue_wait, run_time = self._conn.recv()
+                    self._fresh = False
+                    if reply_id == req_id:
+                        break
+                    # 丢弃过期请求的迟到结果
+            except (EOFError, OSError, BrokenPipeError) as e:
+                self._restart(str(e) or type(e).__name__)
+                raise RuntimeError(f"OCR 工作进程通信失败: {e}")
+            # 排队耗时 = 总耗时 - 执行耗时，包含等待锁、管道传输与子进程内排队（queue_wait）
+            self.last_timing = (max(queue_wait, time.perf_counter() - wait_start - run_time), run_time)
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def start(self) -> None:
+        """启动工作进程并等待其加载完模型"""
+        self.call("ping", timeout=self.start_timeout)
+
+    def close(self) -> None:
+        with self._lock:
+            self._stop()
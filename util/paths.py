@@ -1,4 +1,9 @@
-import os
+"""
+项目路径常量
+
+只计算路径，不在导入时打印或创建目录：配置目录在首次读写配置时创建，
+图片、trace 等目录由写入方在首次写入时创建。
+"""
 import sys
 from pathlib import Path
 from typing import Tuple
@@ -17,29 +22,36 @@ def _get_roots() -> Tuple[str, str]:
 
 ROOT_DIR, PACKAGE_DIR = _get_roots()
 
-print(f"[路径] 项目根目录: {ROOT_DIR}")
-print(f"[路径] 包目录: {PACKAGE_DIR}")
-
 # 仅保留配置目录，避免生成无关目录（如 data、output 等）
 CONFIG_DIR = str(Path(ROOT_DIR) / "config")
-print(f"[路径] 配置目录: {CONFIG_DIR}")
-os.makedirs(CONFIG_DIR, exist_ok=True)
-print(f"[路径] 配置目录已确保存在: {CONFIG_DIR}")
 
 # 用户数据文件（账号密码等记忆化信息）
 USER_DATA_PATH = str(Path(CONFIG_DIR) / "user_data.json")
-print(f"[路径] 用户数据文件路径: {USER_DATA_PATH}")
 
 # 应用配置文件（选择器、URL等配置信息）
 APP_CONFIG_PATH = str(Path(CONFIG_DIR) / "app_config.json")
-print(f"[路径] 应用配置文件路径: {APP_CONFIG_PATH}")
 
 # 保持向后兼容
 USER_SETTINGS_PATH = USER_DATA_PATH
 
-# 图片保存目录（用于保存验证码截图）
+# 登录尝试分阶段计时文件（启用 trace 时首次写入才创建目录）
+TRACE_PATH = str(Path(ROOT_DIR) / "trace" / "attempts.jsonl")
+
+# 启动耗时分析报告（--profile-startup）
+STARTUP_PROFILE_PATH = str(Path(ROOT_DIR) / "trace" / "startup_profile.json")
+
+# 图片目录（验证码归档、基准测试标注图片），首次写入时创建
 IMG_DIR = str(Path(ROOT_DIR) / "img")
-os.makedirs(IMG_DIR, exist_ok=True)
-print(f"[路径] 图片目录: {IMG_DIR}")
 
 
+def describe_paths() -> str:
+    """各路径的说明文本（供启动分析等诊断输出，导入时不再打印）"""
+    return "\n".join([
+        f"[路径] 项目根目录: {ROOT_DIR}",
+        f"[路径] 包目录: {PACKAGE_DIR}",
+        f"[路径] 配置目录: {CONFIG_DIR}",
+        f"[路径] 用户数据文件路径: {USER_DATA_PATH}",
+        f"[路径] 应用配置文件路径: {APP_CONFIG_PATH}",
+        f"[路径] 计时文件路径: {TRACE_PATH}",
+        f"[路径] 图片目录: {IMG_DIR}",
+    ])
@@ -0,0 +1,150 @@
+"""
+启动耗时分析（python main.py --profile-startup，打包后的 exe 同样支持该参数）
+
+main.py 在其他导入之前安装导入计时，记录每个模块首次导入的累计耗时与自身耗时
+（模块顶层代码的执行即其初始化），再分阶段记录创建 Tk、构建界面与首次绘制，
+窗口显示后检查预算：
+    - 导入总耗时不超过 startup.import_budget_ms
+    - 从进程启动到窗口显示不超过 startup.window_budget_ms
+    - 窗口显示前没有加载 HEAVY_MODULES 中的重型依赖
+超出预算时返回非 0，可直接用作发布前的基准检查。
+报告同时写入 trace/startup_profile.json（无控制台的 exe 也能查看）。
+"""
+import builtins
+import contextlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+# 应在用户操作时才加载的依赖，窗口显示前出现即视为违反预算
+HEAVY_MODULES = ("DrissionPage", "ddddocr", "onnxruntime", "numpy", "PIL", "requests", "selenium")
+
+
+class ImportTimer:
+    """包装 builtins.__import__，记录每个模块首次导入的耗时"""
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+        self._stack: List[float] = []  # 每层正在导入的模块中，子模块导入的累计耗时
+        self._orig = None
+
+    def install(self) -> None:
+        if self._orig is None:
+            self._orig = builtins.__import__
+            builtins.__import__ = self._import
+
+    def uninstall(self) -> None:
+        if self._orig is not None:
+            builtins.__import__ = self._orig
+            self._orig = None
+
+    @staticmethod
+    def _resolve(name: str, globals_: Optional[dict], level: int) -> str:
+        if not level:
+            return name
+        package = (globals_ or {}).get("__package__") or ""
+        base = package.rsplit(".", level - 1)[0] if level > 1 else package
+        return f"{base}.{name}" if name else base
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        full = self._resolve(name, globals, level)
+        if full in sys.modules:
+            return self._orig(name, globals, locals, fromlist, level)
+        start = time.perf_counter()
+        self._stack.append(0.0)
+        try:
+            return self._orig(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            self.records.append({
+                "module": full,
+                "ms": round(elapsed * 1000, 2),
+                "self_ms": round((elapsed - children) * 1000, 2),
+                "depth": len(self._stack),
+            })
+
+
+class StartupProfile:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.imports = ImportTimer()
+        self.phases: List[Dict[str, Any]] = []
+        self.window_ms: Optional[float] = None
+        self.heavy_loaded: List[str] = []
+
+    def start(self) -> "StartupProfile":
+        self.imports.install()
+        return self
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({"name": name, "ms": round((time.perf_counter() - start) * 1000, 2)})
+
+    def mark_window_shown(self) -> None:
+        """窗口完成首次绘制：记录耗时与此时已加载的重型依赖"""
+        self.window_ms = round((time.perf_counter() - self.t0) * 1000, 2)
+        self.heavy_loaded = sorted(m for m in HEAVY_MODULES if m in sys.modules)
+        self.imports.uninstall()
+
+    def report(self, budget: Dict[str, Any]) -> Dict[str, Any]:
+        """汇总并检查预算，failures 为空表示通过"""
+        import_ms = round(sum(r["ms"] for r in self.imports.records if r["depth"] == 0), 2)
+        import_budget = float(budget.get("import_budget_ms", 500))
+        window_budget = float(budget.get("window_budget_ms", 1500))
+        failures = []
+        if import_budget and import_ms > import_budget:
+            failures.append(f"导入耗时 {import_ms:.1f}ms 超出预算 {import_budget:.0f}ms")
+        if window_budget and self.window_ms is not None and self.window_ms > window_budget:
+            failures.append(f"窗口显示耗时 {self.window_ms:.1f}ms 超出预算 {window_budget:.0f}ms")
+        if self.heavy_loaded:
+            failures.append(f"窗口显示前加载了重型依赖: {', '.join(self.heavy_loaded)}")
+        return {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "frozen": bool(getattr(sys, "frozen", False)),
+            "python": sys.version.split()[0],
+            "import_ms": import_ms,
+            "window_ms": self.window_ms,
+            "budget": {"import_budget_ms": import_budget, "window_budget_ms": window_budget},
+            "heavy_loaded": self.heavy_loaded,
+            "failures": failures,
+            "phases": self.phases,
+            "imports": sorted(self.imports.records, key=lambda r: -r["ms"]),
+        }
+
+
+def print_report(report: Dict[str, Any], top: int = 25) -> None:
+    """控制台表格输出：耗时最多的模块与各初始化阶段"""
+    print(f"[启动] {'打包 exe' if report['frozen'] else '源码'}运行，Python {report['python']}")
+    print(f"{'模块':<40}{'累计ms':>10}{'自身ms':>10}")
+    print("-" * 60)
+    for r in report["imports"][:top]:
+        name = "  " * r["depth"] + r["module"]
+        print(f"{name:<40}{r['ms']:>10.1f}{r['self_ms']:>10.1f}")
+    print("-" * 60)
+    for p in report["phases"]:
+        print(f"{'[阶段] ' + p['name']:<40}{p['ms']:>10.1f}")
+    budget = report["budget"]
+    print(f"[启动] 导入合计 {report['import_ms']:.1f}ms（预算 {budget['import_budget_ms']:.0f}ms），"
+          f"窗口显示 {report['window_ms']:.1f}ms（预算 {budget['window_budget_ms']:.0f}ms）")
+    for failure in report["failures"]:
+        print(f"[启动] 未通过: {failure}")
+    if not report["failures"]:
+        print("[启动] 启动预算检查通过")
+
+
+def write_report(report: Dict[str, Any], path: str) -> None:
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[启动] 报告已保存: {path}")
+    except OSError as e:
+        print(f"[启动] 报告保存失败: {e}")
@@ -0,0 +1,14 @@
+"""
+耗时统计的公共函数（基准测试与登录耗时汇总共用）
+"""
+import math
+from typing import List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
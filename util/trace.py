@@ -0,0 +1,201 @@
+"""
+登录尝试的分阶段计时
+
+每次登录尝试创建一个 AttemptTrace，各阶段（启动浏览器、打开页面、等待就绪、填写各输入框、
+按方式获取验证码、OCR、提交、关闭弹窗）用 span() 计时；尝试结束后整条记录以一行 JSON
+追加到轮转的 trace 文件。未启用时使用 NULL_TRACE，span() 只返回一个共享的空上下文。
+
+汇总：
+    python -m util.trace                       # 默认 trace 文件（含轮转备份）
+    python -m util.trace trace/attempts.jsonl  # 指定文件
+"""
+import argparse
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from .paths import TRACE_PATH
+from .stats import percentile
+
+
+class AttemptTrace:
+    """单次登录尝试的阶段记录（可在验证码后台线程中并发写入）"""
+    enabled = True
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.attrs: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+        """
+        记录一个阶段；yield 的字典可在阶段内补充属性
+        start_ms 为相对尝试开始的偏移，可看出并行阶段的重叠
+        """
+        start = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000, start_ms=(start - self._t0) * 1000, **attrs)
+
+    def add(self, name: str, duration_ms: float, start_ms: Optional[float] = None, **attrs: Any) -> None:
+        """记录已单独测得耗时的阶段"""
+        if start_ms is None:
+            start_ms = (time.perf_counter() - self._t0) * 1000 - duration_ms
+        record = {"name": name, "start_ms": round(start_ms, 2), "ms": round(duration_ms, 2)}
+        if attrs:
+            record.update(attrs)
+        with self._lock:
+            self.spans.append(record)
+
+    def set(self, **attrs: Any) -> None:
+        """设置整次尝试的属性，如 outcome"""
+        self.attrs.update(attrs)
+
+    def to_record(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+        return {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+            "mode": self.mode,
+            "total_ms": round((time.perf_counter() - self._t0) * 1000, 2),
+            **self.attrs,
+            "spans": spans,
+        }
+
+
+class _NullTrace:
+    """未启用时的空实现，避免在热路径上产生任何记录开销"""
+    enabled = False
+
+    def span(self, name: str, **attrs: Any):
+        # 每次返回新的字典：调用方会在阶段内写入属性，共享一个字典会在尝试与线程之间串数据
+        return contextlib.nullcontext({})
+
+    def add(self, name: str, duration_ms: float, start_ms: Optional[float] = None, **attrs: Any) -> None:
+        pass
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+class TraceWriter:
+    """按大小轮转的 JSONL 写入器：attempts.jsonl 写满 max_bytes 后依次移到 .1 ~ .backups"""
+    def __init__(self, path: str = TRACE_PATH, max_bytes: int = 5 * 1024 * 1024, backups: int = 3):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.backups = max(0, int(backups))
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None) -> Optional["TraceWriter"]:
+        """按 app_config.json 的 trace 配置创建，未启用返回 None"""
+        cfg = config or {}
+        if not cfg.get("enabled", False):
+            return None
+        return cls(cfg.get("path") or TRACE_PATH,
+                   max_bytes=cfg.get("max_bytes", 5 * 1024 * 1024),
+                   backups=cfg.get("backups", 3))
+
+    def begin(self, mode: str) -> AttemptTrace:
+        return AttemptTrace(mode)
+
+    def _rotate(self) -> None:
+        if self.backups == 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def write(self, trace: AttemptTrace) -> None:
+        line = json.dumps(trace.to_record(), ensure_ascii=False) + "\n"
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                    self._rotate()
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError as e:
+                print(f"[计时] trace 写入失败: {e}")
+
+
+def trace_files(path: str) -> List[str]:
+    """trace 文件及其轮转备份，按时间从旧到新"""
+    files = []
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        files.insert(0, f"{path}.{i}")
+        i += 1
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def summarize(paths: List[str]) -> Dict[str, Dict[str, float]]:
+    """按阶段名汇总耗时：{阶段: {count, p50_ms, p95_ms, max_ms}}，attempt 为整次尝试"""
+    durations: Dict[str, List[float]] = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                durations.setdefault("attempt", []).append(record.get("total_ms", 0.0))
+                for span in record.get("spans", []):
+                    durations.setdefault(span["name"], []).append(span["ms"])
+    return {
+        name: {"count": len(values), "p50_ms": percentile(values, 50),
+               "p95_ms": percentile(values, 95), "max_ms": max(values)}
+        for name, values in durations.items()
+    }
+
+
+def print_summary(summary: Dict[str, Dict[str, float]]) -> None:
+    """控制台表格输出"""
+    print(f"{'阶段':<24}{'次数':>8}{'p50ms':>10}{'p95ms':>10}{'maxms':>10}")
+    print("-" * 62)
+    for name, st in sorted(summary.items(), key=lambda kv: -kv[1]["p95_ms"]):
+        print(f"{name:<24}{st['count']:>8}{st['p50_ms']:>10.1f}{st['p95_ms']:>10.1f}{st['max_ms']:>10.1f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="登录尝试分阶段耗时汇总")
+    parser.add_argument("files", nargs="*", help="trace 文件，默认读取配置的 trace 文件及其轮转备份")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    args = parser.parse_args(argv)
+
+    if args.files:
+        paths = args.files
+    else:
+        from .config_store import load_app_config
+        paths = trace_files(load_app_config().get("trace", {}).get("path") or TRACE_PATH)
+    paths = [p for p in paths if os.path.exists(p)]
+    if not paths:
+        print("[计时] 没有找到 trace 文件（需在 app_config.json 中开启 trace.enabled）")
+        return 2
+    summary = summarize(paths)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print(f"[计时] 汇总 {len(paths)} 个文件: {', '.join(paths)}")
+        print_summary(summary)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())